@@ -1,10 +1,331 @@
-from flask import Flask
+import hashlib
+import json
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from flask import Flask, Response, jsonify, request
+
+from async_runner import AsyncLoopThread
+from tracing import current_span, traced, tracer
 
 app = Flask(__name__)
 
+# 생성기와 검증기는 실패를 예외 대신 이 문구로 시작하는 텍스트로 돌려준다
+GENERATION_ERROR = "Error occurred: "
+VALIDATION_ERROR = "검증 및 수정 중 오류 발생: "
+
+
+class ResponseCache:
+    # 같은 키의 요청이 동시에 들어오면 업스트림 호출 한 번의 결과를 함께 쓰고, ttl 동안 재사용한다
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.in_flight = {}
+
+    def get_or_compute(self, key, fn, ttl):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] > time.time():
+                return entry[1]
+            future = self.in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self.in_flight[key] = future
+        if not owner:
+            return future.result()
+
+        try:
+            value = fn()
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(value)
+            # 빈 결과는 업스트림의 일시적인 실패일 수 있으므로 재사용하지 않는다
+            if value:
+                with self.lock:
+                    self.prune()
+                    self.entries[key] = (time.time() + ttl, value)
+            return value
+        finally:
+            with self.lock:
+                self.in_flight.pop(key, None)
+
+    def prune(self):
+        # 만료된 항목을 지워 오래 떠 있는 서비스에서도 캐시가 끝없이 커지지 않게 한다. self.lock을 잡은 채로 부른다
+        now = time.time()
+        for key in [key for key, (expires_at, _) in self.entries.items() if expires_at <= now]:
+            del self.entries[key]
+
+
+class Job:
+    def __init__(self, key, params):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.params = params
+        self.status = "queued"
+        self.phase = None
+        self.chunks = []
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self.condition = threading.Condition()
+
+    @property
+    def done(self):
+        return self.status in ("done", "failed")
+
+    def update(self, **fields):
+        with self.condition:
+            for name, value in fields.items():
+                setattr(self, name, value)
+            if self.done:
+                self.finished_at = time.time()
+            self.condition.notify_all()
+
+    def append(self, phase, delta):
+        with self.condition:
+            self.chunks.append((phase, delta))
+            self.condition.notify_all()
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "status": self.status,
+            "phase": self.phase,
+            "params": self.params,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+
+    def stream(self, timeout=15):
+        # 지금까지 쌓인 조각부터 보내고, 끝날 때까지 새 조각을 기다린다
+        sent = 0
+        while True:
+            with self.condition:
+                if sent == len(self.chunks) and not self.done:
+                    self.condition.wait(timeout)
+                chunks = self.chunks[sent:]
+                sent += len(chunks)
+                finished = self.done and sent == len(self.chunks)
+            for phase, delta in chunks:
+                yield phase, delta
+            if finished:
+                return
+            if not chunks:
+                yield None, None
+
+
+class Service:
+    def __init__(self, workers=4, result_ttl=3600):
+        # 무거운 모듈은 첫 요청 때 한 번만 만들고 모든 편집자가 같이 쓴다
+        from content_scraper import ContentScraper
+        from news_manager import NewsManager
+        from script_generator import ScriptGenerator
+        from script_validator import ScriptValidator
+        from trend_analyzer import TrendAnalyzer
+
+        self.runner = AsyncLoopThread()
+        self.news_manager = NewsManager()
+        self.scraper = ContentScraper(news_manager=self.news_manager)
+        self.generator = ScriptGenerator()
+        self.validator = ScriptValidator()
+        self.trend_analyzer = TrendAnalyzer()
+        self.cache = ResponseCache()
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.result_ttl = result_ttl
+        self.jobs = {}
+        self.jobs_by_key = {}
+        self.lock = threading.Lock()
+
+    def trends(self, count):
+        return self.cache.get_or_compute(("trends", count), lambda: self.trend_analyzer.fetch_search_trends(count), 300)
+
+    def search(self, query, limit, since):
+        return self.cache.get_or_compute(
+            ("search", query, limit, since), lambda: self.news_manager.search(query, limit, since), 30
+        )
+
+    def submit(self, params):
+        key = hashlib.sha256(json.dumps(params, ensure_ascii=False, sort_keys=True).encode('utf-8')).hexdigest()
+        with self.lock:
+            self.prune_jobs()
+            # 같은 생성 요청이 진행 중이거나 최근에 끝났으면 그 작업을 그대로 돌려준다
+            job = self.jobs_by_key.get(key)
+            if job is not None and not (job.status == "failed" or
+                                        (job.done and time.time() - job.finished_at > self.result_ttl)):
+                return job, False
+            job = Job(key, params)
+            self.jobs[job.id] = job
+            self.jobs_by_key[key] = job
+        self.executor.submit(self.run_job, job)
+        return job, True
+
+    def prune_jobs(self):
+        # 끝난 지 result_ttl이 지난 작업은 조회 대상에서 뺀다. self.lock을 잡은 채로 부른다
+        expired_before = time.time() - self.result_ttl
+        for job in [job for job in self.jobs.values() if job.done and job.finished_at < expired_before]:
+            del self.jobs[job.id]
+            if self.jobs_by_key.get(job.key) is job:
+                del self.jobs_by_key[job.key]
+
+    def get_job(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def load_articles(self, params):
+        if params.get("urls"):
+            articles = []
+            missing = []
+            for url in params["urls"]:
+                article = self.news_manager.get_article(url)
+                if article and article.get("full_content"):
+                    articles.append(article)
+                else:
+                    missing.append({"url": url, "title": ""})
+            if missing:
+                articles += self.runner.run(self.scraper.scrape_articles(missing))
+            return articles
+        return self.runner.run(self.scraper.get_news_by_keyword(params["keyword"], params.get("limit", 5)))
+
+    @traced('job.run')
+    def run_job(self, job):
+        params = job.params
+        current_span().set(job_id=job.id)
+        try:
+            job.update(status="running", phase="scraping")
+            articles = [article for article in self.load_articles(params) if article.get("full_content")]
+            if not articles:
+                raise RuntimeError("no articles to generate from")
+
+            job.update(phase="generating")
+            parts = []
+            for delta in self.generator.generate_script_stream(
+                    articles, style=params["style"], presenter_name=params["presenter"], language=params["language"]):
+                if delta.startswith(GENERATION_ERROR):
+                    raise RuntimeError(f"generation failed: {delta[len(GENERATION_ERROR):]}")
+                parts.append(delta)
+                job.append("generating", delta)
+            script = "".join(parts).strip()
+
+            validated_script = None
+            if params["validate"]:
+                job.update(phase="validating")
+                parts = []
+                for delta in self.validator.validate_script_stream(script, articles):
+                    if delta.startswith(VALIDATION_ERROR):
+                        raise RuntimeError(f"validation failed: {delta[len(VALIDATION_ERROR):]}")
+                    parts.append(delta)
+                    job.append("validating", delta)
+                validated_script = "".join(parts).strip()
+
+            job.update(status="done", phase=None, result={
+                "script": script,
+                "validated_script": validated_script,
+                "articles": [{"title": article["title"], "url": article["url"]} for article in articles],
+            })
+        except Exception as e:
+            current_span().fail(e)
+            job.update(status="failed", error=str(e))
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_service():
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = Service()
+        return _service
+
+
 @app.route('/')
 def hello():
     return "Hello, Elastic Beanstalk!"
 
+
+@app.route('/trends')
+def trends():
+    count = request.args.get('count', 10, type=int)
+    try:
+        trends = get_service().trends(count)
+    except Exception as e:
+        return jsonify({"error": f"failed to fetch trends: {str(e)}"}), 502
+    return jsonify({"trends": trends})
+
+
+@app.route('/articles/search')
+def search_articles():
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({"error": "q is required"}), 400
+    limit = request.args.get('limit', 20, type=int)
+    since = request.args.get('since')
+    return jsonify({"results": get_service().search(query, limit, since)})
+
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    body = request.get_json(silent=True) or {}
+    if not body.get("keyword") and not body.get("urls"):
+        return jsonify({"error": "keyword or urls is required"}), 400
+    service = get_service()
+    params = {
+        "keyword": body.get("keyword"),
+        "urls": body.get("urls"),
+        "limit": body.get("limit", 5),
+        "style": body.get("style", "아나운서"),
+        "presenter": body.get("presenter", "진행자"),
+        "language": body.get("language", "한국어"),
+        "validate": body.get("validate", True),
+    }
+    if params["style"] not in service.generator.styles:
+        return jsonify({"error": f"unknown style: {params['style']}"}), 400
+    if params["language"] not in service.generator.language_instructions:
+        return jsonify({"error": f"unknown language: {params['language']}"}), 400
+    job, created = service.submit(params)
+    return jsonify(job.to_dict()), 202 if created else 200
+
+
+@app.route('/jobs/<job_id>')
+def get_job(job_id):
+    job = get_service().get_job(job_id)
+    if job is None:
+        return jsonify({"error": "job not found"}), 404
+    return jsonify(job.to_dict())
+
+
+@app.route('/metrics')
+def metrics():
+    # Prometheus 텍스트 형식의 단계별 지연/오류/바이트/토큰/캐시/재시도 집계
+    return Response(tracer.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+
+@app.route('/jobs/<job_id>/stream')
+def stream_job(job_id):
+    job = get_service().get_job(job_id)
+    if job is None:
+        return jsonify({"error": "job not found"}), 404
+
+    def events():
+        for phase, delta in job.stream():
+            if phase is None:
+                # 연결 유지용 주석
+                yield ": keep-alive\n\n"
+                continue
+            yield f"event: {phase}\ndata: {json.dumps(delta, ensure_ascii=False)}\n\n"
+        yield f"event: {job.status}\ndata: {json.dumps(job.to_dict(), ensure_ascii=False)}\n\n"
+
+    return Response(events(), mimetype='text/event-stream', headers={"Cache-Control": "no-cache"})
+
+
 if __name__ == "__main__":
     app.run(debug=True)
@@ -0,0 +1,129 @@
+import asyncio
+from dedup import canonicalize_url, merge_duplicate
+
+_DONE = object()
+
+
+class StoredArticle:
+    # 저장소에서 바로 꺼낸 기사는 나머지 단계를 건너뛴다
+    def __init__(self, article):
+        self.article = article
+
+
+class ArticlePipeline:
+    # fetch HTML -> parse -> classify -> persist, 단계마다 큐와 워커를 따로 둔다
+    def __init__(self, scraper, fetch_workers=8, parse_workers=2, classify_workers=4,
+                 persist_workers=1, queue_size=16):
+        self.scraper = scraper
+        self.workers = {
+            'fetch': fetch_workers,
+            'parse': parse_workers,
+            'classify': classify_workers,
+            'persist': persist_workers,
+        }
+        self.queue_size = queue_size
+        # 이번 실행에서 결과로 내보낸 기사 (정규화 URL -> 기사). 본문 중복은 여기 있는 기사와만 합친다
+        self.kept = {}
+
+    async def run(self, articles):
+        stages = [
+            ('fetch', self.fetch),
+            ('parse', self.parse),
+            ('classify', self.classify),
+            ('persist', self.persist),
+        ]
+        inboxes = [asyncio.Queue(self.queue_size) for _ in stages]
+        results = asyncio.Queue(self.queue_size)
+        outboxes = inboxes[1:] + [results]
+        next_workers = [self.workers[name] for name, _ in stages[1:]] + [1]
+
+        tasks = [asyncio.create_task(self._feed(articles, inboxes[0], self.workers['fetch']))]
+        for i, (name, handler) in enumerate(stages):
+            remaining = [self.workers[name]]
+            for _ in range(self.workers[name]):
+                tasks.append(asyncio.create_task(
+                    self._work(name, handler, inboxes[i], outboxes[i], results, remaining, next_workers[i])
+                ))
+
+        try:
+            while True:
+                item = await results.get()
+                if item is _DONE:
+                    break
+                index, _, article = item
+                yield index, article
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _feed(self, articles, inbox, workers):
+        for index, article in enumerate(articles):
+            await inbox.put((index, article, None))
+        for _ in range(workers):
+            await inbox.put(_DONE)
+
+    async def _work(self, name, handler, inbox, outbox, results, remaining, next_workers):
+        while True:
+            item = await inbox.get()
+            if item is _DONE:
+                break
+            index, article, payload = item
+            try:
+                payload = await handler(article, payload)
+            except Exception as e:
+                print(f"Error in {name} stage for '{article.get('url')}': {str(e)}")
+                continue
+            if payload is None:
+                continue
+            if isinstance(payload, StoredArticle):
+                await results.put((index, article, payload.article))
+                continue
+            await outbox.put((index, article, payload))
+
+        # 마지막으로 끝난 워커가 다음 단계에 종료를 알린다
+        remaining[0] -= 1
+        if remaining[0] == 0:
+            for _ in range(next_workers):
+                await outbox.put(_DONE)
+
+    async def fetch(self, article, _):
+        stored, html = await self.scraper.fetch_or_load_article(article)
+        if stored is not None:
+            key = canonicalize_url(stored['url'])
+            if key in self.kept:
+                # 앞선 기사의 중복 원본으로 이미 내보냈다
+                return None
+            self.kept[key] = stored
+            return StoredArticle(stored)
+        return html
+
+    async def parse(self, article, html):
+        extraction = await self.scraper.extract_article(article, html)
+        if extraction is None:
+            return None
+        duplicate_of = await asyncio.to_thread(self.scraper.find_duplicate_content, article, extraction.content)
+        if duplicate_of is None:
+            self.kept[canonicalize_url(article['url'])] = article
+            return extraction
+        kept = self.kept.get(canonicalize_url(duplicate_of))
+        if kept is not None:
+            print(f"Skipping '{article['url']}': near-duplicate of '{duplicate_of}'")
+            merge_duplicate(kept, article)
+            return None
+        # 이전 실행에서 저장한 기사와 겹치면 버리지 않고 저장된 원본을 대신 낸다
+        stored = await asyncio.to_thread(self.scraper.load_stored_article, duplicate_of)
+        if stored is None:
+            self.kept[canonicalize_url(article['url'])] = article
+            return extraction
+        merge_duplicate(stored, article)
+        self.kept[canonicalize_url(duplicate_of)] = stored
+        return StoredArticle(stored)
+
+    async def classify(self, article, extraction):
+        # 로컬 추출 신뢰도가 낮은 기사만 LLM 분류를 거친다
+        return await self.scraper.apply_extraction(article, extraction)
+
+    async def persist(self, article, _):
+        await asyncio.to_thread(self.scraper.save_article, article)
+        return article
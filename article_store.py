@@ -0,0 +1,295 @@
+import hashlib
+import json
+import os
+import sqlite3
+import struct
+import threading
+import time
+import zlib
+from datetime import datetime
+from dedup import NearDuplicateIndex
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+try:
+    from compression import zstd  # Python 3.14+
+except ImportError:
+    try:
+        import zstandard as zstd
+    except ImportError:
+        zstd = None
+
+
+# 레코드 = [프레임 길이(4바이트)][crc32(4바이트)][압축된 JSON 한 줄]. 레코드마다 따로 압축해서 오프셋만으로 바로 읽는다
+RECORD_HEADER = struct.Struct('>II')
+CODECS = {
+    '.zst': (lambda data: zstd.compress(data, level=3), lambda data: zstd.decompress(data)),
+    '.zz': (lambda data: zlib.compress(data, 6), zlib.decompress),
+}
+
+
+def url_hash(url):
+    return hashlib.blake2b(url.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def lock_file(f):
+    # 같은 세그먼트에 쓰는 다른 프로세스와 겹치지 않도록 파일 전체에 배타 잠금을 건다
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+
+
+def unlock_file(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def find_next_record(f, offset):
+    # offset 다음 바이트부터 길이와 crc32가 맞는 레코드 머리를 찾는다. 없으면 None
+    f.seek(offset + 1)
+    data = f.read()
+    for i in range(len(data) - RECORD_HEADER.size + 1):
+        length, checksum = RECORD_HEADER.unpack_from(data, i)
+        end = i + RECORD_HEADER.size + length
+        if length and end <= len(data) and zlib.crc32(data[i + RECORD_HEADER.size:end]) == checksum:
+            return offset + 1 + i
+    return None
+
+
+def read_records(path, start=0):
+    # 세그먼트를 start부터 읽어 (offset, 압축 프레임)을 돌려준다.
+    # 쓰다 죽은 프로세스가 남긴 깨진 레코드 뒤에도 다른 프로세스가 이어 썼을 수 있으므로 다음 온전한 레코드부터 계속 읽는다
+    with open(path, 'rb') as f:
+        f.seek(start)
+        offset = start
+        while True:
+            header = f.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                if header:
+                    print(f"Truncated record in {path} at offset {offset}")
+                return
+            length, checksum = RECORD_HEADER.unpack(header)
+            frame = f.read(length)
+            if len(frame) < length or zlib.crc32(frame) != checksum:
+                print(f"Corrupt record in {path} at offset {offset}")
+                offset = find_next_record(f, offset)
+                if offset is None:
+                    return
+                f.seek(offset)
+                continue
+            yield offset, frame
+            offset += RECORD_HEADER.size + length
+
+
+class ArticleStore:
+    # 기사를 날짜별 압축 JSONL 세그먼트에 이어 쓰고, URL 해시 -> (세그먼트, 오프셋) 인덱스와
+    # ETag/Last-Modified 검증값을 SQLite에 기록한다
+    def __init__(self, base_dir="scraped_news", max_age=6 * 3600, max_segment_bytes=64 * 1024 * 1024):
+        self.base_dir = base_dir
+        self.max_age = max_age
+        self.max_segment_bytes = max_segment_bytes
+        self.segment_dir = os.path.join(self.base_dir, "segments")
+        os.makedirs(self.segment_dir, exist_ok=True)
+        self.extension = '.zst' if zstd is not None else '.zz'
+        self.compress = CODECS[self.extension][0]
+        self.db_path = os.path.join(self.base_dir, "article_index.db")
+        self.lock = threading.Lock()
+        self.write_lock = threading.Lock()
+        self.writer = None
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA busy_timeout=5000")
+        self.create_table()
+        self.dedup_index = NearDuplicateIndex(self.conn, self.lock)
+
+    def create_table(self):
+        with self.lock:
+            self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS article_offsets
+            (url_hash TEXT PRIMARY KEY,
+             url TEXT,
+             segment TEXT,
+             offset INTEGER,
+             length INTEGER,
+             etag TEXT,
+             last_modified TEXT,
+             fetched_at REAL,
+             checked_at REAL)
+            ''')
+            self.conn.commit()
+            # 예전 버전이 기사마다 JSON 파일로 저장한 인덱스가 있으면 조회할 때 같이 본다
+            self.has_legacy_index = self.conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'article_index'"
+            ).fetchone() is not None
+
+    def lookup(self, url):
+        keys = ("url", "segment", "offset", "length", "etag", "last_modified", "fetched_at", "checked_at")
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT url, segment, offset, length, etag, last_modified, fetched_at, checked_at "
+                "FROM article_offsets WHERE url_hash = ?",
+                (url_hash(url),),
+            ).fetchone()
+            if row is None and self.has_legacy_index:
+                keys = ("url", "path", "etag", "last_modified", "fetched_at", "checked_at")
+                row = self.conn.execute(
+                    "SELECT url, path, etag, last_modified, fetched_at, checked_at FROM article_index WHERE url = ?",
+                    (url,),
+                ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(keys, row))
+
+    def is_fresh(self, entry):
+        return time.time() - entry["checked_at"] < self.max_age
+
+    def conditional_headers(self, entry):
+        headers = {}
+        if entry is None:
+            return headers
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def load(self, entry):
+        try:
+            if "path" in entry:
+                with open(entry["path"], 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            with open(os.path.join(self.segment_dir, entry["segment"]), 'rb') as f:
+                f.seek(entry["offset"])
+                record = f.read(entry["length"])
+            length, checksum = RECORD_HEADER.unpack_from(record)
+            frame = record[RECORD_HEADER.size:]
+            if len(frame) != length or zlib.crc32(frame) != checksum:
+                return None
+            return json.loads(self.decompress(entry["segment"], frame))
+        except (OSError, ValueError, struct.error, zlib.error) as e:
+            print(f"Error loading stored article {entry.get('url')}: {str(e)}")
+            return None
+
+    def decompress(self, segment, frame):
+        extension = os.path.splitext(segment)[1]
+        if extension == '.zst' and zstd is None:
+            raise ValueError(f"zstd is not installed, cannot read {segment}")
+        return CODECS[extension][1](frame)
+
+    def touch(self, url):
+        with self.lock:
+            self.conn.execute("UPDATE article_offsets SET checked_at = ? WHERE url_hash = ?", (time.time(), url_hash(url)))
+            self.conn.commit()
+
+    def segments(self, days=None):
+        names = sorted(name for name in os.listdir(self.segment_dir) if os.path.splitext(name)[1] in CODECS)
+        if days is not None:
+            names = [name for name in names if name.split('-', 1)[0] in days]
+        return names
+
+    def _writer_for(self, date_str):
+        # 오늘 날짜의 마지막 세그먼트에 이어 쓰고, max_segment_bytes를 넘으면 다음 번호로 넘어간다
+        if self.writer is not None and self.writer[0].startswith(date_str):
+            name, f = self.writer
+            if os.fstat(f.fileno()).st_size < self.max_segment_bytes:
+                return name, f
+            f.close()
+            number = int(name.split('-')[1].split('.')[0]) + 1
+        else:
+            if self.writer is not None:
+                self.writer[1].close()
+            existing = self.segments([date_str])
+            number = int(existing[-1].split('-')[1].split('.')[0]) if existing else 0
+        name = f"{date_str}-{number:04d}.jsonl{self.extension}"
+        self.writer = (name, open(os.path.join(self.segment_dir, name), 'ab'))
+        return self.writer
+
+    def append(self, article):
+        data = (json.dumps(article, ensure_ascii=False) + "\n").encode('utf-8')
+        frame = self.compress(data)
+        record = RECORD_HEADER.pack(len(frame), zlib.crc32(frame)) + frame
+        date_str = datetime.now().strftime("%Y%m%d")
+        with self.write_lock:
+            name, f = self._writer_for(date_str)
+            lock_file(f)
+            try:
+                # 다른 프로세스가 먼저 이어 썼을 수 있으므로 잠근 뒤에 끝 위치를 다시 잡는다
+                offset = f.seek(0, os.SEEK_END)
+                f.write(record)
+                f.flush()
+            finally:
+                unlock_file(f)
+        return name, offset, len(record)
+
+    def save(self, article):
+        # 레코드를 다 쓴 뒤에 인덱스를 갱신하므로, 읽는 쪽은 완성된 레코드만 보게 된다
+        segment, offset, length = self.append(article)
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO article_offsets "
+                "(url_hash, url, segment, offset, length, etag, last_modified, fetched_at, checked_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (url_hash(article['url']), article['url'], segment, offset, length,
+                 article.get('etag'), article.get('last_modified'), now, now),
+            )
+            self.conn.commit()
+        return os.path.join(self.segment_dir, segment)
+
+    def scan(self, days=None, latest_only=False):
+        # 분석용 순차 읽기. latest_only면 같은 URL을 다시 저장한 경우 인덱스가 가리키는 최신 레코드만 낸다
+        current = None
+        if latest_only:
+            with self.lock:
+                current = set(self.conn.execute("SELECT segment, offset FROM article_offsets").fetchall())
+        for segment, offset, _, article in self.iter_records(days):
+            if current is None or (segment, offset) in current:
+                yield article
+
+    def iter_records(self, days=None, start=None):
+        # (세그먼트, 오프셋, 레코드 길이, 기사)를 순서대로 낸다. start={세그먼트: 오프셋}이면 그 위치부터 이어 읽는다
+        start = start or {}
+        for segment in self.segments(days):
+            for offset, frame in read_records(os.path.join(self.segment_dir, segment), start.get(segment, 0)):
+                try:
+                    article = json.loads(self.decompress(segment, frame))
+                except (ValueError, zlib.error) as e:
+                    print(f"Error reading {segment} at offset {offset}: {str(e)}")
+                    continue
+                yield segment, offset, RECORD_HEADER.size + len(frame), article
+
+    def rebuild_index(self):
+        # 인덱스가 손상되거나 지워졌을 때 세그먼트를 다시 읽어 URL별 마지막 레코드로 채운다
+        entries = {}
+        for segment, offset, length, article in self.iter_records():
+            entries[url_hash(article['url'])] = (
+                article['url'], segment, offset, length, article.get('etag'), article.get('last_modified'),
+            )
+        # 검증 시각은 모르므로 0으로 두어 다음 조회 때 조건부 요청으로 다시 확인하게 한다
+        now = time.time()
+        with self.lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO article_offsets "
+                "(url_hash, url, segment, offset, length, etag, last_modified, fetched_at, checked_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(key,) + entry + (now, 0) for key, entry in entries.items()],
+            )
+            self.conn.commit()
+        return len(entries)
+
+    def close(self):
+        with self.write_lock:
+            if self.writer is not None:
+                self.writer[1].close()
+                self.writer = None
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,25 @@
+import asyncio
+import threading
+
+
+class AsyncLoopThread:
+    # 이벤트 루프 하나를 백그라운드 스레드에서 계속 돌린다.
+    # 스크레이퍼의 aiohttp 세션과 AsyncOpenAI 클라이언트가 같은 루프에 머물러 재사용된다.
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro, timeout=None):
+        return self.submit(coro).result(timeout)
+
+    def stop(self, timeout=5):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout)
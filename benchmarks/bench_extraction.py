@@ -0,0 +1,161 @@
+# 저장된 기사 페이지 코퍼스로 본문 추출 방식별 정확도와 지연 시간을 비교한다.
+# 코퍼스: <이름>.html 과 정답 <이름>.json ({"url": ..., "title": ..., "content": ...}) 쌍.
+# 정확도 수치는 실제 사이트에서 저장한 코퍼스를 줄 때만 낸다. 디렉터리를 주지 않으면 benchmarks.stub_services의
+# 합성 페이지로 각 방식이 도는지와 지연 시간만 보는 스모크 실행이다(합성 페이지는 추출기가 늘 맞히므로 정확도는 의미가 없다).
+# 사용법: python -m benchmarks.bench_extraction [<코퍼스 디렉터리>] [--pages 50] [--llm] [--min-confidence 0.6]
+#        --save-corpus <디렉터리>로 합성 코퍼스를 파일로 남겨 다른 벤치마크에서도 쓸 수 있다.
+#        --llm은 OpenAI를 부른다. OPENAI_BASE_URL로 benchmarks.fake_openai를 가리키면 오프라인으로 돈다.
+import argparse
+import asyncio
+import glob
+import json
+import os
+import random
+import re
+import time
+from collections import Counter
+
+from benchmarks.stub_services import make_labelled_page
+from html_extractor import extract_text, resolve_backend
+from local_extractor import LocalExtractor, parse_page
+
+
+def load_corpus(corpus_dir):
+    pages = []
+    for html_path in sorted(glob.glob(os.path.join(corpus_dir, '**', '*.htm*'), recursive=True)):
+        label_path = os.path.splitext(html_path)[0] + '.json'
+        if not os.path.exists(label_path):
+            continue
+        with open(html_path, encoding='utf-8', errors='replace') as f:
+            html = f.read()
+        with open(label_path, encoding='utf-8') as f:
+            label = json.load(f)
+        pages.append((html, label))
+    return pages
+
+
+def generate_corpus(count, seed):
+    rng = random.Random(seed)
+    return [make_labelled_page(index, rng) for index in range(count)]
+
+
+def save_corpus(pages, corpus_dir):
+    os.makedirs(corpus_dir, exist_ok=True)
+    for index, (html, label) in enumerate(pages):
+        with open(os.path.join(corpus_dir, f"{index:04d}.html"), 'w', encoding='utf-8') as f:
+            f.write(html)
+        with open(os.path.join(corpus_dir, f"{index:04d}.json"), 'w', encoding='utf-8') as f:
+            json.dump(label, f, ensure_ascii=False)
+
+
+def normalize(text):
+    return ' '.join((text or '').split()).casefold()
+
+
+def content_f1(predicted, expected):
+    predicted = Counter(re.findall(r"\w+", predicted or ''))
+    expected = Counter(re.findall(r"\w+", expected or ''))
+    overlap = sum((predicted & expected).values())
+    if not overlap:
+        return 0.0
+    precision = overlap / sum(predicted.values())
+    recall = overlap / sum(expected.values())
+    return 2 * precision * recall / (precision + recall)
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+class Methods:
+    def __init__(self, min_confidence, use_llm):
+        self.local_extractor = LocalExtractor()
+        self.hybrid_extractor = LocalExtractor()
+        self.backend = resolve_backend('auto')
+        self.min_confidence = min_confidence
+        self.scraper = None
+        self.llm_results = []
+        self.llm_calls = 0
+        if use_llm:
+            from content_scraper import ContentScraper
+            self.scraper = ContentScraper()
+
+    # 각 방식은 (제목, 본문, 측정 밖에서 더할 지연 ms)를 돌려준다
+    def paragraphs(self, index, html, label):
+        return None, extract_text(html, self.backend), 0
+
+    def local(self, index, html, label):
+        extraction = self.local_extractor.score(parse_page(html), label.get('url', ''))
+        return extraction.title, extraction.content, 0
+
+    def llm(self, index, html, label):
+        start = time.perf_counter()
+        classified = asyncio.run(self.scraper.classify_content(extract_text(html, self.backend)))
+        title, content = self.scraper.extract_title_and_content(classified)
+        self.llm_results.append((title, content, (time.perf_counter() - start) * 1000))
+        return title, content, 0
+
+    def hybrid(self, index, html, label):
+        # 스크레이퍼와 같은 경로: 로컬 추출 신뢰도가 낮을 때만 LLM을 쓴다.
+        # 두 번째 호출은 llm_cache에 걸리므로 llm 실행에서 잰 결과와 지연을 그대로 쓴다
+        extraction = self.hybrid_extractor.score(parse_page(html), label.get('url', ''))
+        if extraction.confidence >= self.min_confidence:
+            return extraction.title, extraction.content, 0
+        self.llm_calls += 1
+        return self.llm_results[index]
+
+
+def run(pages, name, fn, smoke=False):
+    latencies, titles, f1s = [], [], []
+    for index, (html, label) in enumerate(pages):
+        start = time.perf_counter()
+        title, content, extra_ms = fn(index, html, label)
+        latencies.append((time.perf_counter() - start) * 1000 + extra_ms)
+        if title is not None:
+            titles.append(normalize(title) == normalize(label.get('title')))
+        f1s.append(content_f1(content, label.get('content')))
+    title_accuracy = f"{sum(titles) / len(titles):.3f}" if titles and not smoke else "-"
+    content_f1_text = "-" if smoke else f"{sum(f1s) / len(f1s):.3f}"
+    print(f"{name:<11} {title_accuracy:>9} {content_f1_text:>10} "
+          f"{percentile(latencies, 0.5):>9.2f} {percentile(latencies, 0.95):>9.2f} {sum(latencies) / 1000:>9.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Article extraction accuracy vs latency benchmark")
+    parser.add_argument('corpus_dir', nargs='?',
+                        help="labelled corpus of saved pages; required for accuracy figures, "
+                             "a synthetic smoke run (latency only) is done when omitted")
+    parser.add_argument('--pages', type=int, default=50, help="synthetic pages for the smoke run")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--save-corpus', help="write the synthetic pages and labels to this directory")
+    parser.add_argument('--llm', action='store_true', help="also run the LLM classifier and the hybrid path")
+    parser.add_argument('--min-confidence', type=float, default=0.6)
+    args = parser.parse_args()
+
+    if args.corpus_dir:
+        pages = load_corpus(args.corpus_dir)
+        if not pages:
+            print(f"No labelled pages (*.html + *.json) found in {args.corpus_dir}")
+            return
+    else:
+        pages = generate_corpus(args.pages, args.seed)
+        if args.save_corpus:
+            save_corpus(pages, args.save_corpus)
+    smoke = not args.corpus_dir
+    methods = Methods(args.min_confidence, args.llm)
+    if smoke:
+        print(f"SMOKE RUN on {len(pages)} synthetic pages: latency only, accuracy needs a saved corpus_dir")
+    else:
+        print(f"{len(pages)} labelled pages")
+    print(f"{'method':<11} {'title acc':>9} {'content F1':>10} {'p50 ms':>9} {'p95 ms':>9} {'total s':>9}")
+    run(pages, 'paragraphs', methods.paragraphs, smoke)
+    run(pages, 'local', methods.local, smoke)
+    if args.llm:
+        run(pages, 'llm', methods.llm, smoke)
+        run(pages, 'hybrid', methods.hybrid, smoke)
+        print(f"hybrid sent {methods.llm_calls}/{len(pages)} pages to the LLM")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+# 저장된 기사 HTML 코퍼스로 추출 백엔드별 처리량을 비교한다.
+# 디렉터리를 주지 않으면 benchmarks.stub_services의 합성 기사 페이지를 쓴다.
+# 사용법: python -m benchmarks.bench_html_extractors [<html 디렉터리>] [--pages 200] [--repeat 3] [--workers 4]
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks.stub_services import load_pages
+from html_extractor import available_backends, extract_text
+
+
+def bench_inline(pages, backend, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for html in pages:
+            extract_text(html, backend)
+    return time.perf_counter() - start
+
+
+def bench_pool(pages, backend, repeat, workers):
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # 워커 기동 비용은 측정에서 제외한다
+        list(executor.map(extract_text, pages[:workers], [backend] * min(workers, len(pages))))
+        start = time.perf_counter()
+        for _ in range(repeat):
+            list(executor.map(extract_text, pages, [backend] * len(pages), chunksize=4))
+        return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTML extractor throughput benchmark")
+    parser.add_argument('corpus_dir', nargs='?', help="saved article HTML; synthetic pages are generated when omitted")
+    parser.add_argument('--pages', type=int, default=200, help="synthetic pages when no corpus is given")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--backends', nargs='*', default=available_backends())
+    args = parser.parse_args()
+
+    pages = load_pages(args.corpus_dir, args.pages, args.seed)
+    if not pages:
+        print(f"No HTML files found in {args.corpus_dir}")
+        return
+    total_mb = sum(len(html.encode('utf-8')) for html in pages) * args.repeat / (1024 * 1024)
+    print(f"{len(pages)} pages, {total_mb / args.repeat:.1f} MB, repeat={args.repeat}, workers={args.workers}")
+    print(f"{'backend':<12} {'mode':<8} {'pages/s':>10} {'MB/s':>8}")
+
+    for backend in args.backends:
+        for mode in ('inline', 'pool'):
+            if mode == 'inline':
+                elapsed = bench_inline(pages, backend, args.repeat)
+            else:
+                elapsed = bench_pool(pages, backend, args.repeat, args.workers)
+            pages_per_sec = len(pages) * args.repeat / elapsed
+            print(f"{backend:<12} {mode:<8} {pages_per_sec:>10.1f} {total_mb / elapsed:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,311 @@
+# 로컬 스텁 서버(benchmarks.stub_services)를 띄우고 트렌드 -> 검색 -> 스크랩 -> 생성 -> 검증 전체를 오프라인으로 잰다.
+# 처리량, 단계별 지연 백분위, 최대 RSS, API 호출 수를 JSON 리포트로 남기고 커밋 사이에 비교할 수 있다.
+# 사용법: python -m benchmarks.bench_pipeline [--keywords 8] [--articles 5] [--concurrency 4] [--output report.json]
+#        python -m benchmarks.bench_pipeline --error-rate article=0.05 --rate-limit-rate newsapi=0.1
+#        python -m benchmarks.bench_pipeline --compare base.json new.json [--fail-over 10]
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+from benchmarks.stub_services import FakeTrendReq, add_arguments, serve
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+KEYWORDS = ['부동산', '반도체', '금리', '축구', '축제', '환율', '선거', '전기차', '물가', '날씨', '증시', '수출']
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+class StageTimer:
+    # 스크레이퍼/생성기/검증기 인스턴스의 메서드를 감싸 단계별 소요 시간(ms)을 모은다
+    def __init__(self):
+        self.samples = {}
+
+    def add(self, stage, seconds):
+        self.samples.setdefault(stage, []).append(seconds * 1000)
+
+    def wrap(self, stage, fn):
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.add(stage, time.perf_counter() - start)
+        return timed
+
+    def wrap_async(self, stage, fn):
+        async def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await fn(*args, **kwargs)
+            finally:
+                self.add(stage, time.perf_counter() - start)
+        return timed
+
+    def summary(self):
+        return {
+            stage: {
+                "count": len(values),
+                "mean_ms": round(sum(values) / len(values), 2),
+                "p50_ms": round(percentile(values, 0.5), 2),
+                "p95_ms": round(percentile(values, 0.95), 2),
+                "p99_ms": round(percentile(values, 0.99), 2),
+                "max_ms": round(max(values), 2),
+            }
+            for stage, values in self.samples.items()
+        }
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def fetch_stats(port):
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}/_stats", timeout=5) as response:
+        return json.load(response)
+
+
+def start_stub(args, port):
+    # 스텁 서버는 별도 프로세스에서 돌려 측정 대상의 이벤트 루프, CPU, RSS와 섞이지 않게 한다
+    process = multiprocessing.Process(target=serve, args=(args, '127.0.0.1', port), daemon=True)
+    process.start()
+    deadline = time.time() + 15
+    while time.time() < deadline:
+        try:
+            fetch_stats(port)
+            return process
+        except OSError:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("stub server did not start")
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # 리눅스는 KB, macOS는 바이트 단위로 준다
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def instrument(timer, scraper, generator, validator):
+    for name, stage in (('search_articles', 'search'), ('fetch_news_from_newsapi', 'newsapi'),
+                        ('fetch_news_from_naver', 'naver'), ('fetch_or_load_article', 'fetch'),
+                        ('extract_article', 'parse'), ('apply_extraction', 'classify'),
+                        ('classify_content', 'llm_classify'), ('persist_articles', 'db_save')):
+        setattr(scraper, name, timer.wrap_async(stage, getattr(scraper, name)))
+    scraper.save_article = timer.wrap('persist', scraper.save_article)
+    scraper.get_trending_keywords = timer.wrap('trends', scraper.get_trending_keywords)
+    generator.generate_script = timer.wrap('generate', generator.generate_script)
+    validator.validate_script = timer.wrap('validate', validator.validate_script)
+    for prompt_builder in (generator.prompt_builder, validator.prompt_builder):
+        summarizer = prompt_builder._get_summarizer()
+        summarizer.summarize_contents = timer.wrap('summarize', summarizer.summarize_contents)
+
+
+async def run_keyword(timer, semaphore, scraper, generator, validator, keyword, limit, validate):
+    async with semaphore:
+        start = time.perf_counter()
+        articles = await scraper.get_news_by_keyword(keyword, limit)
+        articles = [article for article in articles if article.get('full_content')]
+        if articles:
+            script = await asyncio.to_thread(generator.generate_script, articles)
+            if validate:
+                await asyncio.to_thread(validator.validate_script, script, articles)
+        timer.add('keyword', time.perf_counter() - start)
+        return len(articles)
+
+
+async def run_all(timer, scraper, generator, validator, keywords, args):
+    semaphore = asyncio.Semaphore(args.concurrency)
+    try:
+        counts = await asyncio.gather(*[
+            run_keyword(timer, semaphore, scraper, generator, validator, keyword, args.articles, not args.no_validate)
+            for keyword in keywords
+        ])
+    finally:
+        await scraper.close_session()
+        scraper.html_extractor.shutdown()
+    return sum(counts)
+
+
+def run_benchmark(args):
+    port = free_port()
+    stub = start_stub(args, port)
+    workdir = tempfile.mkdtemp(prefix='bench_pipeline_')
+    original_dir = os.getcwd()
+    # 모듈들이 상대 경로(scraped_news/, *.db)를 쓰므로 빈 임시 디렉터리에서 캐시 없이 시작한다
+    sys.path.insert(0, REPO_DIR)
+    os.chdir(workdir)
+    os.environ['OPENAI_BASE_URL'] = f"http://127.0.0.1:{port}/v1"
+    try:
+        import rate_limiter
+        from content_scraper import ContentScraper
+        from llm_cache import get_llm_cache
+        from news_manager import NewsManager
+        from script_generator import ScriptGenerator
+        from script_validator import ScriptValidator
+        from tracing import tracer
+
+        # 스텁 기사는 모두 127.0.0.1 한 호스트에서 나오므로 호스트별 한도를 실제 여러 사이트만큼 늘려 둔다
+        rate_limiter.PROVIDER_LIMITS['article_host'] = {'requests_per_minute': args.host_rpm}
+        base_url = f"http://127.0.0.1:{port}"
+        scraper = ContentScraper(news_manager=NewsManager(), newsapi_url=f"{base_url}/newsapi/v2/everything",
+                                 naver_url=f"{base_url}/naver/v1/search/news.json")
+        generator = ScriptGenerator()
+        validator = ScriptValidator()
+        timer = StageTimer()
+        instrument(timer, scraper, generator, validator)
+
+        keywords = [KEYWORDS[i % len(KEYWORDS)] + ('' if i < len(KEYWORDS) else f" {i}")
+                    for i in range(args.keywords)]
+        scraper._pytrends = FakeTrendReq(keywords)
+        start = time.perf_counter()
+        try:
+            keywords = scraper.get_trending_keywords(args.keywords)
+        except ImportError:
+            print("pandas is not installed; skipping the trends stage")
+        articles = asyncio.run(run_all(timer, scraper, generator, validator, keywords, args))
+        elapsed = time.perf_counter() - start
+
+        return {
+            "meta": {
+                "commit": git_commit(),
+                "timestamp": datetime.now().isoformat(timespec='seconds'),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "args": {key: value for key, value in vars(args).items() if key not in ('compare', 'output')},
+            },
+            "throughput": {
+                "seconds": round(elapsed, 3),
+                "keywords": len(keywords),
+                "articles": articles,
+                "keywords_per_s": round(len(keywords) / elapsed, 3),
+                "articles_per_s": round(articles / elapsed, 3),
+            },
+            "stages": timer.summary(),
+            "peak_rss_mb": peak_rss_mb(),
+            "calls": fetch_stats(port),
+            "limiters": rate_limiter.limiter_stats(),
+            "llm_cache": get_llm_cache().stats(),
+            # 코드 안에 심은 스팬 집계 (벤치마크의 메서드 래핑과 별개로 tracing 모듈이 모은 값)
+            "spans": tracer.stats(),
+        }
+    finally:
+        os.chdir(original_dir)
+        stub.terminate()
+        stub.join(5)
+        if args.keep_workdir:
+            print(f"Work directory kept at {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+def print_report(report):
+    throughput = report["throughput"]
+    print(f"{throughput['keywords']} keywords, {throughput['articles']} articles in {throughput['seconds']:.2f}s "
+          f"({throughput['keywords_per_s']:.2f} keywords/s, {throughput['articles_per_s']:.2f} articles/s), "
+          f"peak RSS {report['peak_rss_mb']} MB")
+    print(f"{'stage':<13} {'count':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for stage, stats in sorted(report["stages"].items(), key=lambda item: -item[1]["p95_ms"]):
+        print(f"{stage:<13} {stats['count']:>6} {stats['p50_ms']:>9.1f} {stats['p95_ms']:>9.1f} "
+              f"{stats['p99_ms']:>9.1f} {stats['max_ms']:>9.1f}")
+    calls = report["calls"]
+    print("API calls:", ', '.join(f"{service}={count}" for service, count in sorted(calls["requests"].items())))
+    if calls["errors"] or calls["rate_limited"]:
+        print("Injected:", ', '.join(f"{service} 5xx={count}" for service, count in calls["errors"].items()),
+              ', '.join(f"{service} 429={count}" for service, count in calls["rate_limited"].items()))
+
+
+def flatten(data, prefix=''):
+    values = {}
+    for key, value in data.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            values.update(flatten(value, f"{name}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            values[name] = value
+    return values
+
+
+def compare(base_path, new_path, fail_over):
+    # 처리량(_per_s)은 클수록, 나머지 지연/메모리/호출 수는 작을수록 좋다. 단계 지연은 흔들림이 적은 p50/p95만 비교한다
+    reports = []
+    for path in (base_path, new_path):
+        with open(path, encoding='utf-8') as f:
+            report = json.load(f)
+        reports.append(flatten({key: report.get(key) or {} for key in ('throughput', 'stages', 'calls')}) |
+                       {"peak_rss_mb": report.get("peak_rss_mb") or 0})
+    base, new = reports
+    print(f"{'metric':<40} {'base':>12} {'new':>12} {'change':>9}")
+    regressions = 0
+    for key in sorted(base.keys() & new.keys()):
+        if key.endswith(('.count', '.mean_ms', '.p99_ms', '.max_ms')) or not base[key]:
+            continue
+        change = (new[key] - base[key]) / base[key] * 100
+        worse = -change if key.endswith('_per_s') else change
+        flag = ''
+        if fail_over is not None and worse > fail_over:
+            flag = ' !'
+            regressions += 1
+        print(f"{key:<40} {base[key]:>12.2f} {new[key]:>12.2f} {change:>+8.1f}%{flag}")
+    if regressions:
+        print(f"{regressions} metrics regressed by more than {fail_over}%")
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline end-to-end pipeline benchmark against local stub services")
+    parser.add_argument('--keywords', type=int, default=8)
+    parser.add_argument('--articles', type=int, default=5, help="articles scraped per keyword")
+    parser.add_argument('--concurrency', type=int, default=4, help="keywords processed at the same time")
+    parser.add_argument('--no-validate', action='store_true')
+    parser.add_argument('--host-rpm', type=int, default=6000, help="per-host article limit while on the stub host")
+    parser.add_argument('--output', help="write the JSON report here")
+    parser.add_argument('--keep-workdir', action='store_true')
+    parser.add_argument('--compare', nargs=2, metavar=('BASE', 'NEW'), help="compare two JSON reports")
+    parser.add_argument('--fail-over', type=float, help="with --compare, exit 1 if a metric regresses more (%%)")
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(compare(args.compare[0], args.compare[1], args.fail_over))
+
+    report = run_benchmark(args)
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"Report written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+# 합성 리포트 묶음을 한 스레드와 프로세스 풀에서 그려 초당 리포트/페이지 수를 비교한다.
+# 사용법: python -m benchmarks.bench_reports [--reports 100] [--articles 5] [--workers 4]
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from report_renderer import ReportRenderer
+
+SENTENCES = [
+    "정부는 오늘 새로운 부동산 대책을 발표했다.",
+    "반도체 수출이 석 달 연속 증가하면서 시장의 기대가 커지고 있다.",
+    "전문가들은 금리 인하 시점이 예상보다 늦어질 수 있다고 전망했다.",
+    "The central bank kept interest rates unchanged for the third meeting in a row.",
+    "지역 축제에는 주말 동안 10만 명이 넘는 관광객이 몰렸다.",
+    "Analysts said the results were better than expected & shares rose <3%> in early trading.",
+]
+
+
+def make_text(rng, sentences):
+    paragraphs = []
+    for _ in range(max(1, sentences // 5)):
+        paragraphs.append(" ".join(rng.choice(SENTENCES) for _ in range(5)))
+    return "\n\n".join(paragraphs)
+
+
+def make_jobs(count, articles, output_dir, seed=0):
+    rng = random.Random(seed)
+    jobs = []
+    for i in range(count):
+        jobs.append({
+            "filepath": os.path.join(output_dir, f"report_{i:04d}.pdf"),
+            "script": make_text(rng, 30),
+            "articles": [
+                {"title": f"기사 {i}-{j}", "url": f"https://news.example.com/{i}/{j}",
+                 # 짧은 기사와 아주 긴 기사를 섞는다
+                 "full_content": make_text(rng, rng.choice([20, 80, 400]))}
+                for j in range(articles)
+            ],
+            "presenter_name": "진행자",
+            "style": "아나운서",
+            "date_str": "20240101",
+            "keywords": ["벤치마크"],
+        })
+    return jobs
+
+
+def bench(jobs, workers):
+    renderer = ReportRenderer(max_workers=workers)
+    try:
+        if workers:
+            # 워커 기동과 폰트 등록 비용은 측정에서 제외한다
+            renderer.render_batch(jobs[:workers])
+        start = time.perf_counter()
+        results = renderer.render_batch(jobs)
+        elapsed = time.perf_counter() - start
+    finally:
+        renderer.shutdown()
+    return elapsed, sum(pages for _, pages in results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PDF report rendering benchmark")
+    parser.add_argument('--reports', type=int, default=100)
+    parser.add_argument('--articles', type=int, default=5)
+    parser.add_argument('--workers', type=int, nargs='*', default=[0, os.cpu_count()],
+                        help="0 renders inline on the calling thread")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        jobs = make_jobs(args.reports, args.articles, output_dir)
+        print(f"{args.reports} reports x {args.articles} articles")
+        print(f"{'workers':<8} {'seconds':>8} {'reports/s':>10} {'pages/s':>9}")
+        for workers in args.workers:
+            elapsed, pages = bench(jobs, workers)
+            print(f"{workers:<8} {elapsed:>8.2f} {len(jobs) / elapsed:>10.1f} {pages / elapsed:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+# 모듈별 import 시간을 -X importtime으로 재서 시작 시간이 다시 느려지지 않는지 확인한다.
+# 사용법: python -m benchmarks.bench_startup [main content_scraper ...] [--repeat 5] [--top 10] [--budget-ms 800]
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+DEFAULT_MODULES = ['main', 'newsbot', 'application', 'content_scraper', 'script_generator',
+                   'script_validator', 'pdf_generator', 'trend_tracker']
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def parse_importtime(stderr):
+    # "import time:      self [us] | cumulative | imported package" 형식의 줄을 읽는다
+    timings = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        # 중첩된 import는 이름 앞에 두 칸씩 들여쓰기가 붙는다
+        name = name[1:].rstrip()
+        depth = (len(name) - len(name.lstrip())) // 2
+        timings.append((name.strip(), depth, int(self_us), int(cumulative_us)))
+    return timings
+
+
+def measure(module):
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=REPO_DIR, capture_output=True, text=True,
+    )
+    wall = time.perf_counter() - start
+    if proc.returncode != 0:
+        error = proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else 'unknown error'
+        return None, wall, error
+    timings = parse_importtime(proc.stderr)
+    return timings, wall, None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time startup benchmark")
+    parser.add_argument('modules', nargs='*', default=DEFAULT_MODULES)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--top', type=int, default=10, help="slowest imports to list per module")
+    parser.add_argument('--budget-ms', type=float, help="exit with 1 if any module's median import exceeds this")
+    args = parser.parse_args()
+
+    over_budget = []
+    print(f"{'module':<20} {'import ms':>10} {'wall ms':>10}")
+    for module in args.modules:
+        runs = []
+        for _ in range(args.repeat):
+            timings, wall, error = measure(module)
+            if error:
+                break
+            # 대상 모듈 줄은 자식 import들 뒤에 나온다. 그 앞의 depth 1 줄이 직접 불러온 모듈이다
+            end = max(i for i, entry in enumerate(timings) if entry[0] == module and entry[1] == 0)
+            start = end
+            while start > 0 and timings[start - 1][1] > 0:
+                start -= 1
+            direct = [entry for entry in timings[start:end] if entry[1] == 1]
+            runs.append((timings[end][3] / 1000, wall * 1000, direct))
+        if error:
+            print(f"{module:<20} failed: {error}")
+            continue
+
+        # 가장 가운데 실행의 세부 내역을 보여준다
+        runs.sort(key=lambda run: run[0])
+        import_ms, wall_ms, direct = runs[len(runs) // 2]
+        print(f"{module:<20} {import_ms:>10.1f} {wall_ms:>10.1f}")
+        for name, _, _, cumulative in sorted(direct, key=lambda entry: -entry[3])[:args.top]:
+            print(f"    {name:<28} {cumulative / 1000:>8.1f} ms")
+        if args.budget_ms is not None and import_ms > args.budget_ms:
+            over_budget.append(module)
+
+    if over_budget:
+        print(f"Over budget ({args.budget_ms} ms): {', '.join(over_budget)}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+# OpenAI chat completions API를 흉내 내는 로컬 서버. stream=True면 SSE로 토큰을 나눠 보낸다.
+# 사용법: python -m benchmarks.fake_openai --port 8089 --first-token-delay 0.3 --token-delay 0.02
+#        OPENAI_BASE_URL=http://127.0.0.1:8089/v1 python main.py
+import argparse
+import asyncio
+import json
+import time
+import uuid
+
+from aiohttp import web
+
+
+def make_reply(messages, tokens):
+    prompt = messages[-1]['content'] if messages else ''
+    if 'JSON' in prompt:
+        # 문장 검증처럼 JSON 답을 요구하는 호출에는 고칠 것이 없다는 답을 준다
+        return ['{"sentences": []}']
+    head = ' '.join(prompt.split()[:20])
+    words = [f"제목: Fake reply for {head}"]
+    words += [f"token{i}" for i in range(tokens)]
+    return words
+
+
+class FakeOpenAI:
+    def __init__(self, first_token_delay=0.2, token_delay=0.01, tokens=200):
+        self.first_token_delay = first_token_delay
+        self.token_delay = token_delay
+        self.tokens = tokens
+        self.calls = 0
+        self.stream_calls = 0
+
+    def chunk(self, completion_id, model, delta, finish_reason=None):
+        return {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }
+
+    async def chat_completions(self, request):
+        body = await request.json()
+        self.calls += 1
+        model = body.get('model', 'gpt-3.5-turbo')
+        tokens = min(self.tokens, body.get('max_tokens') or self.tokens)
+        words = make_reply(body.get('messages', []), tokens)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        await asyncio.sleep(self.first_token_delay)
+
+        if not body.get('stream'):
+            await asyncio.sleep(self.token_delay * len(words))
+            return web.json_response({
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": ' '.join(words)},
+                    "finish_reason": "stop",
+                }],
+                "usage": {"prompt_tokens": 0, "completion_tokens": len(words), "total_tokens": len(words)},
+            })
+
+        self.stream_calls += 1
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"})
+        await response.prepare(request)
+
+        async def send(payload):
+            await response.write(f"data: {payload}\n\n".encode('utf-8'))
+
+        await send(json.dumps(self.chunk(completion_id, model, {"role": "assistant", "content": ""})))
+        for i, word in enumerate(words):
+            await send(json.dumps(self.chunk(completion_id, model, {"content": word if i == 0 else ' ' + word}),
+                                  ensure_ascii=False))
+            await asyncio.sleep(self.token_delay)
+        await send(json.dumps(self.chunk(completion_id, model, {}, finish_reason="stop")))
+        await send("[DONE]")
+        await response.write_eof()
+        return response
+
+    def add_routes(self, app, prefix='/v1'):
+        app.router.add_post(f'{prefix}/chat/completions', self.chat_completions)
+
+
+def make_app(**kwargs):
+    app = web.Application()
+    FakeOpenAI(**kwargs).add_routes(app)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local fake OpenAI chat completions server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--first-token-delay', type=float, default=0.2)
+    parser.add_argument('--token-delay', type=float, default=0.01)
+    parser.add_argument('--tokens', type=int, default=200)
+    args = parser.parse_args()
+    app = make_app(first_token_delay=args.first_token_delay, token_delay=args.token_delay, tokens=args.tokens)
+    web.run_app(app, host=args.host, port=args.port)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,298 @@
+# NewsAPI, Naver 뉴스 검색, 기사 호스트, OpenAI를 한 포트에서 흉내 내는 로컬 스텁 서버.
+# 서비스마다 지연, 5xx 오류 비율, 429 비율을 따로 줄 수 있고 /_stats로 호출 수를 돌려준다.
+# 사용법: python -m benchmarks.stub_services --port 8090 [--corpus <html 디렉터리>] [--fixtures <json 디렉터리>]
+#        --error-rate article=0.05 --rate-limit-rate newsapi=0.1 --latency-ms article=120
+import argparse
+import asyncio
+import glob
+import hashlib
+import html
+import json
+import os
+import random
+import re
+import time
+from collections import Counter
+
+from aiohttp import web
+
+from benchmarks.fake_openai import FakeOpenAI
+
+SERVICES = ('newsapi', 'naver', 'article', 'openai')
+
+SUBJECTS = ["정부는", "한국은행은", "대표팀은", "회사 측은", "전문가들은", "시 당국은", "연구진은", "야당은"]
+PREDICATES = [
+    "오늘 {name} 관련 대책을 발표하고 {n}억 원을 추가로 투입하기로 했다.",
+    "{name} 지역의 수출이 석 달 연속 {n}% 늘었다며 하반기 전망을 올려 잡았다.",
+    "{name} 선수의 결승골로 {n}대 1 역전승을 거두며 본선 진출 가능성을 높였다고 밝혔다.",
+    "{name} 신제품 가격을 {n}만 원으로 책정하고 다음 달 1일부터 사전 예약을 받는다고 설명했다.",
+    "{name} 사업의 효과가 나타나기까지 적어도 {n}년은 걸릴 것이라며 신중한 접근을 주문했다.",
+    "주말 동안 {name} 축제에 {n}만 명이 넘는 관광객이 몰렸고 인근 상권 매출도 크게 늘었다고 집계했다.",
+]
+TOPICS = ["부동산 대책", "반도체 수출", "기준금리", "월드컵 예선", "지역 축제", "신제품 출시", "환율 급등", "총선 공약"]
+
+
+def make_name(rng):
+    # 페이지마다 다른 고유명사를 넣어 제목 중복 제거와 본문 SimHash가 실제 기사처럼 서로 다르게 보게 한다
+    return ''.join(chr(rng.randrange(0xAC00, 0xD7A4)) for _ in range(rng.choice([2, 3])))
+
+
+def make_sentence(rng):
+    if rng.random() < 0.1:
+        return f"The {make_name(rng)} index rose {rng.randrange(1, 30)}% as investors weighed the latest data."
+    return f"{rng.choice(SUBJECTS)} " + rng.choice(PREDICATES).format(name=make_name(rng), n=rng.randrange(2, 500))
+
+
+def make_article(rng):
+    title = f"{make_name(rng)} {rng.choice(TOPICS)}, {make_name(rng)} {make_name(rng)} 발표"
+    paragraphs = [f"{make_sentence(rng)} {make_sentence(rng)}" for _ in range(rng.choice([3, 8, 20, 60]))]
+    return title, paragraphs
+
+
+def make_page(index, rng):
+    return render_page(*make_article(rng), rng)
+
+
+def make_labelled_page(index, rng):
+    # 추출 벤치마크용으로 페이지와 정답(제목, 본문)을 함께 만든다
+    title, paragraphs = make_article(rng)
+    label = {"url": f"https://stub.news/articles/{index}", "title": title, "content": "\n".join(paragraphs)}
+    return render_page(title, paragraphs, rng), label
+
+
+def render_page(title, paragraphs, rng):
+    # 내비게이션과 관련 기사 목록 사이에 본문 컨테이너가 있는 흔한 기사 페이지 모양
+    body = ''.join(f"<p>{paragraph}</p>\n" for paragraph in paragraphs)
+    related = ''.join(f'<li><a href="/articles/{rng.randrange(1000)}">관련 기사 {i}</a></li>' for i in range(8))
+    return f"""<!doctype html>
+<html><head><meta charset="utf-8"><title>{title} - 스텁 뉴스</title>
+<meta property="og:title" content="{title}"></head>
+<body><nav><a href="/">홈</a><a href="/politics">정치</a><a href="/economy">경제</a></nav>
+<div class="wrap"><h1>{title}</h1><div id="article-body">
+{body}</div>
+<ul class="related">{related}</ul>
+<p class="copyright">ⓒ 스텁 뉴스. 무단 전재 및 재배포 금지</p></div>
+<footer>스텁 뉴스</footer></body></html>"""
+
+
+def page_title(page, index):
+    match = re.search(r"<title[^>]*>(.*?)</title>", page, re.IGNORECASE | re.DOTALL)
+    return html.unescape(' '.join(match.group(1).split())) if match else f"기사 {index}"
+
+
+def load_pages(corpus_dir, count, seed):
+    # 저장된 기사 HTML이 있으면 그대로 쓰고, 없으면 합성 페이지를 만든다
+    pages = []
+    if corpus_dir:
+        for path in sorted(glob.glob(os.path.join(corpus_dir, '**', '*.htm*'), recursive=True)):
+            with open(path, encoding='utf-8', errors='replace') as f:
+                pages.append(f.read())
+    if not pages:
+        rng = random.Random(seed)
+        pages = [make_page(i, rng) for i in range(count)]
+    return pages
+
+
+def load_fixture(fixtures_dir, name):
+    # 녹화해 둔 검색 응답(newsapi.json, naver.json). 기사 URL은 스텁 기사 호스트로 바꿔 쓴다
+    if not fixtures_dir:
+        return None
+    path = os.path.join(fixtures_dir, name)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def parse_rates(values, default=0.0):
+    # "article=0.05" 또는 "0.05"(모든 서비스) 형식
+    rates = {service: default for service in SERVICES}
+    for value in values or []:
+        if '=' in value:
+            service, rate = value.split('=', 1)
+            rates[service] = float(rate)
+        else:
+            rates = {service: float(value) for service in SERVICES}
+    return rates
+
+
+class StubServices:
+    def __init__(self, pages, latency_ms=None, error_rate=None, rate_limit_rate=None, fixtures_dir=None,
+                 seed=0, openai_options=None):
+        self.pages = pages
+        self.etags = [hashlib.md5(page.encode('utf-8')).hexdigest() for page in pages]
+        # 검색 결과 제목은 해당 페이지 제목을 그대로 써서 NewsAPI와 Naver 결과가 겹치면 중복 제거되게 한다
+        self.titles = [page_title(page, index) for index, page in enumerate(pages)]
+        self.latency_ms = latency_ms or {service: 0.0 for service in SERVICES}
+        self.error_rate = error_rate or {service: 0.0 for service in SERVICES}
+        self.rate_limit_rate = rate_limit_rate or {service: 0.0 for service in SERVICES}
+        self.newsapi_fixture = load_fixture(fixtures_dir, 'newsapi.json')
+        self.naver_fixture = load_fixture(fixtures_dir, 'naver.json')
+        self.rng = random.Random(seed)
+        self.openai = FakeOpenAI(**(openai_options or {}))
+        self.requests = Counter()
+        self.errors = Counter()
+        self.rate_limited = Counter()
+        self.not_modified = 0
+        self.bytes_sent = Counter()
+
+    def service_for(self, path):
+        for prefix, service in (('/newsapi/', 'newsapi'), ('/naver/', 'naver'), ('/articles/', 'article'),
+                                ('/v1/', 'openai')):
+            if path.startswith(prefix):
+                return service
+        return None
+
+    @web.middleware
+    async def faults(self, request, handler):
+        service = self.service_for(request.path)
+        if service is None:
+            return await handler(request)
+        self.requests[service] += 1
+        # 지연은 평균 주변 ±50%로 흔든다. OpenAI는 fake_openai의 토큰 지연을 따로 쓴다
+        latency = self.latency_ms[service]
+        if latency:
+            await asyncio.sleep(latency * self.rng.uniform(0.5, 1.5) / 1000)
+        roll = self.rng.random()
+        if roll < self.rate_limit_rate[service]:
+            self.rate_limited[service] += 1
+            return web.json_response({"error": "rate limited"}, status=429, headers={"Retry-After": "1"})
+        if roll < self.rate_limit_rate[service] + self.error_rate[service]:
+            self.errors[service] += 1
+            return web.json_response({"error": "stub failure"}, status=503)
+        response = await handler(request)
+        # 스트리밍 응답(StreamResponse)에는 body가 없다
+        if getattr(response, 'body', None) is not None:
+            self.bytes_sent[service] += len(response.body)
+        return response
+
+    def article_url(self, request, index):
+        return f"{request.scheme}://{request.host}/articles/{index % len(self.pages)}"
+
+    def pick(self, query, count, offset):
+        # 같은 검색어에는 항상 같은 기사 묶음을 돌려줘서 실행마다 결과가 같게 한다
+        start = int(hashlib.md5(query.encode('utf-8')).hexdigest(), 16) % len(self.pages)
+        return [start + offset + i for i in range(count)]
+
+    async def newsapi(self, request):
+        query = request.query.get('q', '')
+        page_size = int(request.query.get('pageSize', 10))
+        page = int(request.query.get('page', 1))
+        if self.newsapi_fixture is not None:
+            articles = [dict(article) for article in self.newsapi_fixture.get('articles', [])[:page_size]]
+        else:
+            articles = [{"source": {"id": None, "name": "Stub News"}, "title": self.titles[index % len(self.pages)],
+                         "description": f"{query}에 대한 스텁 기사 요약", "publishedAt": "2024-01-01T00:00:00Z"}
+                        for index in self.pick(query, page_size, (page - 1) * page_size)]
+        for index, article in zip(self.pick(query, len(articles), (page - 1) * page_size), articles):
+            article['url'] = self.article_url(request, index)
+        return web.json_response({"status": "ok", "totalResults": len(articles), "articles": articles})
+
+    async def naver(self, request):
+        query = request.query.get('query', '')
+        display = int(request.query.get('display', 10))
+        start = int(request.query.get('start', 1))
+        if self.naver_fixture is not None:
+            items = [dict(item) for item in self.naver_fixture.get('items', [])[:display]]
+        else:
+            # NewsAPI와 절반쯤 겹치게 해서 중복 제거 경로도 지나가게 한다
+            items = [{"title": self.titles[index % len(self.pages)], "description": f"<b>{query}</b> 네이버 스텁 요약",
+                      "pubDate": "Mon, 01 Jan 2024 09:00:00 +0900"}
+                     for index in self.pick(query, display, start - 1 + display // 2)]
+        for index, item in zip(self.pick(query, len(items), start - 1 + display // 2), items):
+            item['link'] = item['originallink'] = self.article_url(request, index)
+        return web.json_response({"total": len(items), "start": start, "display": display, "items": items})
+
+    async def article(self, request):
+        index = int(request.match_info['index']) % len(self.pages)
+        etag = f'"{self.etags[index]}"'
+        if request.headers.get('If-None-Match') == etag:
+            self.not_modified += 1
+            return web.Response(status=304, headers={"ETag": etag})
+        return web.Response(text=self.pages[index], content_type='text/html', headers={"ETag": etag})
+
+    async def stats(self, request):
+        return web.json_response(self.snapshot())
+
+    def snapshot(self):
+        requests = dict(self.requests)
+        requests['openai_stream'] = self.openai.stream_calls
+        return {
+            "requests": requests,
+            "errors": dict(self.errors),
+            "rate_limited": dict(self.rate_limited),
+            "not_modified": self.not_modified,
+            "bytes_sent": dict(self.bytes_sent),
+        }
+
+    def make_app(self):
+        app = web.Application(middlewares=[self.faults])
+        app.router.add_get('/newsapi/v2/everything', self.newsapi)
+        app.router.add_get('/naver/v1/search/news.json', self.naver)
+        app.router.add_get('/articles/{index}', self.article)
+        app.router.add_get('/_stats', self.stats)
+        self.openai.add_routes(app)
+        return app
+
+
+class FakeTrendReq:
+    # pytrends.request.TrendReq 대신 쓰는 객체. 네트워크 없이 고정된 키워드를 돌려준다
+    def __init__(self, keywords, latency=0.0):
+        self.keywords = list(keywords)
+        self.latency = latency
+        self.calls = 0
+
+    def build_payload(self, kw_list, geo=''):
+        self.calls += 1
+
+    def trending_searches(self, pn='south_korea'):
+        import pandas as pd
+        self.calls += 1
+        time.sleep(self.latency)
+        return pd.DataFrame({0: self.keywords})
+
+
+def add_arguments(parser):
+    parser.add_argument('--corpus', help="directory of saved article HTML served by the stub article host")
+    parser.add_argument('--fixtures', help="directory with recorded newsapi.json / naver.json responses")
+    parser.add_argument('--pages', type=int, default=200, help="synthetic pages when no corpus is given")
+    parser.add_argument('--latency-ms', nargs='*', default=['newsapi=150', 'naver=80', 'article=120'])
+    parser.add_argument('--error-rate', nargs='*', default=[])
+    parser.add_argument('--rate-limit-rate', nargs='*', default=[])
+    parser.add_argument('--first-token-delay', type=float, default=0.3)
+    parser.add_argument('--token-delay', type=float, default=0.005)
+    parser.add_argument('--tokens', type=int, default=300)
+    parser.add_argument('--seed', type=int, default=0)
+
+
+def make_stub(args):
+    return StubServices(
+        load_pages(args.corpus, args.pages, args.seed),
+        latency_ms=parse_rates(args.latency_ms),
+        error_rate=parse_rates(args.error_rate),
+        rate_limit_rate=parse_rates(args.rate_limit_rate),
+        fixtures_dir=args.fixtures,
+        seed=args.seed,
+        openai_options={"first_token_delay": args.first_token_delay, "token_delay": args.token_delay,
+                        "tokens": args.tokens},
+    )
+
+
+def serve(args, host, port):
+    web.run_app(make_stub(args).make_app(), host=host, port=port, print=None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-ins for NewsAPI, Naver, article hosts and OpenAI")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8090)
+    add_arguments(parser)
+    args = parser.parse_args()
+    print(f"NewsAPI  http://{args.host}:{args.port}/newsapi/v2/everything")
+    print(f"Naver    http://{args.host}:{args.port}/naver/v1/search/news.json")
+    print(f"OpenAI   OPENAI_BASE_URL=http://{args.host}:{args.port}/v1")
+    serve(args, args.host, args.port)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,147 +1,373 @@
-import time
 import aiohttp
 import asyncio
-from bs4 import BeautifulSoup
-from newsapi import NewsApiClient
-from pytrends.request import TrendReq
-from config import NEWS_API_KEY, NAVER_CLIENT_ID, NAVER_CLIENT_SECRET, OPENAI_API_KEY
+from config import NEWS_API_KEY, NAVER_CLIENT_ID, NAVER_CLIENT_SECRET
 import os
-from datetime import datetime
-import json
+import ssl
 import certifi
-from openai import OpenAI
+from urllib.parse import urlsplit
+from article_pipeline import ArticlePipeline
+from article_store import ArticleStore
+from dedup import dedupe_articles
+from html_extractor import HtmlExtractor
+from llm_cache import get_llm_cache
+from local_extractor import Extraction, LocalExtractor, parse_page
+from openai_client import get_async_client, get_client
+from rate_limiter import call_with_limits, call_with_limits_async
+from tracing import current_span, span, traced
+
+NEWSAPI_URL = "https://newsapi.org/v2/everything"
+NAVER_NEWS_URL = "https://openapi.naver.com/v1/search/news.json"
 
 
 class ContentScraper:
-    def __init__(self):
-        self.newsapi = NewsApiClient(api_key=NEWS_API_KEY)
-        self.pytrends = TrendReq(hl='ko-KR', tz=540)
-        self.client = OpenAI(api_key=OPENAI_API_KEY)
-        self.last_request_time = 0
+    def __init__(self, max_connections=50, limit_per_host=4, max_concurrency=20, pipeline_options=None,
+                 html_backend='auto', news_manager=None, min_confidence=0.6, newsapi_url=NEWSAPI_URL,
+                 naver_url=NAVER_NEWS_URL):
+        # 외부 API 클라이언트는 처음 쓸 때 만든다 (TrendReq는 생성 시 네트워크 요청을 보낸다)
+        self._newsapi = None
+        self._pytrends = None
         self.scrape_dir = "scraped_news"
         os.makedirs(self.scrape_dir, exist_ok=True)
+        self.article_store = ArticleStore(self.scrape_dir)
+        self.news_manager = news_manager
         self.article_limit = 10
+        # 검색 API 주소. 벤치마크는 로컬 스텁 서버를 가리키게 바꾼다
+        self.newsapi_url = newsapi_url
+        self.naver_url = naver_url
+
+        # 스크레이퍼 전체에서 공유하는 커넥션 풀
+        self.max_connections = max_connections
+        self.limit_per_host = limit_per_host
+        self.max_concurrency = max_concurrency
+        self.session = None
+        self.semaphore = None
+        self._session_loop = None
+
+        # 단계별 워커 수와 큐 크기 (ArticlePipeline 인자)
+        self.pipeline_options = pipeline_options or {}
+        self.html_extractor = HtmlExtractor(backend=html_backend)
+        # 본문은 로컬 추출기로 뽑고, 신뢰도가 min_confidence보다 낮을 때만 LLM 분류를 쓴다
+        self.local_extractor = LocalExtractor(rules_path=os.path.join(self.scrape_dir, "site_rules.json"))
+        self.min_confidence = min_confidence
+        self.llm_cache = get_llm_cache()
+
+    @property
+    def newsapi(self):
+        if self._newsapi is None:
+            from newsapi import NewsApiClient
+            self._newsapi = NewsApiClient(api_key=NEWS_API_KEY)
+        return self._newsapi
+
+    @property
+    def pytrends(self):
+        if self._pytrends is None:
+            from pytrends.request import TrendReq
+            self._pytrends = TrendReq(hl='ko-KR', tz=540)
+        return self._pytrends
+
+    @property
+    def client(self):
+        return get_client()
+
+    @property
+    def async_client(self):
+        return get_async_client()
+
+    async def __aenter__(self):
+        await self.open_session()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close_session()
+
+    async def open_session(self):
+        loop = asyncio.get_running_loop()
+        if self.session is not None and not self.session.closed and self._session_loop is loop:
+            return self.session
+
+        # 이전 이벤트 루프에 묶인 세션은 재사용할 수 없으므로 새로 만든다
+        ssl_context = ssl.create_default_context(cafile=certifi.where())
+        connector = aiohttp.TCPConnector(
+            limit=self.max_connections,
+            limit_per_host=self.limit_per_host,
+            ttl_dns_cache=300,
+            keepalive_timeout=30,
+            ssl=ssl_context,
+        )
+        self.session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=30, connect=10),
+        )
+        self.semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._session_loop = loop
+        return self.session
+
+    async def close_session(self):
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+        self.session = None
+        self.semaphore = None
+        self._session_loop = None
+        # 종료할 때 아직 저장하지 않은 사이트 규칙을 남겨 둔다
+        if self.local_extractor.pending:
+            self.local_extractor.save()
+
+    async def _request(self, url, headers, read, provider):
+        session = await self.open_session()
+        # 재시도마다 스팬이 하나씩 남는다. 세마포어 대기 시간도 포함한다
+        with span('http.request', provider=provider, host=urlsplit(url).hostname) as trace:
+            async with self.semaphore:
+                async with session.get(url, headers=headers) as response:
+                    trace.set(status=response.status)
+                    # 429와 5xx는 예외로 올려 공유 limiter가 재시도/서킷 브레이커를 적용하게 한다
+                    if response.status == 429 or response.status >= 500:
+                        raise aiohttp.ClientResponseError(
+                            response.request_info, response.history,
+                            status=response.status, message=response.reason, headers=response.headers,
+                        )
+                    body = await read(response)
+                    trace.set(bytes=response.content_length if response.content_length is not None
+                              else len(body.encode('utf-8')) if isinstance(body, str) else 0)
+                    return response.status, body, response.headers
 
+    async def fetch_json(self, url, headers=None, provider='article_host'):
+        async def read(response):
+            return await response.json() if response.status == 200 else None
+
+        status, data, _ = await call_with_limits_async(
+            provider, lambda: self._request(url, headers, read, provider), key=self._limit_key(provider, url)
+        )
+        return status, data
+
+    async def fetch_text(self, url, headers=None):
+        status, text, _ = await self.fetch_page(url, headers=headers)
+        return status, text
+
+    async def fetch_page(self, url, headers=None, provider='article_host'):
+        async def read(response):
+            return None if response.status == 304 else await response.text()
+
+        return await call_with_limits_async(
+            provider, lambda: self._request(url, headers, read, provider), key=self._limit_key(provider, url)
+        )
+
+    def _limit_key(self, provider, url):
+        # 기사 호스트는 호스트마다 한도와 서킷 브레이커를 따로 둔다
+        return urlsplit(url).hostname if provider == 'article_host' else None
+
+    @traced('pytrends.trending')
     def get_trending_keywords(self, count=10):
-        current_time = time.time()
-        if current_time - self.last_request_time < 1:
-            time.sleep(1 - (current_time - self.last_request_time))
+        def fetch():
+            self.pytrends.build_payload(kw_list=[''], geo='KR')
+            return self.pytrends.trending_searches(pn='south_korea')
 
-        self.pytrends.build_payload(kw_list=[''], geo='KR')
-        trends = self.pytrends.trending_searches(pn='south_korea')
-        self.last_request_time = time.time()
+        trends = call_with_limits('pytrends', fetch)
         return trends.iloc[:count, 0].tolist()
 
-    async def fetch_news_from_newsapi(self, session, query, page=1, page_size=10):
+    @traced('newsapi.search')
+    async def fetch_news_from_newsapi(self, query, page=1, page_size=10):
         articles = []
         try:
-            url = f"https://newsapi.org/v2/everything?q={query}&sortBy=relevancy&pageSize={page_size}&page={page}&apiKey={NEWS_API_KEY}"
-            async with session.get(url) as response:
-                if response.status != 200:
-                    return articles
-                data = await response.json()
-                if not data['articles']:
-                    return articles
-                articles.extend(data['articles'])
+            url = f"{self.newsapi_url}?q={query}&sortBy=relevancy&pageSize={page_size}&page={page}&apiKey={NEWS_API_KEY}"
+            status, data = await self.fetch_json(url, provider='newsapi')
+            if status != 200 or not data.get('articles'):
+                return articles
+            articles.extend(data['articles'])
         except Exception as e:
+            current_span().fail(e)
             print(f"Error fetching news from News API for keyword '{query}': {str(e)}")
         return articles
 
-    async def fetch_news_from_naver(self, session, query, start=1, display=10):
+    @traced('naver.search')
+    async def fetch_news_from_naver(self, query, start=1, display=10):
         articles = []
         headers = {
             'X-Naver-Client-Id': NAVER_CLIENT_ID,
             'X-Naver-Client-Secret': NAVER_CLIENT_SECRET
         }
         try:
-            url = f"https://openapi.naver.com/v1/search/news.json?query={query}&display={display}&start={start}&sort=sim"
-            async with session.get(url, headers=headers) as response:
-                if response.status != 200:
-                    return articles
-                data = await response.json()
-                items = data.get('items', [])
-                for item in items:
-                    article_data = {
-                        'title': item['title'],
-                        'url': item['link'],
-                        'description': item['description'],
-                        'source': 'Naver News'
-                    }
-                    articles.append(article_data)
+            url = f"{self.naver_url}?query={query}&display={display}&start={start}&sort=sim"
+            status, data = await self.fetch_json(url, headers=headers, provider='naver')
+            if status != 200:
+                return articles
+            items = data.get('items', [])
+            for item in items:
+                article_data = {
+                    'title': item['title'],
+                    'url': item['link'],
+                    'description': item['description'],
+                    'source': 'Naver News'
+                }
+                articles.append(article_data)
         except Exception as e:
+            current_span().fail(e)
             print(f"Error fetching news from Naver API for keyword '{query}': {str(e)}")
         return articles
 
-    async def get_news_by_keyword(self, keyword, limit=10):
+    @traced('scraper.search')
+    async def search_articles(self, keyword, page=1, start=1, page_size=10):
         query = f"{keyword} AND (한국 OR 코리아 OR Korea)"
-        async with aiohttp.ClientSession() as session:
-            tasks = [
-                self.fetch_news_from_newsapi(session, query, page_size=limit),
-                self.fetch_news_from_naver(session, query, display=limit)
-            ]
-            results = await asyncio.gather(*tasks)
-            all_articles = [item for sublist in results for item in sublist]
-        return [await self.scrape_and_save_article(article) for article in all_articles[:limit]]
+        tasks = [
+            self.fetch_news_from_newsapi(query, page=page, page_size=page_size),
+            self.fetch_news_from_naver(query, start=start, display=page_size)
+        ]
+        results = await asyncio.gather(*tasks)
+        return dedupe_articles([item for sublist in results for item in sublist])
+
+    async def stream_articles(self, articles):
+        # 기사마다 처리가 끝나는 대로 (입력 순번, 기사)를 돌려준다
+        await self.open_session()
+        pipeline = ArticlePipeline(self, **self.pipeline_options)
+        async for index, article in pipeline.run(articles):
+            yield index, article
+
+    async def scrape_articles(self, articles):
+        results = [item async for item in self.stream_articles(articles)]
+        return [article for _, article in sorted(results, key=lambda item: item[0])]
+
+    async def persist_articles(self, articles):
+        # 키워드 하나의 기사를 한 트랜잭션으로 DB에 저장한다
+        if self.news_manager is not None and articles:
+            await asyncio.to_thread(self.news_manager.save_articles, articles)
+
+    async def stream_news_by_keyword(self, keyword, limit=10):
+        # 비동기 제너레이터라 소비하는 쪽과 컨텍스트를 나누므로 현재 스팬은 바꾸지 않는다
+        with span('scraper.keyword', activate=False, keyword=keyword, stream=True):
+            await self.open_session()
+            all_articles = await self.search_articles(keyword, page_size=limit)
+            scraped = []
+            async for _, article in self.stream_articles(all_articles[:limit]):
+                scraped.append(article)
+                yield article
+            await self.persist_articles(scraped)
+
+    @traced('scraper.keyword')
+    async def get_news_by_keyword(self, keyword, limit=10):
+        current_span().set(keyword=keyword)
+        await self.open_session()
+        all_articles = await self.search_articles(keyword, page_size=limit)
+        articles = await self.scrape_articles(all_articles[:limit])
+        await self.persist_articles(articles)
+        return articles
 
     async def fetch_additional_news(self, keyword, page, start, page_size=10):
-        query = f"{keyword} AND (한국 OR 코리아 OR Korea)"
-        async with aiohttp.ClientSession() as session:
-            tasks = [
-                self.fetch_news_from_newsapi(session, query, page=page, page_size=page_size),
-                self.fetch_news_from_naver(session, query, start=start, display=page_size)
-            ]
-            results = await asyncio.gather(*tasks)
-            all_articles = [item for sublist in results for item in sublist]
-        return [await self.scrape_and_save_article(article) for article in all_articles]
-
-    async def scrape_article_content(self, session, url):
+        await self.open_session()
+        all_articles = await self.search_articles(keyword, page=page, start=start, page_size=page_size)
+        articles = await self.scrape_articles(all_articles)
+        await self.persist_articles(articles)
+        return articles
+
+    async def fetch_article_html(self, url, headers=None):
+        status, html, response_headers = await self.fetch_page(url, headers=headers)
+        if status >= 400:
+            raise RuntimeError(f"HTTP {status} while fetching {url}")
+        return status, html, response_headers
+
+    @traced('scraper.fetch')
+    async def fetch_or_load_article(self, article):
+        # 저장된 기사가 충분히 최근이면 그대로 쓰고, 오래됐으면 조건부 요청으로 재검증한다
+        url = article['url']
+        entry = self.article_store.lookup(url)
+        if entry is not None and self.article_store.is_fresh(entry):
+            stored = self.article_store.load(entry)
+            if stored is not None:
+                current_span().set(cache_hit=True)
+                return stored, None
+
+        headers = self.article_store.conditional_headers(entry)
+        status, html, response_headers = await self.fetch_article_html(url, headers=headers)
+        if status == 304:
+            stored = self.article_store.load(entry)
+            if stored is not None:
+                self.article_store.touch(url)
+                current_span().set(cache_hit=True, revalidated=True)
+                return stored, None
+            status, html, response_headers = await self.fetch_article_html(url)
+
+        article['etag'] = response_headers.get('ETag')
+        article['last_modified'] = response_headers.get('Last-Modified')
+        return None, html
+
+    async def parse_article_html(self, html):
+        return await self.html_extractor.extract(html)
+
+    @traced('scraper.parse')
+    async def extract_article(self, article, html):
+        if not html:
+            return None
+        page = await self.html_extractor.run(parse_page, html)
+        extraction = self.local_extractor.score(page, article['url'])
+        current_span().set(confidence=extraction.confidence, needs_llm=extraction.confidence < self.min_confidence)
+        if extraction.confidence < self.min_confidence:
+            # 신뢰도가 낮으면 예전처럼 <p> 텍스트를 모아 LLM에 제목/본문 분류를 맡긴다
+            extraction.content = await self.parse_article_html(html)
+            extraction.needs_llm = True
+        return extraction
+
+    @traced('scraper.classify')
+    async def apply_extraction(self, article, extraction):
+        if extraction.needs_llm:
+            classified_content = await self.classify_content(extraction.content)
+
+            # AI로부터 제목과 내용을 분류
+            title, content = self.extract_title_and_content(classified_content)
+        else:
+            title, content = extraction.title or article['title'], extraction.content
+        article['title'] = title
+        article['full_content'] = content
+        return article
+
+    def find_duplicate_content(self, article, full_content, min_length=200):
+        # 너무 짧은 본문은 지문이 불안정하므로 비교하지 않는다
+        if not full_content or len(full_content) < min_length:
+            return None
+        return self.article_store.dedup_index.check_and_add(article['url'], full_content)
+
+    def load_stored_article(self, url):
+        entry = self.article_store.lookup(url)
+        return self.article_store.load(entry) if entry is not None else None
+
+    async def scrape_article_content(self, url):
         try:
-            async with session.get(url) as response:
-                html = await response.text()
-                soup = BeautifulSoup(html, 'html.parser')
-                paragraphs = soup.find_all('p')
-                content = []
-                for p in paragraphs:
-                    if '기사' not in p.text and '광고' not in p.text:
-                        content.append(p.text)
-
-                full_content = ' '.join(content)
-                return full_content
+            _, html, _ = await self.fetch_article_html(url)
+            return await self.parse_article_html(html)
         except Exception as e:
-            return None, f"Error occurred while scraping article content: {str(e)}"
+            print(f"Error occurred while scraping article content: {str(e)}")
+            return None
 
     async def classify_content(self, content):
         prompt = f"다음 내용에서 기사 제목과 내용, 광고 및 기타 내용을 분류해 주세요:\n\n{content}"
         try:
-            response = await self.client.ChatCompletion.create(
+            return await self.llm_cache.acomplete(
+                self.async_client,
                 model="gpt-3.5-turbo",
                 messages=[
                     {"role": "system", "content": "당신은 기사 내용을 분류하는 전문가입니다."},
                     {"role": "user", "content": prompt}
                 ],
                 max_tokens=2000,
-                n=1,
                 temperature=0.3,
             )
-            return response.choices[0].message.content.strip()
         except Exception as e:
+            current_span().fail(e)
             return f"분류 중 오류 발생: {str(e)}"
 
     async def scrape_and_save_article(self, article):
-        async with aiohttp.ClientSession() as session:
-            full_content = await self.scrape_article_content(session, article['url'])
-            classified_content = await self.classify_content(full_content)
-
-            # AI로부터 제목과 내용을 분류
-            title, content = self.extract_title_and_content(classified_content)
-
-            article['title'] = title
-            article['full_content'] = content
+        try:
+            _, html, _ = await self.fetch_article_html(article['url'])
+        except Exception as e:
+            print(f"Error occurred while scraping article content: {str(e)}")
+            html = None
+        extraction = await self.extract_article(article, html)
+        if extraction is None:
+            # 페이지를 못 받았으면 분류할 내용도 없으므로 LLM을 부르지 않는다
+            extraction = Extraction(article['title'], '', 0.0)
+        await self.apply_extraction(article, extraction)
 
-            # 기사 저장
-            self.save_article(article)
+        # 기사 저장
+        self.save_article(article)
 
-            return article
+        return article
 
     def extract_title_and_content(self, classified_content):
         lines = classified_content.split('\n')
@@ -154,28 +380,21 @@ class ContentScraper:
                 content.append(line)
         return title, ' '.join(content)
 
+    @traced('scraper.persist')
     def save_article(self, article):
-        date_str = datetime.now().strftime("%Y%m%d")
-        date_folder = os.path.join(self.scrape_dir, date_str)
-        os.makedirs(date_folder, exist_ok=True)
-
-        safe_title = "".join([c for c in article['title'] if c.isalpha() or c.isdigit() or c == ' ']).rstrip()
-        filename = f"{safe_title[:50]}.json"
-        filepath = os.path.join(date_folder, filename)
-
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(article, f, ensure_ascii=False, indent=4)
+        return self.article_store.save(article)
 
     async def get_trending_news(self, count=5):
-        keywords = self.get_trending_keywords(count)
+        # pytrends 호출과 limiter 대기, 재시도 백오프가 모두 동기라서 이벤트 루프를 막지 않게 스레드에서 돌린다
+        keywords = await asyncio.to_thread(self.get_trending_keywords, count)
         news = {}
-        async with aiohttp.ClientSession() as session:
-            tasks = [self.get_news_by_keyword(keyword) for keyword in keywords]
-            results = await asyncio.gather(*tasks)
-            for keyword, articles in zip(keywords, results):
-                if articles:
-                    news[keyword] = articles
+        await self.open_session()
+        tasks = [self.get_news_by_keyword(keyword) for keyword in keywords]
+        results = await asyncio.gather(*tasks)
+        for keyword, articles in zip(keywords, results):
+            if articles:
+                news[keyword] = articles
         return news, list(news.keys())
 
     async def get_news_by_topic(self, topic, count=10):
-        return await self.get_news_by_keyword(topic)[:count]
+        return (await self.get_news_by_keyword(topic, count))[:count]
@@ -0,0 +1,176 @@
+import hashlib
+import html
+import re
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+TRACKING_PARAMS = {'fbclid', 'gclid', 'ref', 'from', 'cmpid', 'ocid', 'rss', 'feed'}
+TAG_RE = re.compile(r'<[^>]+>')
+NON_WORD_RE = re.compile(r'[\W_]+', re.UNICODE)
+
+
+def canonicalize_url(url):
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    for prefix in ('www.', 'm.', 'mobile.'):
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+            break
+    query = [
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith('utm_') and key.lower() not in TRACKING_PARAMS
+    ]
+    path = parts.path.rstrip('/') or '/'
+    return urlunsplit(('https', host, path, urlencode(sorted(query)), ''))
+
+
+def normalize_text(text):
+    # Naver 검색 결과의 <b> 태그와 &quot; 같은 엔티티를 걷어낸다
+    text = html.unescape(TAG_RE.sub('', text or ''))
+    return NON_WORD_RE.sub('', text.lower())
+
+
+def shingles(text, k=3):
+    text = normalize_text(text)
+    if len(text) <= k:
+        return {text} if text else set()
+    return {text[i:i + k] for i in range(len(text) - k + 1)}
+
+
+def jaccard(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def simhash(text, bits=64, k=4):
+    weights = [0] * bits
+    for shingle in shingles(text, k):
+        value = int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'big')
+        for i in range(bits):
+            weights[i] += 1 if value >> i & 1 else -1
+    fingerprint = 0
+    for i in range(bits):
+        if weights[i] > 0:
+            fingerprint |= 1 << i
+    return fingerprint
+
+
+def hamming_distance(a, b):
+    return bin(a ^ b).count('1')
+
+
+def merge_duplicate(kept, duplicate):
+    related = kept.setdefault('duplicates', [])
+    related.append({'url': duplicate['url'], 'source': duplicate.get('source')})
+    if not kept.get('description') and duplicate.get('description'):
+        kept['description'] = duplicate['description']
+
+
+def dedupe_articles(articles, title_threshold=0.7):
+    # 스크랩 전에 URL과 제목 shingle로 같은 기사를 한 번만 남긴다
+    kept = []
+    seen_urls = {}
+    kept_shingles = []
+    for article in articles:
+        url = canonicalize_url(article['url'])
+        if url in seen_urls:
+            merge_duplicate(seen_urls[url], article)
+            continue
+        title_shingles = shingles(article.get('title', ''))
+        duplicate_of = None
+        for other, other_shingles in zip(kept, kept_shingles):
+            if jaccard(title_shingles, other_shingles) >= title_threshold:
+                duplicate_of = other
+                break
+        if duplicate_of is not None:
+            merge_duplicate(duplicate_of, article)
+            seen_urls[url] = duplicate_of
+            continue
+        kept.append(article)
+        kept_shingles.append(title_shingles)
+        seen_urls[url] = article
+    return kept
+
+
+def _to_signed(value):
+    # SQLite INTEGER는 부호 있는 64비트다
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def _to_unsigned(value):
+    return value + (1 << 64) if value < 0 else value
+
+
+class NearDuplicateIndex:
+    # 64비트 SimHash를 16비트 밴드 4개로 나눠 LSH 버킷에 넣는다.
+    # 해밍 거리 3 이하면 적어도 한 밴드가 일치하므로 후보를 놓치지 않는다.
+    def __init__(self, conn, lock, bands=4, max_distance=3):
+        self.conn = conn
+        self.lock = lock
+        self.bands = bands
+        self.band_bits = 64 // bands
+        self.max_distance = max_distance
+        self.create_table()
+
+    def create_table(self):
+        with self.lock:
+            self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS simhash_index
+            (url TEXT PRIMARY KEY,
+             fingerprint INTEGER)
+            ''')
+            self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS simhash_bands
+            (band INTEGER,
+             value INTEGER,
+             url TEXT)
+            ''')
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_simhash_bands ON simhash_bands (band, value)")
+            self.conn.commit()
+
+    def _band_values(self, fingerprint):
+        mask = (1 << self.band_bits) - 1
+        return [(band, fingerprint >> (band * self.band_bits) & mask) for band in range(self.bands)]
+
+    def find(self, fingerprint, exclude_url=None):
+        with self.lock:
+            candidates = set()
+            for band, value in self._band_values(fingerprint):
+                rows = self.conn.execute(
+                    "SELECT url FROM simhash_bands WHERE band = ? AND value = ?", (band, value)
+                ).fetchall()
+                candidates.update(row[0] for row in rows)
+            if exclude_url is not None:
+                excluded = canonicalize_url(exclude_url)
+                candidates = {url for url in candidates if canonicalize_url(url) != excluded}
+            # 여러 URL이 걸리면 먼저 색인된 원본을 돌려준다
+            rows = [
+                self.conn.execute("SELECT rowid, fingerprint, url FROM simhash_index WHERE url = ?", (url,)).fetchone()
+                for url in candidates
+            ]
+            for _, stored, url in sorted(row for row in rows if row):
+                if hamming_distance(_to_unsigned(stored), fingerprint) <= self.max_distance:
+                    return url
+        return None
+
+    def add(self, url, fingerprint):
+        with self.lock:
+            self.conn.execute("DELETE FROM simhash_bands WHERE url = ?", (url,))
+            self.conn.execute(
+                "INSERT OR REPLACE INTO simhash_index (url, fingerprint) VALUES (?, ?)",
+                (url, _to_signed(fingerprint)),
+            )
+            self.conn.executemany(
+                "INSERT INTO simhash_bands (band, value, url) VALUES (?, ?, ?)",
+                [(band, value, url) for band, value in self._band_values(fingerprint)],
+            )
+            self.conn.commit()
+
+    def check_and_add(self, url, text):
+        # 본문이 이미 색인된 다른 기사와 거의 같으면 그 URL을, 아니면 None을 돌려준다.
+        # 원래 URL로 색인해 두어야 돌려준 URL로 저장소에서 원본 기사를 찾을 수 있다
+        fingerprint = simhash(text)
+        duplicate_of = self.find(fingerprint, exclude_url=url)
+        if duplicate_of is None:
+            self.add(url, fingerprint)
+        return duplicate_of
@@ -0,0 +1,146 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from html.parser import HTMLParser
+
+# lxml, selectolax는 선택 의존성이다. 설치되어 있으면 더 빠른 백엔드를 쓴다.
+try:
+    from selectolax.parser import HTMLParser as SelectolaxParser
+except ImportError:
+    SelectolaxParser = None
+
+try:
+    from lxml import etree
+except ImportError:
+    etree = None
+
+SKIP_WORDS = ('기사', '광고')
+
+
+def keep_paragraph(text):
+    return not any(word in text for word in SKIP_WORDS)
+
+
+def extract_with_bs4(html):
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html, 'html.parser')
+    return [p.text for p in soup.find_all('p')]
+
+
+def extract_with_selectolax(html):
+    tree = SelectolaxParser(html)
+    return [node.text() for node in tree.css('p')]
+
+
+def extract_with_lxml(html):
+    # 전체 트리를 만들지 않고 <p>가 끝날 때마다 텍스트만 꺼낸 뒤 노드를 버린다
+    parser = etree.HTMLPullParser(events=('end',), tag='p')
+    paragraphs = []
+    for start in range(0, len(html), 65536):
+        parser.feed(html[start:start + 65536])
+        for _, element in parser.read_events():
+            paragraphs.append(''.join(element.itertext()))
+            element.clear()
+    parser.close()
+    for _, element in parser.read_events():
+        paragraphs.append(''.join(element.itertext()))
+    return paragraphs
+
+
+class _ParagraphCollector(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.paragraphs = []
+        self.depth = 0
+        self.buffer = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'p':
+            if self.depth == 0:
+                self.buffer = []
+            self.depth += 1
+
+    def handle_endtag(self, tag):
+        if tag == 'p' and self.depth:
+            self.depth -= 1
+            if self.depth == 0:
+                self.paragraphs.append(''.join(self.buffer))
+
+    def handle_data(self, data):
+        if self.depth:
+            self.buffer.append(data)
+
+    def close(self):
+        super().close()
+        if self.depth:
+            self.paragraphs.append(''.join(self.buffer))
+            self.depth = 0
+
+
+def extract_with_stream(html):
+    collector = _ParagraphCollector()
+    collector.feed(html)
+    collector.close()
+    return collector.paragraphs
+
+
+EXTRACTORS = {
+    'html.parser': extract_with_bs4,
+    'stream': extract_with_stream,
+}
+if etree is not None:
+    EXTRACTORS['lxml'] = extract_with_lxml
+if SelectolaxParser is not None:
+    EXTRACTORS['selectolax'] = extract_with_selectolax
+
+
+def available_backends():
+    return list(EXTRACTORS.keys())
+
+
+def resolve_backend(backend='auto'):
+    if backend != 'auto':
+        if backend not in EXTRACTORS:
+            raise ValueError(f"Unknown HTML extractor backend: {backend}")
+        return backend
+    for name in ('selectolax', 'lxml', 'stream'):
+        if name in EXTRACTORS:
+            return name
+
+
+def extract_text(html, backend='html.parser'):
+    paragraphs = EXTRACTORS[backend](html)
+    return ' '.join(p for p in paragraphs if keep_paragraph(p))
+
+
+class HtmlExtractor:
+    # 큰 페이지는 프로세스 풀에서 파싱해 이벤트 루프를 막지 않는다
+    def __init__(self, backend='auto', max_workers=None, inline_threshold=16384):
+        self.backend = resolve_backend(backend)
+        self.max_workers = max_workers
+        self.inline_threshold = inline_threshold
+        self.executor = None
+
+    def _get_executor(self):
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self.executor
+
+    def extract_sync(self, html):
+        return extract_text(html, self.backend)
+
+    async def run(self, fn, html, *args):
+        # fn은 프로세스 풀로 넘길 수 있는 모듈 수준 함수여야 한다
+        if len(html) < self.inline_threshold:
+            return fn(html, *args)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_executor(), fn, html, *args)
+
+    async def extract(self, html):
+        if not html:
+            return ''
+        return await self.run(extract_text, html, self.backend)
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
@@ -0,0 +1,162 @@
+import json
+import os
+import re
+import numpy as np
+
+# 스크립트와 기사에 흔히 나오지만 주제를 나타내지 않는 말
+KOREAN_STOPWORDS = frozenset("""
+오늘 이번 지난 최근 현재 이날 당시 관련 대한 대해 위해 통해 따라 따른 의해 가운데 이후 이전 동안 정도 경우
+그리고 하지만 그러나 또한 또는 특히 다만 이어 한편 아울러 결국 이에 이를 이는 그는 그녀 우리 여러분 모두
+뉴스 소식 기사 기자 보도 전해 전했 전해드립니다 말했 밝혔 설명했 안녕하세요 감사합니다 진행자 시청자 이상
+것으로 것이 것은 것을 수도 있는 없는 하는 되는 같은 라고 이라고 에서는 으로는 까지 부터 이라는 라는
+""".split())
+
+ENGLISH_STOPWORDS = frozenset("""
+a about above after again against all also am an and any are as at be because been before being below between
+both but by can could did do does doing down during each few for from further had has have having he her here
+hers herself him himself his how i if in into is it its itself just me more most my myself no nor not now of off
+on once only or other our ours ourselves out over own said same she should so some such than that the their
+theirs them themselves then there these they this those through to too under until up very was we were what when
+where which while who whom why will with would you your yours yourself yourselves today news report reports
+according says new one two also however
+""".split())
+
+# 명사 뒤에 붙는 조사. 긴 것부터 떼어 낸다
+KOREAN_PARTICLES = sorted("""
+으로부터 에서부터 에게서 으로서 으로써 이라고 이라는 이라며 에서는 에서도 에게는 으로는 까지는 부터는
+께서 에서 에게 한테 으로 로서 로써 까지 부터 보다 처럼 만큼 이나 이며 이고 라고 라는 라며 와는 과는
+은 는 이 가 을 를 에 의 와 과 도 로 만 나 랑
+""".split(), key=len, reverse=True)
+
+# 서술어 어미로 끝나는 토큰은 키워드가 아니므로 버린다
+KOREAN_PREDICATE_ENDINGS = ("습니다", "니다", "했다", "한다", "된다", "있다", "없다", "이다", "였다", "었다", "았다",
+                            "겠다", "하는", "하고", "해서", "하며", "하면", "지만", "면서", "했고", "됐다", "되고")
+
+TOKEN_PATTERN = re.compile(r"[가-힣]+|[A-Za-z][A-Za-z0-9'-]*|[\u3040-\u30ff\u4e00-\u9fff]+")
+
+
+class Tokenizer:
+    # backend='regex'는 정규식과 조사 떼기만 쓰고, 'okt'/'mecab'은 konlpy 형태소 분석기로 명사를 뽑는다
+    def __init__(self, backend='regex'):
+        self.backend = backend
+        self._tagger = None
+
+    def _get_tagger(self):
+        if self._tagger is None:
+            from konlpy import tag
+            self._tagger = tag.Okt() if self.backend == 'okt' else tag.Mecab()
+        return self._tagger
+
+    def _korean_token(self, word):
+        for particle in KOREAN_PARTICLES:
+            if word.endswith(particle) and len(word) - len(particle) >= 2:
+                word = word[:-len(particle)]
+                break
+        if len(word) < 2 or word.endswith(KOREAN_PREDICATE_ENDINGS) or word in KOREAN_STOPWORDS:
+            return None
+        return word
+
+    def tokenize(self, text):
+        tokens = []
+        if self.backend != 'regex':
+            tokens += [noun for noun in self._get_tagger().nouns(text)
+                       if len(noun) >= 2 and noun not in KOREAN_STOPWORDS]
+        for match in TOKEN_PATTERN.finditer(text):
+            word = match.group()
+            first = word[0]
+            if '가' <= first <= '힣':
+                if self.backend == 'regex':
+                    word = self._korean_token(word)
+                    if word:
+                        tokens.append(word)
+            elif first.isascii():
+                word = word.lower().strip("'-")
+                if word.endswith("'s"):
+                    word = word[:-2]
+                if len(word) >= 2 and word not in ENGLISH_STOPWORDS:
+                    tokens.append(word)
+            else:
+                # 띄어쓰기가 없는 중국어/일본어는 글자 bigram을 쓴다
+                tokens += [word[i:i + 2] for i in range(len(word) - 1)]
+        return tokens
+
+
+class KeywordExtractor:
+    # 기사 저장소 전체로 문서 빈도(DF)를 모아 두고, 스크립트 여러 개의 TF-IDF 상위 단어를 한 번에 뽑는다.
+    # DF는 파일에 저장하며 저장소에서 새로 추가된 레코드만 읽어 갱신한다.
+    def __init__(self, idf_path=os.path.join("scraped_news", "keyword_idf.json"), tokenizer=None):
+        self.idf_path = idf_path
+        self.tokenizer = tokenizer or Tokenizer()
+        self.doc_count = 0
+        self.df = {}
+        self.positions = {}
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.idf_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return
+        self.doc_count = state["doc_count"]
+        self.df = state["df"]
+        self.positions = state["positions"]
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.idf_path) or ".", exist_ok=True)
+        tmp_path = f"{self.idf_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"doc_count": self.doc_count, "df": self.df, "positions": self.positions}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.idf_path)
+
+    def add_documents(self, texts):
+        for text in texts:
+            self.doc_count += 1
+            for term in set(self.tokenizer.tokenize(text)):
+                self.df[term] = self.df.get(term, 0) + 1
+
+    def update_from_store(self, article_store):
+        # 세그먼트마다 마지막으로 읽은 위치를 기억해 두고 그 뒤에 추가된 기사만 DF에 더한다
+        added = 0
+        for segment, offset, length, article in article_store.iter_records(start=self.positions):
+            self.add_documents([f"{article.get('title', '')}\n{article.get('full_content', '')}"])
+            self.positions[segment] = offset + length
+            added += 1
+        if added:
+            self.save()
+        return added
+
+    def idf(self, terms):
+        df = np.array([self.df.get(term, 0) for term in terms], dtype=np.float64)
+        return np.log((1 + self.doc_count) / (1 + df)) + 1
+
+    def extract_batch(self, texts, top_k=3):
+        docs = [self.tokenizer.tokenize(text) for text in texts]
+        vocab = {}
+        cols = [vocab.setdefault(token, len(vocab)) for tokens in docs for token in tokens]
+        if not cols:
+            return [[] for _ in docs]
+        lengths = np.array([len(tokens) for tokens in docs])
+        rows = np.repeat(np.arange(len(docs)), lengths)
+        cols = np.array(cols)
+
+        # 같은 (문서, 단어) 쌍을 합쳐 희소 단어 빈도 행렬(COO)을 만들고 TF-IDF 점수를 한 번에 계산한다
+        keys, counts = np.unique(rows * len(vocab) + cols, return_counts=True)
+        rows, cols = keys // len(vocab), keys % len(vocab)
+        terms = list(vocab)
+        scores = counts / lengths[rows] * self.idf(terms)[cols]
+
+        # 문서별로 점수 내림차순 정렬한 뒤 문서 안 순위가 top_k 미만인 것만 남긴다 (동점이면 먼저 나온 단어)
+        order = np.lexsort((cols, -scores, rows))
+        rows, cols = rows[order], cols[order]
+        rank = np.arange(len(rows)) - np.searchsorted(rows, rows)
+        keep = rank < top_k
+
+        keywords = [[] for _ in docs]
+        for row, col in zip(rows[keep].tolist(), cols[keep].tolist()):
+            keywords[row].append(terms[col])
+        return keywords
+
+    def extract(self, text, top_k=3):
+        return self.extract_batch([text], top_k)[0]
+
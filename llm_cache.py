@@ -0,0 +1,215 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from prompt_builder import TokenCounter
+from rate_limiter import call_with_limits, call_with_limits_async
+from tracing import current_span, span, traced
+
+
+def record_usage(trace, response):
+    usage = getattr(response, 'usage', None)
+    if usage is not None:
+        trace.set(prompt_tokens=usage.prompt_tokens, completion_tokens=usage.completion_tokens)
+
+
+class LLMCache:
+    # (model, messages, temperature, max_tokens) 해시를 키로 응답 텍스트를 저장한다
+    def __init__(self, db_path="llm_cache.db", ttl=7 * 24 * 3600, max_entries=5000, evict_every=50):
+        self.db_path = db_path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.evict_every = evict_every
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.counter = TokenCounter()
+        self.create_table()
+
+    def create_table(self):
+        with self.lock:
+            self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS llm_cache
+            (key TEXT PRIMARY KEY,
+             response TEXT,
+             created_at REAL,
+             accessed_at REAL)
+            ''')
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_accessed ON llm_cache (accessed_at)")
+            self.conn.commit()
+
+    @staticmethod
+    def make_key(model, messages, temperature, max_tokens):
+        payload = json.dumps(
+            {"model": model, "messages": messages, "temperature": temperature, "max_tokens": max_tokens},
+            ensure_ascii=False, sort_keys=True,
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute("SELECT response, created_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            response, created_at = row
+            if self.ttl is not None and now - created_at > self.ttl:
+                self.conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self.conn.commit()
+                self.misses += 1
+                return None
+            self.conn.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            self.conn.commit()
+            self.hits += 1
+            return response
+
+    def set(self, key, response):
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, response, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, response, now, now),
+            )
+            self._writes += 1
+            if self._writes % self.evict_every == 0:
+                self._evict(now)
+            self.conn.commit()
+
+    def _evict(self, now):
+        if self.ttl is not None:
+            self.conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl,))
+        if self.max_entries is not None:
+            # 가장 오래 사용되지 않은 항목부터 지운다 (LRU)
+            self.conn.execute('''
+            DELETE FROM llm_cache WHERE key IN
+            (SELECT key FROM llm_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)
+            ''', (self.max_entries,))
+
+    def clear(self):
+        with self.lock:
+            self.conn.execute("DELETE FROM llm_cache")
+            self.conn.commit()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self.lock:
+            entries = self.conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": entries,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def estimate_tokens(self, messages, max_tokens):
+        return sum(self.counter.count(message['content']) for message in messages) + max_tokens
+
+    def _lookup(self, model, messages, temperature, max_tokens, fresh):
+        key = self.make_key(model, messages, temperature, max_tokens)
+        # fresh=True이면 temperature>0 호출은 캐시를 건너뛰고 새 응답을 받는다
+        if fresh and temperature > 0:
+            return key, None
+        return key, self.get(key)
+
+    @traced('openai.chat')
+    def complete(self, client, model, messages, temperature, max_tokens, fresh=False):
+        key, cached = self._lookup(model, messages, temperature, max_tokens, fresh)
+        current_span().set(model=model, cache_hit=cached is not None)
+        if cached is not None:
+            return cached
+        # 캐시 미스일 때만 OpenAI 한도(RPM/TPM), 서킷 브레이커, 재시도를 거친다
+        response = call_with_limits(
+            'openai',
+            lambda: client.chat.completions.create(
+                model=model,
+                messages=messages,
+                max_tokens=max_tokens,
+                n=1,
+                temperature=temperature,
+            ),
+            tokens=self.estimate_tokens(messages, max_tokens),
+        )
+        record_usage(current_span(), response)
+        text = response.choices[0].message.content.strip()
+        self.set(key, text)
+        return text
+
+    def stream(self, client, model, messages, temperature, max_tokens, fresh=False):
+        # 캐시에 있으면 한 번에, 없으면 stream=True 응답의 텍스트 조각을 그대로 흘려보낸다
+        # 제너레이터라 yield 사이에 현재 스팬을 바꾸지 않는다 (activate=False)
+        with span('openai.chat', activate=False, model=model, stream=True) as trace:
+            key, cached = self._lookup(model, messages, temperature, max_tokens, fresh)
+            trace.set(cache_hit=cached is not None)
+            if cached is not None:
+                yield cached
+                return
+            started = time.perf_counter()
+            response = call_with_limits(
+                'openai',
+                lambda: client.chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    max_tokens=max_tokens,
+                    n=1,
+                    temperature=temperature,
+                    stream=True,
+                ),
+                tokens=self.estimate_tokens(messages, max_tokens),
+            )
+            parts = []
+            try:
+                for chunk in response:
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        if not parts:
+                            trace.set(first_token_ms=round((time.perf_counter() - started) * 1000, 1))
+                        parts.append(delta)
+                        yield delta
+            finally:
+                response.close()
+            # 끝까지 받은 응답만 캐시에 넣는다. 스트림 응답에는 usage가 없어서 토큰 수를 센다
+            text = ''.join(parts).strip()
+            trace.set(completion_tokens=self.counter.count(text))
+            self.set(key, text)
+
+    @traced('openai.chat')
+    async def acomplete(self, client, model, messages, temperature, max_tokens, fresh=False):
+        key, cached = self._lookup(model, messages, temperature, max_tokens, fresh)
+        current_span().set(model=model, cache_hit=cached is not None)
+        if cached is not None:
+            return cached
+        response = await call_with_limits_async(
+            'openai',
+            lambda: client.chat.completions.create(
+                model=model,
+                messages=messages,
+                max_tokens=max_tokens,
+                n=1,
+                temperature=temperature,
+            ),
+            tokens=self.estimate_tokens(messages, max_tokens),
+        )
+        record_usage(current_span(), response)
+        text = response.choices[0].message.content.strip()
+        self.set(key, text)
+        return text
+
+
+_shared_cache = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_llm_cache():
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = LLMCache()
+        return _shared_cache
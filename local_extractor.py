@@ -0,0 +1,265 @@
+import json
+import os
+import re
+import threading
+from html.parser import HTMLParser
+from urllib.parse import urlsplit
+
+# 본문이 아닌 영역. 이 태그 안의 텍스트는 읽지 않는다
+SKIP_TAGS = {'script', 'style', 'noscript', 'nav', 'header', 'footer', 'aside', 'form', 'iframe', 'button',
+             'select', 'svg', 'figcaption', 'template'}
+BLOCK_TAGS = {'p', 'div', 'article', 'section', 'main', 'li', 'ul', 'ol', 'td', 'tr', 'table', 'blockquote',
+              'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'br', 'dd', 'dt', 'pre'}
+# 문단 단위 태그. 이 태그의 블록은 부모 요소를 컨테이너로 본다
+PARAGRAPH_TAGS = {'p', 'li', 'blockquote', 'h2', 'h3', 'h4', 'h5', 'h6', 'dd', 'dt', 'pre', 'br'}
+VOID_TAGS = {'br', 'img', 'meta', 'link', 'input', 'hr', 'source', 'wbr', 'area', 'base', 'col', 'embed'}
+
+BOILERPLATE_PATTERN = re.compile(
+    r"무단\s*전재|재배포\s*금지|저작권자|copyright|all rights reserved|ⓒ|©|구독하기|관련\s*기사|많이\s*본|"
+    r"댓글|공유하기|기사\s*제보|[\w.+-]+@[\w-]+\.[\w.]+",
+    re.IGNORECASE,
+)
+TITLE_SEPARATORS = re.compile(r"\s+(?:-|\||::|:|<|»|–|—)\s+")
+MIN_BLOCK_CHARS = 25
+MAX_LINK_DENSITY = 0.35
+
+
+class _PageParser(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.stack = []
+        self.skip_depth = 0
+        self.link_depth = 0
+        self.text = []
+        self.link_chars = 0
+        self.blocks = []
+        self.meta = {}
+        self.in_title = False
+        self.in_h1 = False
+        self.title = []
+        self.h1 = []
+
+    def flush(self):
+        text = ' '.join(''.join(self.text).split())
+        if text:
+            path = [signature for tag, signature in self.stack]
+            if self.stack and self.stack[-1][0] in PARAGRAPH_TAGS:
+                path = path[:-1]
+            self.blocks.append(('>'.join(path), text, self.link_chars))
+        self.text = []
+        self.link_chars = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'meta':
+            attrs = dict(attrs)
+            key = attrs.get('property') or attrs.get('name')
+            if key and attrs.get('content'):
+                self.meta[key.lower()] = attrs['content'].strip()
+            return
+        if self.skip_depth:
+            if tag in SKIP_TAGS:
+                self.skip_depth += 1
+            return
+        if tag in SKIP_TAGS:
+            self.skip_depth = 1
+            return
+        if tag == 'title':
+            self.in_title = True
+        elif tag == 'h1':
+            self.in_h1 = True
+        elif tag == 'a':
+            self.link_depth += 1
+        if tag in BLOCK_TAGS:
+            self.flush()
+        if tag in VOID_TAGS:
+            return
+        attrs = dict(attrs)
+        signature = tag
+        if attrs.get('id'):
+            signature += '#' + attrs['id']
+        elif attrs.get('class'):
+            signature += '.' + attrs['class'].split()[0]
+        self.stack.append((tag, signature))
+
+    def handle_endtag(self, tag):
+        if self.skip_depth:
+            if tag in SKIP_TAGS:
+                self.skip_depth -= 1
+            return
+        if tag == 'title':
+            self.in_title = False
+        elif tag == 'h1':
+            self.in_h1 = False
+        elif tag == 'a' and self.link_depth:
+            self.link_depth -= 1
+        if tag in BLOCK_TAGS:
+            self.flush()
+        # 닫는 태그가 어긋난 HTML이 많으므로 같은 태그가 나올 때까지 스택을 정리한다
+        for i in range(len(self.stack) - 1, -1, -1):
+            if self.stack[i][0] == tag:
+                del self.stack[i:]
+                break
+
+    def handle_data(self, data):
+        if self.skip_depth:
+            return
+        if self.in_title:
+            self.title.append(data)
+            return
+        if self.in_h1:
+            self.h1.append(data)
+        self.text.append(data)
+        if self.link_depth:
+            self.link_chars += len(data.strip())
+
+
+def parse_page(html):
+    # 프로세스 풀에서도 부를 수 있도록 모듈 수준 함수로 둔다. 학습된 규칙 없이 페이지 구조만 뽑는다
+    parser = _PageParser()
+    parser.feed(html)
+    parser.close()
+    parser.flush()
+    return {
+        "title": ' '.join(''.join(parser.title).split()),
+        "og_title": parser.meta.get('og:title') or parser.meta.get('twitter:title') or '',
+        "h1": ' '.join(''.join(parser.h1).split()),
+        "blocks": parser.blocks,
+    }
+
+
+def is_content_block(text, link_chars):
+    return (len(text) >= MIN_BLOCK_CHARS and link_chars / len(text) < MAX_LINK_DENSITY
+            and not BOILERPLATE_PATTERN.search(text))
+
+
+def in_container(path, container):
+    return path == container or path.startswith(container + '>')
+
+
+def title_suffix(title):
+    # "기사 제목 - 사이트명" 같은 제목에서 마지막 구분자 뒤를 사이트 접미사 후보로 본다
+    matches = list(TITLE_SEPARATORS.finditer(title))
+    return title[matches[-1].start():] if matches else None
+
+
+class Extraction:
+    def __init__(self, title, content, confidence, container=None, method='density'):
+        self.title = title
+        self.content = content
+        self.confidence = confidence
+        self.container = container
+        self.method = method
+        self.needs_llm = False
+
+
+class LocalExtractor:
+    # 텍스트 밀도와 링크 밀도로 본문 컨테이너를 고르고, 사이트마다 자주 맞은 컨테이너와 제목 접미사를 학습한다
+    def __init__(self, rules_path=None, learn_threshold=0.8, min_rule_hits=3, save_every=20):
+        self.rules_path = rules_path
+        self.learn_threshold = learn_threshold
+        self.min_rule_hits = min_rule_hits
+        self.save_every = save_every
+        self.rules = {}
+        self.pending = 0
+        self.lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        if not self.rules_path:
+            return
+        try:
+            with open(self.rules_path, 'r', encoding='utf-8') as f:
+                self.rules = json.load(f)
+        except (OSError, ValueError):
+            self.rules = {}
+
+    def save(self):
+        if not self.rules_path:
+            return
+        with self.lock:
+            data = json.dumps(self.rules, ensure_ascii=False)
+            self.pending = 0
+        tmp_path = f"{self.rules_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(data)
+        os.replace(tmp_path, self.rules_path)
+
+    def site_rule(self, host):
+        with self.lock:
+            rule = self.rules.get(host)
+            if rule is None:
+                return None, set()
+            containers = rule.get("containers", {})
+            best = max(containers, key=containers.get) if containers else None
+            if best is not None and containers[best] < self.min_rule_hits:
+                best = None
+            suffixes = {suffix for suffix, count in rule.get("suffixes", {}).items() if count >= 2}
+            return best, suffixes
+
+    def learn(self, host, container, page_title):
+        suffix = title_suffix(page_title) if page_title else None
+        with self.lock:
+            rule = self.rules.setdefault(host, {"containers": {}, "suffixes": {}})
+            rule["containers"][container] = rule["containers"].get(container, 0) + 1
+            if suffix:
+                rule["suffixes"][suffix] = rule["suffixes"].get(suffix, 0) + 1
+            self.pending += 1
+            should_save = self.pending >= self.save_every
+        if should_save:
+            self.save()
+
+    def pick_title(self, page, suffixes):
+        if page["og_title"]:
+            return page["og_title"]
+        title = page["title"]
+        for suffix in suffixes:
+            if title.endswith(suffix):
+                return title[:-len(suffix)].strip()
+        # <title>에 본문 <h1>이 들어 있으면 사이트명이 붙지 않은 <h1>을 쓴다
+        if page["h1"] and page["h1"] in title:
+            return page["h1"]
+        return title or page["h1"]
+
+    def score(self, page, url):
+        host = urlsplit(url).hostname or ''
+        learned_container, suffixes = self.site_rule(host)
+        good = [(path, text, links) for path, text, links in page["blocks"] if is_content_block(text, links)]
+        total = sum(len(text) for _, text, _ in good)
+        title = self.pick_title(page, suffixes)
+
+        # 학습된 컨테이너가 이 페이지에도 있고 충분한 본문이 나오면 그대로 쓴다
+        if learned_container is not None:
+            texts = [text for path, text, links in good if in_container(path, learned_container)]
+            content = '\n'.join(texts)
+            if len(content) >= 150:
+                length_factor = min(1.0, len(content) / 400)
+                return Extraction(title, content, 0.6 + 0.4 * length_factor, learned_container, method='rule')
+
+        if not good:
+            return Extraction(title, '', 0.0)
+
+        # 블록 글자 수를 컨테이너에 더하고 부모에도 절반을 더해, 본문이 여러 하위 요소로 나뉜 경우도 잡는다
+        scores = {}
+        for path, text, _ in good:
+            scores[path] = scores.get(path, 0) + len(text)
+            parent = path.rsplit('>', 1)[0] if '>' in path else ''
+            if parent:
+                scores[parent] = scores.get(parent, 0) + len(text) / 2
+        container = max(scores, key=scores.get)
+        chosen = [(text, links) for path, text, links in good if in_container(path, container)]
+        content = '\n'.join(text for text, _ in chosen)
+        chars = sum(len(text) for text, _ in chosen)
+        link_density = sum(links for _, links in chosen) / chars
+
+        length_factor = min(1.0, chars / 400)
+        concentration = chars / total
+        confidence = length_factor * (0.4 + 0.6 * concentration) * (1 - link_density)
+        if not title:
+            confidence *= 0.8
+
+        if confidence >= self.learn_threshold and host:
+            self.learn(host, container, page["title"])
+        return Extraction(title, content, round(confidence, 3), container)
+
+    def extract(self, html, url):
+        return self.score(parse_page(html), url)
@@ -7,13 +7,16 @@ from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
                              QHBoxLayout, QLabel, QLineEdit, QListWidget,
                              QSplitter, QGridLayout, QListWidgetItem, QDialog,
                              QTextBrowser, QScrollArea)
-from PyQt5.QtGui import QFont, QPixmap
-from PyQt5.QtCore import Qt, QTimer
+from PyQt5.QtGui import QFont, QPixmap, QTextCursor
+from PyQt5.QtCore import Qt, QTimer, QThreadPool
 from content_scraper import ContentScraper
 from script_generator import ScriptGenerator
 from news_manager import NewsManager
 from image_generator import ImageGenerator
 from script_validator import ScriptValidator
+from workers import Worker, AsyncLoopThread, AsyncTask
+from trend_tracker import TrendTracker
+from tracing import start_metrics_server, tracer
 
 class ArticleViewerDialog(QDialog):
     def __init__(self, article):
@@ -43,12 +46,21 @@ class MainWindow(QMainWindow):
         self.setStyleSheet("background-color: #f0f0f0;")
 
         # Initialize components
-        self.scraper = ContentScraper()
-        self.generator = ScriptGenerator()
         self.news_manager = NewsManager()
+        self.scraper = ContentScraper(news_manager=self.news_manager)
+        self.trend_tracker = TrendTracker(self.scraper)
+        self.generator = ScriptGenerator()
         self.image_generator = ImageGenerator()
         self.validator = ScriptValidator()
 
+        # 네트워크와 LLM 호출은 모두 백그라운드에서 실행한다
+        self.thread_pool = QThreadPool.globalInstance()
+        self.async_runner = AsyncLoopThread()
+        self.trends_worker = None
+        self.trend_news_task = None
+        self.news_task = None
+        self.generation_worker = None
+
         self.central_widget = QWidget()
         self.setCentralWidget(self.central_widget)
         self.layout = QHBoxLayout(self.central_widget)
@@ -65,6 +77,12 @@ class MainWindow(QMainWindow):
         left_layout.addWidget(QLabel("Search Trends:"))
         left_layout.addWidget(self.search_trends_widget)
 
+        # Local search over stored articles
+        self.local_search_input = QLineEdit()
+        self.local_search_input.setPlaceholderText("Search stored articles")
+        self.local_search_input.returnPressed.connect(self.search_local_articles)
+        left_layout.addWidget(self.local_search_input)
+
         # Related news
         self.related_news_widget = QListWidget()
         self.related_news_widget.setFont(QFont("Arial", 10))
@@ -103,7 +121,7 @@ class MainWindow(QMainWindow):
         language_layout = QHBoxLayout()
         language_label = QLabel("Output Language:")
         self.language_combo = QComboBox()
-        self.language_combo.addItems(["한국어", "English", "日本語", "中文"])
+        self.language_combo.addItems(self.generator.get_available_languages())
         self.language_combo.setCurrentText("한국어")
         language_layout.addWidget(language_label)
         language_layout.addWidget(self.language_combo)
@@ -116,11 +134,22 @@ class MainWindow(QMainWindow):
         self.generate_button.clicked.connect(self.generate_content)
         controls_layout.addWidget(self.generate_button)
 
+        # 선택한 스타일로 모든 언어 스크립트를 한 번에 만든다 (선택한 언어가 마스터)
+        self.generate_variants_button = QPushButton("Generate All Languages")
+        self.generate_variants_button.clicked.connect(self.generate_variants)
+        controls_layout.addWidget(self.generate_variants_button)
+
         # 뉴스 기사 열람 버튼 추가
         self.view_article_button = QPushButton("View Selected Article")
         self.view_article_button.clicked.connect(self.view_selected_article)
         controls_layout.addWidget(self.view_article_button)
 
+        # 단계별 소요 시간/오류/토큰/캐시 통계 패널 (선택)
+        self.stats_button = QPushButton("Pipeline Stats")
+        self.stats_button.setCheckable(True)
+        self.stats_button.toggled.connect(self.toggle_stats)
+        controls_layout.addWidget(self.stats_button)
+
         left_layout.addWidget(controls_widget)
 
         # Right side: Script output and image display
@@ -136,6 +165,15 @@ class MainWindow(QMainWindow):
         self.image_label.setAlignment(Qt.AlignCenter)
         right_layout.addWidget(self.image_label)
 
+        self.stats_output = QTextEdit()
+        self.stats_output.setReadOnly(True)
+        self.stats_output.setFont(QFont("Courier New", 9))
+        self.stats_output.setMaximumHeight(250)
+        self.stats_output.hide()
+        right_layout.addWidget(self.stats_output)
+        self.stats_timer = QTimer(self)
+        self.stats_timer.timeout.connect(self.refresh_stats)
+
         # Add left and right widgets to main layout
         splitter = QSplitter(Qt.Horizontal)
         splitter.addWidget(left_widget)
@@ -143,20 +181,77 @@ class MainWindow(QMainWindow):
         splitter.setSizes([600, 1000])  # Set initial sizes
         self.layout.addWidget(splitter)
 
-        # Update trends initially and set up a timer to update periodically
-        self.update_trends()
+        self.current_news_articles = {}
+        self.current_key = None
+        self.selected_news = []
+
+        # 첫 트렌드 조회는 창이 뜬 뒤 이벤트 루프에서 시작하고, 이후 주기적으로 갱신한다
+        QTimer.singleShot(0, self.update_trends)
         self.timer = QTimer(self)
         self.timer.timeout.connect(self.update_trends)
         self.timer.start(300000)  # Update every 5 minutes (300,000 ms)
 
-        self.current_news_articles = {}
-        self.selected_news = []
+        # NEWS_METRICS_PORT를 주면 Prometheus가 긁어 갈 /metrics를 로컬에 연다
+        self.metrics_server = None
+        if os.environ.get("NEWS_METRICS_PORT"):
+            self.metrics_server = start_metrics_server(int(os.environ["NEWS_METRICS_PORT"]))
 
     def show_related_news(self, item):
-        keyword = item.text().split(". ", 1)[1]
+        parts = item.text().split(". ", 1)
+        if len(parts) < 2:
+            return
+        keyword = parts[1]
+
+        # 다른 트렌드를 고르면 진행 중인 기사 수집과 스크립트 생성을 취소한다
+        self.cancel_generation()
+        if self.news_task is not None:
+            self.news_task.cancel()
+
+        # 트렌드 갱신 때 미리 받아 둔 기사가 있으면 바로 보여준다
+        if keyword in self.trend_tracker.news:
+            self.news_task = None
+            self.show_article_list(keyword, self.trend_tracker.news[keyword])
+            return
+
+        self.show_article_list(keyword, [])
+        task = AsyncTask(self.async_runner, self._stream_related_news, keyword, 10)
+        task.partial.connect(lambda article, task=task: self.add_related_article(task, article))
+        task.error.connect(lambda message: self.script_output.setPlainText(f"Error fetching news: {message}"))
+        self.news_task = task.start()
+
+    async def _stream_related_news(self, emit_partial, keyword, count):
+        async for article in self.scraper.stream_news_by_keyword(keyword, count):
+            emit_partial(article)
+
+    def add_related_article(self, task, article):
+        # 취소된 작업이 늦게 보낸 결과는 버린다
+        if task is not self.news_task:
+            return
+        self.current_news_articles[self.current_key].append(article)
+        item = QListWidgetItem(article['title'])
+        item.setFlags(item.flags() | Qt.ItemIsUserCheckable)
+        item.setCheckState(Qt.Unchecked)
+        self.related_news_widget.addItem(item)
+
+    def search_local_articles(self):
+        query = self.local_search_input.text().strip()
+        if not query:
+            return
+        # 스트리밍 중인 트렌드 기사가 검색 결과 목록에 섞여 들어가지 않게 멈춘다
+        if self.news_task is not None:
+            self.news_task.cancel()
+            self.news_task = None
+        articles = []
+        for result in self.news_manager.search(query, limit=20):
+            article = self.news_manager.get_article(result['url'])
+            if article and article['full_content']:
+                articles.append(article)
+        self.show_article_list(f"search:{query}", articles)
+
+    def show_article_list(self, key, news_articles):
         self.related_news_widget.clear()
-        news_articles = self.scraper.get_news_by_topic(keyword, 10)
-        self.current_news_articles[keyword] = news_articles
+        self.current_key = key
+        self.current_news_articles[key] = list(news_articles)
         for article in news_articles:
             item = QListWidgetItem(article['title'])
             item.setFlags(item.flags() | Qt.ItemIsUserCheckable)
@@ -164,9 +259,8 @@ class MainWindow(QMainWindow):
             self.related_news_widget.addItem(item)
 
     def update_selected_news(self, item):
-        keyword = self.search_trends_widget.currentItem().text().split(". ", 1)[1]
         index = self.related_news_widget.row(item)
-        article = self.current_news_articles[keyword][index]
+        article = self.current_news_articles[self.current_key][index]
         if item.checkState() == Qt.Checked:
             if article not in self.selected_news:
                 self.selected_news.append(article)
@@ -181,9 +275,8 @@ class MainWindow(QMainWindow):
             self.selected_news_widget.addItem(article['title'])
 
     def show_news_article(self, item):
-        keyword = self.search_trends_widget.currentItem().text().split(". ", 1)[1]
         index = self.related_news_widget.row(item)
-        article = self.current_news_articles[keyword][index]
+        article = self.current_news_articles[self.current_key][index]
         dialog = ArticleViewerDialog(article)
         dialog.exec_()
 
@@ -208,40 +301,173 @@ class MainWindow(QMainWindow):
             self.script_output.setPlainText("Please select at least one news article.")
             return
 
+        self.cancel_generation()
         self.script_output.setPlainText("Generating content...")
-        QApplication.processEvents()
 
         selected_style = self.style_combo.currentText()
         presenter_name = self.name_input.text() or "진행자"
         selected_language = self.language_combo.currentText()
 
-        script = self.generator.generate_script(self.selected_news, style=selected_style, presenter_name=presenter_name,
-                                                language=selected_language)
-        self.script_output.setPlainText("Validating script...")
-        QApplication.processEvents()
+        worker = Worker(self._generate, list(self.selected_news), selected_style, presenter_name, selected_language)
+        worker.signals.progress.connect(self.script_output.setPlainText)
+        worker.signals.partial.connect(self.append_script_output)
+        worker.signals.result.connect(self.show_generated_content)
+        worker.signals.error.connect(lambda message: self.script_output.setPlainText(f"Error occurred: {message}"))
+        self.generation_worker = worker
+        self.thread_pool.start(worker)
+
+    def _generate(self, worker, articles, style, presenter_name, language):
+        # 생성과 검증 결과를 토큰 단위로 바로 화면에 붙인다
+        parts = []
+        for delta in self.generator.generate_script_stream(articles, style=style, presenter_name=presenter_name,
+                                                           language=language):
+            if worker.cancelled:
+                return None
+            if not parts:
+                worker.signals.progress.emit("")
+            parts.append(delta)
+            worker.signals.partial.emit(delta)
+        script = ''.join(parts).strip()
+        # 증분 검증은 근거가 약한 문장만 고쳐서 한 번에 돌려주므로 그동안 생성된 스크립트를 그대로 보여 둔다
+        worker.signals.progress.emit(f"{script}\n\nValidating script...")
+
+        parts = []
+        for delta in self.validator.validate_script_stream(script, articles):
+            if worker.cancelled:
+                return None
+            if not parts:
+                worker.signals.progress.emit("")
+            parts.append(delta)
+            worker.signals.partial.emit(delta)
+        validated_script = ''.join(parts).strip()
+
+        image_path = self.image_generator.generate_announcer_image(presenter_name)
+        return validated_script, image_path
+
+    def generate_variants(self):
+        if not self.selected_news:
+            self.script_output.setPlainText("Please select at least one news article.")
+            return
+
+        self.cancel_generation()
+        self.script_output.setPlainText("Generating scripts in all languages...")
 
-        validated_script = self.validator.validate_script(script, self.selected_news)
+        selected_language = self.language_combo.currentText()
+        languages = [selected_language] + [language for language in self.generator.get_available_languages()
+                                           if language != selected_language]
+        worker = Worker(self._generate_variants, list(self.selected_news), self.style_combo.currentText(),
+                        self.name_input.text() or "진행자", languages)
+        worker.signals.progress.connect(self.script_output.setPlainText)
+        worker.signals.partial.connect(self.append_script_output)
+        worker.signals.error.connect(lambda message: self.script_output.setPlainText(f"Error occurred: {message}"))
+        self.generation_worker = worker
+        self.thread_pool.start(worker)
+
+    def _generate_variants(self, worker, articles, style, presenter_name, languages):
+        # 언어별 스크립트를 끝나는 순서대로 화면에 붙인다
+        first = True
+        for variant in self.generator.generate_variants(articles, styles=[style], languages=languages,
+                                                        presenter_name=presenter_name, validator=self.validator):
+            if worker.cancelled:
+                return None
+            if first:
+                worker.signals.progress.emit("")
+                first = False
+            body = variant["script"] if variant["error"] is None else f"Error occurred: {variant['error']}"
+            worker.signals.partial.emit(f"=== {variant['language']} ({variant['method']}) ===\n{body}\n\n")
+        return None
+
+    def append_script_output(self, delta):
+        self.script_output.moveCursor(QTextCursor.End)
+        self.script_output.insertPlainText(delta)
+
+    def show_generated_content(self, result):
+        validated_script, image_path = result
         self.script_output.setPlainText(validated_script)
 
-        # Generate and display image
-        image_path = self.image_generator.generate_announcer_image(presenter_name)
+        # Display generated image
         pixmap = QPixmap(image_path)
         self.image_label.setPixmap(pixmap.scaled(300, 300, Qt.KeepAspectRatio, Qt.SmoothTransformation))
 
+    def cancel_generation(self):
+        if self.generation_worker is not None:
+            self.generation_worker.cancel()
+            self.generation_worker = None
+
     def update_trends(self):
+        if self.trends_worker is not None:
+            return
         self.search_trends_widget.clear()
         self.search_trends_widget.addItem("Updating trends...")
-        QApplication.processEvents()
 
-        try:
-            search_trends = self.scraper.get_trending_keywords()
+        worker = Worker(lambda _: self.trend_tracker.poll())
+        worker.signals.result.connect(self.show_trends)
+        worker.signals.error.connect(self.show_trends_error)
+        worker.signals.finished.connect(self._trends_finished)
+        self.trends_worker = worker
+        self.thread_pool.start(worker)
 
-            self.search_trends_widget.clear()
-            for i, trend in enumerate(search_trends, 1):
-                self.search_trends_widget.addItem(f"{i}. {trend}")
-        except Exception as e:
-            self.search_trends_widget.clear()
-            self.search_trends_widget.addItem(f"Error updating trends: {str(e)}")
+    def show_trends(self, delta):
+        self.search_trends_widget.clear()
+        new_keywords = set(delta["new"])
+        for i, trend in enumerate(delta["keywords"], 1):
+            item = QListWidgetItem(f"{i}. {trend}")
+            if trend in new_keywords:
+                font = item.font()
+                font.setBold(True)
+                item.setFont(font)
+            self.search_trends_widget.addItem(item)
+
+        # 새로 들어온 키워드와 갱신 주기가 지난 키워드의 뉴스만 백그라운드에서 받아 둔다
+        if self.trend_news_task is None:
+            task = AsyncTask(self.async_runner, self._refresh_trend_news, delta)
+            task.finished.connect(self._trend_news_finished)
+            self.trend_news_task = task.start()
+
+    async def _refresh_trend_news(self, emit_partial, delta):
+        return await self.trend_tracker.refresh_news(delta)
+
+    def _trend_news_finished(self):
+        self.trend_news_task = None
+
+    def show_trends_error(self, message):
+        self.search_trends_widget.clear()
+        self.search_trends_widget.addItem(f"Error updating trends: {message}")
+
+    def _trends_finished(self):
+        self.trends_worker = None
+
+    def toggle_stats(self, checked):
+        self.stats_output.setVisible(checked)
+        if checked:
+            self.refresh_stats()
+            self.stats_timer.start(2000)
+        else:
+            self.stats_timer.stop()
+
+    def refresh_stats(self):
+        stats = tracer.stats()
+        lines = [f"{'stage':<30} {'count':>6} {'err':>4} {'p50 ms':>8} {'p95 ms':>8} {'KB':>8} {'tokens':>7} "
+                 f"{'cache':>6} {'retry':>5}"]
+        # 누적 시간이 큰 단계부터 보여 준다
+        for name, row in sorted(stats.items(), key=lambda item: -item[1]["avg_ms"] * item[1]["count"]):
+            cache = f"{row['cache_hit_rate']:.0%}" if row["cache_hit_rate"] is not None else "-"
+            lines.append(f"{name:<30} {row['count']:>6} {row['errors']:>4} {row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} "
+                         f"{row['bytes'] / 1024:>8.1f} {row['tokens']:>7} {cache:>6} {row['retries']:>5}")
+        self.stats_output.setPlainText("\n".join(lines) if stats else "No traced calls yet.")
+
+    def closeEvent(self, event):
+        self.cancel_generation()
+        if self.news_task is not None:
+            self.news_task.cancel()
+        if self.trend_news_task is not None:
+            self.trend_news_task.cancel()
+        self.async_runner.submit(self.scraper.close_session()).result(timeout=5)
+        self.async_runner.stop()
+        if self.metrics_server is not None:
+            self.metrics_server.shutdown()
+        tracer.flush()
+        super().closeEvent(event)
 
 
 if __name__ == "__main__":
@@ -2,40 +2,309 @@
 
 import sqlite3
 import os
+import re
+import threading
+from datetime import datetime
+from tracing import current_span, traced
+
+
+def char_bigrams(text):
+    # 단어마다 겹치는 두 글자 조각을 공백으로 이어 준다. 금리, 환율 같은 두 글자 검색어도 FTS로 찾기 위한 색인용
+    if not text:
+        return text
+    grams = []
+    for word in re.findall(r"\w+", text):
+        grams.extend(word[i:i + 2] for i in range(len(word) - 1))
+    return ' '.join(grams)
 
 class NewsManager:
-    def __init__(self):
-        self.db_path = "news_articles.db"
+    def __init__(self, db_path="news_articles.db"):
+        self.db_path = db_path
+        # 연결 하나를 계속 재사용한다. 스레드 간 접근은 lock으로 직렬화한다.
+        self.lock = threading.Lock()
+        self.conn = self.connect()
         self.create_table()
 
+    def connect(self):
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA cache_size=-16000")
+        conn.execute("PRAGMA busy_timeout=5000")
+        return conn
+
     def create_table(self):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS articles
-        (id INTEGER PRIMARY KEY AUTOINCREMENT,
-         title TEXT UNIQUE,
-         url TEXT,
-         date DATETIME DEFAULT CURRENT_TIMESTAMP)
-        ''')
-        conn.commit()
-        conn.close()
+        with self.lock, self.conn:
+            self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS articles
+            (id INTEGER PRIMARY KEY AUTOINCREMENT,
+             title TEXT UNIQUE,
+             url TEXT,
+             date DATETIME DEFAULT CURRENT_TIMESTAMP)
+            ''')
+            columns = {row[1] for row in self.conn.execute("PRAGMA table_info(articles)")}
+            for column in ("description", "full_content", "source"):
+                if column not in columns:
+                    self.conn.execute(f"ALTER TABLE articles ADD COLUMN {column} TEXT")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_articles_url ON articles (url)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_articles_date ON articles (date)")
+        self.create_fts_index()
+
+    def create_fts_index(self):
+        # 한국어는 형태소 경계가 공백과 다르므로 trigram 토크나이저로 부분 문자열을 색인한다
+        with self.lock, self.conn:
+            exists = self.conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'articles_fts'"
+            ).fetchone()
+            if exists:
+                sql = self.conn.execute("SELECT sql FROM sqlite_master WHERE name = 'articles_fts'").fetchone()[0]
+                self.fts_tokenizer = 'trigram' if 'trigram' in sql else 'unicode61'
+            else:
+                for tokenizer in ('trigram', 'unicode61'):
+                    try:
+                        self.conn.execute(f'''
+                        CREATE VIRTUAL TABLE articles_fts USING fts5
+                        (title, description, full_content,
+                         content='articles', content_rowid='id', tokenize='{tokenizer}')
+                        ''')
+                        self.fts_tokenizer = tokenizer
+                        break
+                    except sqlite3.OperationalError:
+                        continue
+                self.conn.execute("INSERT INTO articles_fts (articles_fts) VALUES ('rebuild')")
+
+            self.conn.executescript('''
+            CREATE TRIGGER IF NOT EXISTS articles_ai AFTER INSERT ON articles BEGIN
+                INSERT INTO articles_fts (rowid, title, description, full_content)
+                VALUES (new.id, new.title, new.description, new.full_content);
+            END;
+            CREATE TRIGGER IF NOT EXISTS articles_ad AFTER DELETE ON articles BEGIN
+                INSERT INTO articles_fts (articles_fts, rowid, title, description, full_content)
+                VALUES ('delete', old.id, old.title, old.description, old.full_content);
+            END;
+            CREATE TRIGGER IF NOT EXISTS articles_au AFTER UPDATE ON articles BEGIN
+                INSERT INTO articles_fts (articles_fts, rowid, title, description, full_content)
+                VALUES ('delete', old.id, old.title, old.description, old.full_content);
+                INSERT INTO articles_fts (rowid, title, description, full_content)
+                VALUES (new.id, new.title, new.description, new.full_content);
+            END;
+            ''')
+        self.create_bigram_index()
+
+    def create_bigram_index(self):
+        # trigram은 세 글자보다 짧은 검색어를 찾지 못하므로 두 글자 조각을 따로 색인한다.
+        # 조각 텍스트는 save_articles가 articles_bigram_text에 채우고, FTS는 그 테이블을 외부 콘텐츠로 삼아
+        # 보통 트리거로 맞춘다. 다른 프로그램이 articles만 고쳐도 색인이 깨지지 않고 조각만 늦게 갱신된다
+        with self.lock, self.conn:
+            row = self.conn.execute("SELECT sql FROM sqlite_master WHERE name = 'articles_bigram'").fetchone()
+            if row is None or 'articles_bigram_text' not in row[0]:
+                if row is not None:
+                    # 예전 contentless 색인은 버리고 다시 만든다
+                    self.conn.execute("DROP TABLE articles_bigram")
+                self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS articles_bigram_text
+                (id INTEGER PRIMARY KEY,
+                 title TEXT,
+                 description TEXT,
+                 full_content TEXT)
+                ''')
+                self.conn.execute("DELETE FROM articles_bigram_text")
+                self.conn.executemany(
+                    "INSERT INTO articles_bigram_text (id, title, description, full_content) VALUES (?, ?, ?, ?)",
+                    self._bigram_rows(self.conn.execute("SELECT id, title, description, full_content FROM articles")),
+                )
+                self.conn.execute('''
+                CREATE VIRTUAL TABLE articles_bigram USING fts5
+                (title, description, full_content,
+                 content='articles_bigram_text', content_rowid='id', tokenize='unicode61')
+                ''')
+                self.conn.execute("INSERT INTO articles_bigram (articles_bigram) VALUES ('rebuild')")
+
+            self.conn.executescript('''
+            CREATE TRIGGER IF NOT EXISTS articles_bigram_ai AFTER INSERT ON articles_bigram_text BEGIN
+                INSERT INTO articles_bigram (rowid, title, description, full_content)
+                VALUES (new.id, new.title, new.description, new.full_content);
+            END;
+            CREATE TRIGGER IF NOT EXISTS articles_bigram_ad AFTER DELETE ON articles_bigram_text BEGIN
+                INSERT INTO articles_bigram (articles_bigram, rowid, title, description, full_content)
+                VALUES ('delete', old.id, old.title, old.description, old.full_content);
+            END;
+            CREATE TRIGGER IF NOT EXISTS articles_bigram_au AFTER UPDATE ON articles_bigram_text BEGIN
+                INSERT INTO articles_bigram (articles_bigram, rowid, title, description, full_content)
+                VALUES ('delete', old.id, old.title, old.description, old.full_content);
+                INSERT INTO articles_bigram (rowid, title, description, full_content)
+                VALUES (new.id, new.title, new.description, new.full_content);
+            END;
+            ''')
+
+    @staticmethod
+    def _bigram_rows(rows):
+        return [(row[0], char_bigrams(row[1]), char_bigrams(row[2]), char_bigrams(row[3])) for row in rows]
+
+    def _update_bigrams(self, titles):
+        # upsert로 합쳐진 최종 값을 다시 읽어 조각을 만든다. REPLACE는 삭제 트리거를 건너뛰므로 UPSERT로 쓴다
+        for i in range(0, len(titles), 500):
+            chunk = titles[i:i + 500]
+            rows = self.conn.execute(
+                f"SELECT id, title, description, full_content FROM articles WHERE title IN ({', '.join('?' * len(chunk))})",
+                chunk,
+            ).fetchall()
+            self.conn.executemany('''
+            INSERT INTO articles_bigram_text (id, title, description, full_content) VALUES (?, ?, ?, ?)
+            ON CONFLICT(id) DO UPDATE SET
+                title = excluded.title,
+                description = excluded.description,
+                full_content = excluded.full_content
+            ''', self._bigram_rows(rows))
 
     def save_article(self, title, url):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        try:
-            cursor.execute("INSERT OR REPLACE INTO articles (title, url) VALUES (?, ?)", (title, url))
-            conn.commit()
-        except sqlite3.Error as e:
-            print(f"An error occurred: {e}")
-        finally:
-            conn.close()
+        self.save_articles([{"title": title, "url": url}])
+
+    @traced('db.save_articles')
+    def save_articles(self, articles):
+        rows = [
+            (article['title'], article['url'], article.get('description'),
+             article.get('full_content'), self._source_name(article.get('source')))
+            for article in articles
+        ]
+        if not rows:
+            return
+        current_span().set(rows=len(rows))
+        with self.lock:
+            try:
+                with self.conn:
+                    self.conn.executemany('''
+                    INSERT INTO articles (title, url, description, full_content, source) VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT(title) DO UPDATE SET
+                        url = excluded.url,
+                        description = COALESCE(excluded.description, articles.description),
+                        full_content = COALESCE(excluded.full_content, articles.full_content),
+                        source = COALESCE(excluded.source, articles.source),
+                        date = CURRENT_TIMESTAMP
+                    ''', rows)
+                    self._update_bigrams([row[0] for row in rows])
+            except sqlite3.Error as e:
+                current_span().fail(e)
+                print(f"An error occurred: {e}")
+
+    @staticmethod
+    def _source_name(source):
+        # NewsAPI는 source를 {"id": ..., "name": ...} 형태로 준다
+        if isinstance(source, dict):
+            return source.get('name')
+        return source
+
+    @traced('db.search')
+    def search(self, query, limit=20, since=None):
+        terms = [term.replace('"', '') for term in query.split()]
+        terms = [term for term in terms if term]
+        if not terms:
+            return []
+        min_length = 3 if self.fts_tokenizer == 'trigram' else 1
+        match_terms = [term for term in terms if len(term) >= min_length]
+        # 두 글자 검색어는 bigram 색인에서 찾는다
+        bigram_terms = [term for term in terms if len(term) == 2 and len(term) < min_length]
+        like_terms = [term for term in terms if len(term) < min(min_length, 2)]
+        if isinstance(since, datetime):
+            since = since.strftime("%Y-%m-%d %H:%M:%S")
+
+        conditions = []
+        params = []
+        for term in like_terms:
+            # 한 글자 검색어는 어느 색인에도 맞지 않으므로 LIKE로 거른다
+            conditions.append("(a.title LIKE ? OR a.description LIKE ? OR a.full_content LIKE ?)")
+            params.extend([f"%{term}%"] * 3)
+        if since is not None:
+            conditions.append("a.date >= ?")
+            params.append(since)
+        bigram_query = ' '.join(f'"{term}"' for term in bigram_terms)
+
+        if match_terms:
+            if bigram_terms:
+                conditions.insert(0, "a.id IN (SELECT rowid FROM articles_bigram WHERE articles_bigram MATCH ?)")
+                params.insert(0, bigram_query)
+            sql = '''
+            SELECT a.title, a.url, a.date, a.description, a.source,
+                   snippet(articles_fts, 2, '[', ']', '...', 16), bm25(articles_fts, 10.0, 5.0, 1.0) AS rank
+            FROM articles_fts JOIN articles a ON a.id = articles_fts.rowid
+            WHERE articles_fts MATCH ?
+            '''
+            params.insert(0, ' '.join(f'"{term}"' for term in match_terms))
+            for condition in conditions:
+                sql += f" AND {condition}"
+            sql += " ORDER BY rank LIMIT ?"
+        elif bigram_terms:
+            # 색인 텍스트가 두 글자 조각이라 snippet으로 보여 줄 수 없다
+            sql = '''
+            SELECT a.title, a.url, a.date, a.description, a.source,
+                   NULL, bm25(articles_bigram, 10.0, 5.0, 1.0) AS rank
+            FROM articles_bigram JOIN articles a ON a.id = articles_bigram.rowid
+            WHERE articles_bigram MATCH ?
+            '''
+            params.insert(0, bigram_query)
+            for condition in conditions:
+                sql += f" AND {condition}"
+            sql += " ORDER BY rank LIMIT ?"
+        else:
+            sql = "SELECT a.title, a.url, a.date, a.description, a.source, NULL, 0 FROM articles a"
+            if conditions:
+                sql += " WHERE " + " AND ".join(conditions)
+            sql += " ORDER BY a.date DESC LIMIT ?"
+        params.append(limit)
+
+        with self.lock:
+            rows = self.conn.execute(sql, params).fetchall()
+        return [
+            {"title": row[0], "url": row[1], "date": row[2], "description": row[3],
+             "source": row[4], "snippet": row[5], "score": -row[6]}
+            for row in rows
+        ]
+
+    @traced('db.get_article')
+    def get_article(self, url):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT title, url, date, description, full_content, source FROM articles "
+                "WHERE url = ? ORDER BY date DESC LIMIT 1",
+                (url,),
+            ).fetchone()
+        if row is None:
+            return None
+        keys = ("title", "url", "date", "description", "full_content", "source")
+        return dict(zip(keys, row))
+
+    def get_articles(self, limit=50, cursor=None):
+        # (date, id) 기준 키셋 페이지네이션. 다음 페이지를 위한 cursor를 함께 돌려준다.
+        with self.lock:
+            if cursor is None:
+                rows = self.conn.execute(
+                    "SELECT id, title, url, date FROM articles ORDER BY date DESC, id DESC LIMIT ?",
+                    (limit,),
+                ).fetchall()
+            else:
+                date, last_id = cursor
+                rows = self.conn.execute(
+                    "SELECT id, title, url, date FROM articles "
+                    "WHERE date < ? OR (date = ? AND id < ?) "
+                    "ORDER BY date DESC, id DESC LIMIT ?",
+                    (date, date, last_id, limit),
+                ).fetchall()
+        articles = [{"title": row[1], "url": row[2], "date": row[3]} for row in rows]
+        next_cursor = (rows[-1][3], rows[-1][0]) if len(rows) == limit else None
+        return articles, next_cursor
+
+    def iter_articles(self, page_size=200):
+        cursor = None
+        while True:
+            articles, cursor = self.get_articles(page_size, cursor)
+            yield from articles
+            if cursor is None:
+                break
 
     def get_all_articles(self):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute("SELECT title, url, date FROM articles ORDER BY date DESC")
-        articles = [{"title": row[0], "url": row[1], "date": row[2]} for row in cursor.fetchall()]
-        conn.close()
-        return articles
\ No newline at end of file
+        return list(self.iter_articles())
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -1,13 +1,19 @@
-from openai import OpenAI
-from config import OPENAI_API_KEY
-
-client = OpenAI(api_key=OPENAI_API_KEY)
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from llm_cache import get_llm_cache
+from openai_client import get_async_client, get_client
+from prompt_builder import TokenCounter
+from tracing import current_span, propagate, traced
 
 class NewsSummarizer:
-    def __init__(self):
-        pass
+    def __init__(self, max_workers=4, max_input_tokens=3000, concurrency=8):
+        self.llm_cache = get_llm_cache()
+        self.max_workers = max_workers
+        self.max_input_tokens = max_input_tokens
+        self.concurrency = concurrency
+        self.counter = TokenCounter()
 
-    def summarize_article(self, article):
+    def build_messages(self, article):
         prompt = f"""다음 뉴스 기사의 핵심 내용을 간결한 문장으로 요약해주세요. 
         중요한 사실만을 포함하고, 불필요한 세부 사항은 제외하세요.
 
@@ -16,24 +22,91 @@ class NewsSummarizer:
 
         요약:"""
 
+        return [
+            {"role": "system", "content": "당신은 사실을 정확하게 전달하는 아나운서이며, 뉴스 기사를 간결하고 정확하게 요약하는 전문가입니다."},
+            {"role": "user", "content": prompt}
+        ]
+
+    @traced('summarizer.summarize_article')
+    def summarize_article(self, article):
         try:
-            response = client.chat.completions.create(
+            return self.llm_cache.complete(
+                get_client(),
                 model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "당신은 사실을 정확하게 전달하는 아나운서이며, 뉴스 기사를 간결하고 정확하게 요약하는 전문가입니다."},
-                    {"role": "user", "content": prompt}
-                ],
+                messages=self.build_messages(article),
                 max_tokens=150,
-                n=1,
                 temperature=0.3,
             )
-            return response.choices[0].message.content.strip()
         except Exception as e:
             return f"요약 중 오류 발생: {str(e)}"
 
+    @traced('summarizer.summarize_article')
+    async def summarize_article_async(self, async_client, article, semaphore):
+        # 분당 요청/토큰 한도와 429/5xx 재시도는 llm_cache가 공유 limiter로 처리한다
+        async with semaphore:
+            try:
+                return await self.llm_cache.acomplete(
+                    async_client,
+                    model="gpt-3.5-turbo",
+                    messages=self.build_messages(article),
+                    max_tokens=150,
+                    temperature=0.3,
+                )
+            except Exception as e:
+                return f"요약 중 오류 발생: {str(e)}"
+
+    async def summarize_multiple_articles_async(self, articles, concurrency=None):
+        # 동시 요청 수는 concurrency로 제한한다. 결과는 입력 순서를 따른다.
+        semaphore = asyncio.Semaphore(concurrency or self.concurrency)
+        async_client = get_async_client()
+        summaries = await asyncio.gather(
+            *[self.summarize_article_async(async_client, article, semaphore) for article in articles]
+        )
+        return [
+            {"title": article['title'], "summary": summary, "url": article['url']}
+            for article, summary in zip(articles, summaries)
+        ]
+
     def summarize_multiple_articles(self, articles):
         summaries = []
         for article in articles:
             summary = self.summarize_article(article)
             summaries.append({"title": article['title'], "summary": summary, "url": article['url']})
-        return summaries
\ No newline at end of file
+        return summaries
+
+    @traced('summarizer.summarize_content')
+    def summarize_content(self, article, max_tokens=300):
+        content = self.counter.truncate(article['full_content'], self.max_input_tokens)
+        prompt = f"""다음 뉴스 기사 본문을 핵심 사실 위주로 요약해주세요.
+        인물, 수치, 날짜, 인용문처럼 스크립트에 필요한 구체적인 정보는 남기고, 불필요한 세부 사항은 제외하세요.
+
+        제목: {article['title']}
+        본문: {content}
+
+        요약:"""
+
+        try:
+            return self.llm_cache.complete(
+                get_client(),
+                model="gpt-3.5-turbo",
+                messages=[
+                    {"role": "system", "content": "당신은 사실을 정확하게 전달하는 아나운서이며, 뉴스 기사를 간결하고 정확하게 요약하는 전문가입니다."},
+                    {"role": "user", "content": prompt}
+                ],
+                max_tokens=max_tokens,
+                temperature=0.3,
+            )
+        except Exception as e:
+            current_span().fail(e)
+            print(f"Error summarizing article '{article['title']}': {str(e)}")
+            return None
+
+    @traced('summarizer.summarize')
+    def summarize_contents(self, articles, max_tokens=300):
+        # 여러 기사 본문을 동시에 요약하고 입력 순서대로 돌려준다
+        if not articles:
+            return []
+        current_span().set(articles=len(articles))
+        summarize = propagate(lambda article: self.summarize_content(article, max_tokens))
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(articles))) as executor:
+            return list(executor.map(summarize, articles))
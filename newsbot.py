@@ -0,0 +1,228 @@
+# GUI 없이 트렌드 키워드별로 스크립트, PDF, 이미지를 만드는 배치 실행기.
+# 사용법: python -m newsbot run --top 10 --style 아나운서 --lang English --jobs 8
+#        python -m newsbot run --resume runs/20240711_093000
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+LANGUAGES = ["한국어", "English", "日本語", "中文"]
+
+
+def slugify(text):
+    slug = "".join(c if c.isalnum() else "_" for c in text).strip("_")
+    return slug[:50] or "keyword"
+
+
+def write_json_atomic(path, data):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+class BatchRun:
+    def __init__(self, run_dir, options, keywords=None, results=None):
+        self.run_dir = run_dir
+        self.options = options
+        self.keywords = keywords or []
+        self.results = results or {}
+        self.checkpoint_path = os.path.join(run_dir, "checkpoint.json")
+        self.manifest_path = os.path.join(run_dir, "manifest.json")
+        self.lock = asyncio.Lock()
+
+    @classmethod
+    def create(cls, output_dir, options):
+        run_id = datetime.now().strftime("%Y%m%d_%H%M%S")
+        run_dir = os.path.join(output_dir, run_id)
+        os.makedirs(run_dir, exist_ok=True)
+        return cls(run_dir, options)
+
+    @classmethod
+    def resume(cls, run_dir):
+        with open(os.path.join(run_dir, "checkpoint.json"), encoding='utf-8') as f:
+            state = json.load(f)
+        return cls(run_dir, state["options"], state["keywords"], state["results"])
+
+    def is_done(self, keyword):
+        return self.results.get(keyword, {}).get("status") == "done"
+
+    async def record(self, keyword, result):
+        async with self.lock:
+            self.results[keyword] = result
+            self.save_checkpoint()
+
+    def save_checkpoint(self):
+        write_json_atomic(self.checkpoint_path, {
+            "options": self.options,
+            "keywords": self.keywords,
+            "results": self.results,
+        })
+
+    def write_manifest(self, started_at):
+        manifest = {
+            "run_dir": self.run_dir,
+            "started_at": started_at,
+            "finished_at": datetime.now().isoformat(timespec='seconds'),
+            "options": self.options,
+            "keywords": [
+                dict(keyword=keyword, **self.results.get(keyword, {"status": "pending"}))
+                for keyword in self.keywords
+            ],
+        }
+        write_json_atomic(self.manifest_path, manifest)
+        return manifest
+
+
+class Pipeline:
+    def __init__(self, options):
+        # 무거운 모듈은 실제로 실행할 때만 불러온다
+        from content_scraper import ContentScraper
+        from image_generator import ImageGenerator
+        from news_manager import NewsManager
+        from pdf_generator import PDFGenerator
+        from report_renderer import ReportRenderer
+        from script_generator import ScriptGenerator
+        from script_validator import ScriptValidator
+
+        self.options = options
+        self.news_manager = NewsManager()
+        self.scraper = ContentScraper(news_manager=self.news_manager)
+        self.generator = ScriptGenerator()
+        self.validator = ScriptValidator()
+        # PDF는 CPU를 많이 쓰므로 여러 키워드의 리포트를 프로세스 풀에서 나눠 그린다
+        self.pdf_generator = PDFGenerator(renderer=ReportRenderer(max_workers=min(options["jobs"], os.cpu_count() or 1)))
+        self.image_generator = ImageGenerator()
+
+    def trending_keywords(self):
+        from trend_analyzer import TrendAnalyzer
+        return TrendAnalyzer().get_search_trends(self.options["top"])
+
+    async def process(self, run, keyword, image_path):
+        options = self.options
+        started = time.monotonic()
+        result = {"status": "running"}
+        try:
+            articles = await self.scraper.get_news_by_keyword(keyword, options["articles"])
+            articles = [article for article in articles if article.get('full_content')]
+            if not articles:
+                raise RuntimeError("no articles scraped")
+            result["articles"] = [{"title": article['title'], "url": article['url']} for article in articles]
+
+            script = await asyncio.to_thread(
+                self.generator.generate_script, articles, style=options["style"],
+                presenter_name=options["presenter"], language=options["lang"],
+            )
+            # 생성기와 검증기는 실패하면 예외 대신 오류 문장을 돌려준다
+            if script.startswith("Error occurred:"):
+                raise RuntimeError(script)
+            if options["validate"]:
+                validated = await asyncio.to_thread(self.validator.validate_script, script, articles)
+                if validated.startswith("검증 및 수정 중 오류 발생"):
+                    result["validation_error"] = validated
+                else:
+                    script = validated
+
+            keyword_dir = os.path.join(run.run_dir, slugify(keyword))
+            os.makedirs(keyword_dir, exist_ok=True)
+            script_path = os.path.join(keyword_dir, "script.txt")
+            with open(script_path, 'w', encoding='utf-8') as f:
+                f.write(script)
+
+            # 키워드마다 실행 디렉터리 안에 따로 써서 키워드가 같게 뽑혀도 서로 덮어쓰지 않는다
+            pdf_path = await asyncio.to_thread(
+                self.pdf_generator.generate_pdf, script, articles, options["presenter"], options["style"],
+                os.path.join(keyword_dir, "report.pdf")
+            )
+            result.update(status="done", script=script_path, pdf=pdf_path, image=image_path)
+        except Exception as e:
+            print(f"[{keyword}] failed: {str(e)}", file=sys.stderr)
+            result.update(status="failed", error=str(e))
+        result["duration"] = round(time.monotonic() - started, 2)
+        await run.record(keyword, result)
+        print(f"[{keyword}] {result['status']} in {result['duration']}s")
+        return result
+
+    async def run(self, run):
+        image_path = await asyncio.to_thread(self.image_generator.generate_announcer_image, self.options["presenter"])
+        semaphore = asyncio.Semaphore(self.options["jobs"])
+
+        async def bounded(keyword):
+            async with semaphore:
+                return await self.process(run, keyword, image_path)
+
+        pending = [keyword for keyword in run.keywords if not run.is_done(keyword)]
+        if len(pending) < len(run.keywords):
+            print(f"Resuming: {len(run.keywords) - len(pending)} keyword(s) already done")
+        try:
+            async with self.scraper:
+                await asyncio.gather(*[bounded(keyword) for keyword in pending])
+        finally:
+            self.pdf_generator.renderer.shutdown()
+
+
+def command_run(args):
+    if args.resume:
+        run = BatchRun.resume(args.resume)
+    else:
+        options = {
+            "top": args.top,
+            "style": args.style,
+            "lang": args.lang,
+            "presenter": args.presenter,
+            "articles": args.articles,
+            "jobs": args.jobs,
+            "validate": not args.no_validate,
+        }
+        run = BatchRun.create(args.output_dir, options)
+
+    pipeline = Pipeline(run.options)
+    if run.options["style"] not in pipeline.generator.styles:
+        print(f"Unknown style: {run.options['style']} (choose from {', '.join(pipeline.generator.get_available_styles())})",
+              file=sys.stderr)
+        return 2
+    if not run.keywords:
+        run.keywords = args.keywords or pipeline.trending_keywords()
+        if not run.keywords:
+            print("No trending keywords found.", file=sys.stderr)
+            return 1
+        run.save_checkpoint()
+
+    started_at = datetime.now().isoformat(timespec='seconds')
+    print(f"Run directory: {run.run_dir}")
+    asyncio.run(pipeline.run(run))
+    manifest = run.write_manifest(started_at)
+    failed = [entry["keyword"] for entry in manifest["keywords"] if entry["status"] != "done"]
+    print(f"Manifest written to {run.manifest_path}")
+    return 1 if failed else 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="newsbot", description="Headless news script pipeline")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Generate scripts, PDFs and images for trending keywords")
+    run_parser.add_argument("--top", type=int, default=10, help="number of trending keywords")
+    run_parser.add_argument("--keywords", nargs="*", help="use these keywords instead of fetching trends")
+    run_parser.add_argument("--style", default="아나운서")
+    run_parser.add_argument("--lang", default="한국어", choices=LANGUAGES)
+    run_parser.add_argument("--presenter", default="진행자")
+    run_parser.add_argument("--articles", type=int, default=5, help="articles per keyword")
+    run_parser.add_argument("--jobs", type=int, default=4, help="keywords processed concurrently")
+    run_parser.add_argument("--no-validate", action="store_true", help="skip ScriptValidator")
+    run_parser.add_argument("--output-dir", default="runs")
+    run_parser.add_argument("--resume", metavar="RUN_DIR", help="resume an interrupted run from its checkpoint")
+    run_parser.set_defaults(func=command_run)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,32 @@
+import asyncio
+import threading
+import weakref
+from config import OPENAI_API_KEY
+
+# openai 패키지는 무거워서 실제로 호출할 때 처음 불러온다.
+# 재시도는 rate_limiter.call_with_limits가 RPM/TPM 버킷과 서킷 브레이커를 거쳐 하므로 SDK 자체 재시도는 끈다
+_client = None
+_async_clients = weakref.WeakKeyDictionary()
+_lock = threading.Lock()
+
+
+def get_client():
+    # 동기 클라이언트는 스레드 간에 안전하므로 프로세스 전체에서 하나만 쓴다
+    global _client
+    with _lock:
+        if _client is None:
+            from openai import OpenAI
+            _client = OpenAI(api_key=OPENAI_API_KEY, max_retries=0)
+        return _client
+
+
+def get_async_client():
+    # 비동기 클라이언트의 커넥션 풀은 이벤트 루프에 묶이므로 루프마다 하나씩 둔다
+    loop = asyncio.get_running_loop()
+    with _lock:
+        client = _async_clients.get(loop)
+        if client is None:
+            from openai import AsyncOpenAI
+            client = AsyncOpenAI(api_key=OPENAI_API_KEY, max_retries=0)
+            _async_clients[loop] = client
+        return client
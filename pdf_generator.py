@@ -1,69 +1,66 @@
 import os
 from datetime import datetime
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.enums import TA_CENTER
-from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize
-import nltk
+from report_renderer import ReportRenderer
 
-nltk.download('punkt', quiet=True)
-nltk.download('stopwords', quiet=True)
 
 class PDFGenerator:
-    def __init__(self):
+    def __init__(self, keyword_extractor=None, renderer=None):
         self.base_dir = "generated_news_reports"
         os.makedirs(self.base_dir, exist_ok=True)
+        self.keyword_extractor = keyword_extractor
+        # 기본은 호출한 스레드에서 바로 그린다. 배치 실행은 ReportRenderer(max_workers=N)를 넘겨 프로세스 풀을 쓴다
+        self.renderer = renderer or ReportRenderer(max_workers=0)
+
+    def get_keyword_extractor(self):
+        # 처음 쓸 때 저장된 DF를 읽고, 그 뒤 기사 저장소에 새로 쌓인 기사만 반영한다
+        if self.keyword_extractor is None:
+            from article_store import ArticleStore
+            from keyword_extractor import KeywordExtractor
+            self.keyword_extractor = KeywordExtractor()
+            article_store = ArticleStore()
+            try:
+                self.keyword_extractor.update_from_store(article_store)
+            finally:
+                article_store.close()
+        return self.keyword_extractor
 
     def extract_keywords(self, text, num_keywords=3):
-        stop_words = set(stopwords.words('english'))
-        word_tokens = word_tokenize(text.lower())
-        filtered_words = [word for word in word_tokens if word.isalnum() and word not in stop_words]
-        word_freq = nltk.FreqDist(filtered_words)
-        return [word for word, _ in word_freq.most_common(num_keywords)]
+        return self.get_keyword_extractor().extract(text, num_keywords)
+
+    def extract_keywords_batch(self, texts, num_keywords=3):
+        return self.get_keyword_extractor().extract_batch(texts, num_keywords)
 
-    def generate_pdf(self, script_content, news_articles, presenter_name, style):
+    def build_job(self, script_content, news_articles, presenter_name, style, keywords, filepath=None):
         date_str = datetime.now().strftime("%Y%m%d")
-        date_folder = os.path.join(self.base_dir, date_str)
-        os.makedirs(date_folder, exist_ok=True)
+        if filepath is None:
+            date_folder = os.path.join(self.base_dir, date_str)
+            os.makedirs(date_folder, exist_ok=True)
+            filename = f"{date_str}_{presenter_name}_{style}_{'_'.join(keywords) or 'news'}.pdf"
+            filepath = os.path.join(date_folder, filename)
+        return {
+            "filepath": filepath,
+            "script": script_content,
+            "articles": [{"title": article['title'], "url": article['url'], "full_content": article['full_content']}
+                         for article in news_articles],
+            "presenter_name": presenter_name,
+            "style": style,
+            "date_str": date_str,
+            "keywords": keywords,
+        }
 
+    def generate_pdf(self, script_content, news_articles, presenter_name, style, filepath=None):
+        # filepath를 주지 않으면 generated_news_reports/<날짜>/ 아래에 날짜, 진행자, 스타일, 키워드로 이름을 짓는다
         keywords = self.extract_keywords(script_content)
-        filename = f"{date_str}_{presenter_name}_{style}_{'_'.join(keywords)}.pdf"
-        filepath = os.path.join(date_folder, filename)
-
-        doc = SimpleDocTemplate(filepath, pagesize=letter)
-        styles = getSampleStyleSheet()
-        styles.add(ParagraphStyle(name='Center', alignment=TA_CENTER))
-        story = []
-
-        # Add title
-        story.append(Paragraph(f"뉴스 리포트 - {date_str}", styles['Title']))
-        story.append(Spacer(1, 12))
-
-        # Add presenter and style
-        story.append(Paragraph(f"진행자: {presenter_name}", styles['Normal']))
-        story.append(Paragraph(f"스타일: {style}", styles['Normal']))
-        story.append(Spacer(1, 12))
-
-        # Add script content
-        story.append(Paragraph("생성된 스크립트", styles['Heading1']))
-        story.append(Paragraph(script_content, styles['BodyText']))
-        story.append(PageBreak())
-
-        # Add original news articles
-        for i, article in enumerate(news_articles, 1):
-            story.append(Paragraph(f"뉴스 기사 {i}", styles['Heading1']))
-            story.append(Paragraph(f"제목: {article['title']}", styles['Heading2']))
-            story.append(Paragraph(f"URL: {article['url']}", styles['Normal']))
-            story.append(Spacer(1, 12))
-            story.append(Paragraph("전체 내용:", styles['Heading3']))
-            story.append(Paragraph(article['full_content'], styles['BodyText']))
-            story.append(PageBreak())
-
-        doc.build(story)
+        job = self.build_job(script_content, news_articles, presenter_name, style, keywords, filepath)
+        filepath, _ = self.renderer.render(job)
         return filepath
 
+    def generate_pdfs(self, reports):
+        # reports: (script_content, news_articles, presenter_name, style) 목록. 키워드는 한 번에 뽑고 리포트는 나눠 그린다
+        keywords = self.extract_keywords_batch([report[0] for report in reports])
+        jobs = [self.build_job(*report, keywords=report_keywords) for report, report_keywords in zip(reports, keywords)]
+        return [filepath for filepath, _ in self.renderer.render_batch(jobs)]
+
     def open_pdf(self, filepath):
         os.startfile(filepath)  # This works on Windows
         # For macOS, use: os.system(f"open {filepath}")
@@ -0,0 +1,100 @@
+def _is_wide(char):
+    # 한글/한자/가나는 대략 글자당 1토큰으로 센다
+    code = ord(char)
+    return (0xAC00 <= code <= 0xD7A3 or 0x3040 <= code <= 0x30FF
+            or 0x4E00 <= code <= 0x9FFF or 0x1100 <= code <= 0x11FF)
+
+
+class TokenCounter:
+    def __init__(self, model="gpt-3.5-turbo"):
+        self.model = model
+        self._encoding = None
+        self._loaded = False
+
+    @property
+    def encoding(self):
+        # tiktoken 인코딩은 처음 셀 때 불러온다 (첫 로드 때 BPE 파일을 받아올 수 있다)
+        if not self._loaded:
+            try:
+                import tiktoken
+            except ImportError:
+                tiktoken = None
+            if tiktoken is not None:
+                try:
+                    self._encoding = tiktoken.encoding_for_model(self.model)
+                except KeyError:
+                    self._encoding = tiktoken.get_encoding("cl100k_base")
+            self._loaded = True
+        return self._encoding
+
+    def count(self, text):
+        if not text:
+            return 0
+        if self.encoding is not None:
+            return len(self.encoding.encode(text))
+        wide = sum(1 for char in text if _is_wide(char))
+        return wide + (len(text) - wide + 3) // 4
+
+    def truncate(self, text, max_tokens):
+        if not text or max_tokens <= 0:
+            return ''
+        if self.encoding is not None:
+            tokens = self.encoding.encode(text)
+            if len(tokens) <= max_tokens:
+                return text
+            return self.encoding.decode(tokens[:max_tokens])
+        cost = 0.0
+        for i, char in enumerate(text):
+            cost += 1 if _is_wide(char) else 0.25
+            if cost > max_tokens:
+                return text[:i]
+        return text
+
+
+def allocate_budget(token_counts, budget):
+    # 짧은 기사는 필요한 만큼만 쓰고 남는 토큰을 긴 기사들에게 고르게 나눈다 (water-filling)
+    shares = [0] * len(token_counts)
+    remaining = budget
+    order = sorted(range(len(token_counts)), key=lambda i: token_counts[i])
+    for position, i in enumerate(order):
+        fair_share = remaining // (len(order) - position)
+        shares[i] = min(token_counts[i], fair_share)
+        remaining -= shares[i]
+    return shares
+
+
+class PromptBuilder:
+    def __init__(self, summarizer=None, counter=None, article_budget=6000, summary_tokens=300):
+        self.summarizer = summarizer
+        self.counter = counter or TokenCounter()
+        self.article_budget = article_budget
+        self.summary_tokens = summary_tokens
+
+    def _get_summarizer(self):
+        if self.summarizer is None:
+            from news_summarizer import NewsSummarizer
+            self.summarizer = NewsSummarizer()
+        return self.summarizer
+
+    def prepare_articles(self, articles, budget=None):
+        # 기사 본문이 예산 안에 들어가면 그대로, 넘치면 넘치는 기사만 요약(map)한 뒤 생성(reduce)에 쓴다
+        budget = self.article_budget if budget is None else budget
+        counts = [self.counter.count(article['title']) + self.counter.count(article['full_content'])
+                  for article in articles]
+        if sum(counts) <= budget:
+            return articles
+
+        shares = allocate_budget(counts, budget)
+        over_budget = [i for i in range(len(articles)) if counts[i] > shares[i]]
+        summaries = self._get_summarizer().summarize_contents(
+            [articles[i] for i in over_budget], max_tokens=self.summary_tokens
+        )
+
+        prepared = list(articles)
+        for i, summary in zip(over_budget, summaries):
+            content_budget = shares[i] - self.counter.count(articles[i]['title'])
+            article = dict(articles[i])
+            # 요약에 실패하면 원문을 잘라서라도 예산을 지킨다
+            article['full_content'] = self.counter.truncate(summary or articles[i]['full_content'], content_budget)
+            prepared[i] = article
+        return prepared
@@ -0,0 +1,311 @@
+import asyncio
+import random
+import sys
+import threading
+import time
+from tracing import current_span
+
+
+class TokenBucket:
+    def __init__(self, rate_per_minute, capacity=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount):
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def consume(self, amount):
+        self.tokens -= min(amount, self.capacity)
+
+
+class RateLimiter:
+    # 분당 요청 수(RPM)와 분당 토큰 수(TPM)를 함께 지킨다.
+    # 상태는 threading.Lock으로만 보호하므로 여러 이벤트 루프와 스레드에서 같이 쓸 수 있다.
+    def __init__(self, requests_per_minute, tokens_per_minute=None, name=None):
+        self.name = name
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.lock = threading.Lock()
+        self.acquired = 0
+        self.delayed = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def _record_wait(self, waited, delayed):
+        with self.lock:
+            self.acquired += 1
+            if delayed:
+                self.delayed += 1
+                self.total_wait += waited
+                self.max_wait = max(self.max_wait, waited)
+
+    def stats(self):
+        with self.lock:
+            return {
+                "acquired": self.acquired,
+                "delayed": self.delayed,
+                "total_wait": round(self.total_wait, 3),
+                "avg_wait": round(self.total_wait / self.acquired, 3) if self.acquired else 0.0,
+                "max_wait": round(self.max_wait, 3),
+            }
+
+    def _reserve(self, tokens):
+        with self.lock:
+            self.requests.refill()
+            wait = self.requests.wait_time(1)
+            if self.tokens is not None:
+                self.tokens.refill()
+                wait = max(wait, self.tokens.wait_time(tokens))
+            if wait <= 0:
+                self.requests.consume(1)
+                if self.tokens is not None:
+                    self.tokens.consume(tokens)
+            return wait
+
+    async def acquire_async(self, tokens=1):
+        start = time.monotonic()
+        delayed = False
+        while True:
+            wait = self._reserve(tokens)
+            if wait <= 0:
+                self._record_wait(time.monotonic() - start, delayed)
+                return
+            delayed = True
+            await asyncio.sleep(wait)
+
+    def acquire(self, tokens=1):
+        start = time.monotonic()
+        delayed = False
+        while True:
+            wait = self._reserve(tokens)
+            if wait <= 0:
+                self._record_wait(time.monotonic() - start, delayed)
+                return
+            delayed = True
+            time.sleep(wait)
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class CircuitBreaker:
+    # 연속 실패가 쌓이면 reset_timeout 동안 요청을 막고, 그 뒤 한 번만 시험 요청을 보낸다
+    def __init__(self, failure_threshold=5, reset_timeout=60.0, name=None):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.half_open_trial = False
+        self.rejected = 0
+        self.lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return 'half-open'
+        return 'open'
+
+    def allow(self):
+        with self.lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half-open' and not self.half_open_trial:
+                self.half_open_trial = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.half_open_trial = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.half_open_trial or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self.half_open_trial = False
+
+    def release_trial(self):
+        # 시험 요청이 취소되면 성공도 실패도 아니므로 자리만 돌려줘 다음 호출이 다시 시험하게 한다
+        with self.lock:
+            self.half_open_trial = False
+
+    def check(self):
+        if not self.allow():
+            raise CircuitOpenError(f"Circuit open for {self.name}")
+
+    def stats(self):
+        with self.lock:
+            return {"state": self.state, "failures": self.failures, "rejected": self.rejected}
+
+
+def connection_error_types():
+    # 연결 거부, DNS 실패, SSL 오류, 시간 초과처럼 응답을 받지 못한 오류들.
+    # 아직 불러오지 않은 라이브러리의 예외는 나올 수 없으므로 이미 불러온 모듈에서만 찾는다
+    types = [asyncio.TimeoutError, TimeoutError, ConnectionError]
+    aiohttp = sys.modules.get('aiohttp')
+    if aiohttp is not None:
+        types.append(aiohttp.ClientConnectionError)
+    openai = sys.modules.get('openai')
+    if openai is not None:
+        types.append(openai.APIConnectionError)
+    requests = sys.modules.get('requests')
+    if requests is not None:
+        types += [requests.ConnectionError, requests.Timeout]
+    return tuple(types)
+
+
+def status_of(error):
+    status = getattr(error, 'status_code', None) or getattr(error, 'status', None)
+    return status if isinstance(status, int) else None
+
+
+def is_retryable(error):
+    status = status_of(error)
+    if status is not None:
+        return status == 429 or status >= 500
+    return isinstance(error, connection_error_types())
+
+
+def is_client_error(error):
+    status = status_of(error)
+    return status is not None and 400 <= status < 500 and status != 429
+
+
+def retry_after(error):
+    headers = getattr(error, 'headers', None)
+    if headers is None:
+        headers = getattr(getattr(error, 'response', None), 'headers', None)
+    headers = headers or {}
+    try:
+        return float(headers.get('retry-after'))
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt, base_delay, max_delay, error=None):
+    # 서버가 Retry-After를 주면 따르고, 아니면 full jitter 지수 백오프
+    hinted = retry_after(error) if error is not None else None
+    if hinted is not None:
+        return min(hinted, max_delay)
+    return random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+
+
+# 외부 API별 기본 한도. article_host는 호스트마다 따로 버킷과 브레이커를 둔다.
+PROVIDER_LIMITS = {
+    'pytrends': {'requests_per_minute': 30},
+    'newsapi': {'requests_per_minute': 60},
+    'naver': {'requests_per_minute': 600},
+    'openai': {'requests_per_minute': 3500, 'tokens_per_minute': 160000},
+    'article_host': {'requests_per_minute': 60},
+}
+
+_limiters = {}
+_breakers = {}
+_registry_lock = threading.Lock()
+
+
+def _registry_key(provider, key):
+    return provider if key is None else f"{provider}:{key}"
+
+
+def get_limiter(provider, key=None):
+    name = _registry_key(provider, key)
+    with _registry_lock:
+        if name not in _limiters:
+            _limiters[name] = RateLimiter(name=name, **PROVIDER_LIMITS.get(provider, {'requests_per_minute': 60}))
+        return _limiters[name]
+
+
+def get_breaker(provider, key=None):
+    name = _registry_key(provider, key)
+    with _registry_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(name=name)
+        return _breakers[name]
+
+
+def limiter_stats():
+    with _registry_lock:
+        limiters = dict(_limiters)
+        breakers = dict(_breakers)
+    stats = {name: limiter.stats() for name, limiter in limiters.items()}
+    for name, breaker in breakers.items():
+        stats.setdefault(name, {})['circuit'] = breaker.stats()
+    return stats
+
+
+def _should_retry(breaker, error, attempt, attempts):
+    if not is_retryable(error):
+        if is_client_error(error):
+            # 4xx는 서버가 정상적으로 응답한 것이므로 장애로 세지 않는다
+            breaker.record_success()
+        else:
+            # 응답 파싱 오류처럼 서버 상태와 무관한 예외는 브레이커를 건드리지 않고 시험 요청 자리만 돌려준다
+            breaker.release_trial()
+        return False
+    breaker.record_failure()
+    # 브레이커가 열렸으면 더 재시도해도 소용없으니 바로 포기한다
+    return attempt < attempts - 1 and breaker.state == 'closed'
+
+
+def call_with_limits(provider, fn, key=None, tokens=1, attempts=4, base_delay=1.0, max_delay=30.0):
+    limiter = get_limiter(provider, key)
+    breaker = get_breaker(provider, key)
+    for attempt in range(attempts):
+        breaker.check()
+        try:
+            limiter.acquire(tokens)
+            result = fn()
+        except Exception as e:
+            if not _should_retry(breaker, e, attempt, attempts):
+                raise
+            current_span().add('retries')
+            time.sleep(backoff_delay(attempt, base_delay, max_delay, e))
+            continue
+        except BaseException:
+            # CancelledError, KeyboardInterrupt는 Exception이 아니라서 위에서 잡히지 않는다
+            breaker.release_trial()
+            raise
+        breaker.record_success()
+        return result
+
+
+async def call_with_limits_async(provider, fn, key=None, tokens=1, attempts=4, base_delay=1.0, max_delay=30.0):
+    limiter = get_limiter(provider, key)
+    breaker = get_breaker(provider, key)
+    for attempt in range(attempts):
+        breaker.check()
+        try:
+            await limiter.acquire_async(tokens)
+            result = await fn()
+        except Exception as e:
+            if not _should_retry(breaker, e, attempt, attempts):
+                raise
+            current_span().add('retries')
+            await asyncio.sleep(backoff_delay(attempt, base_delay, max_delay, e))
+            continue
+        except BaseException:
+            # CancelledError, KeyboardInterrupt는 Exception이 아니라서 위에서 잡히지 않는다
+            breaker.release_trial()
+            raise
+        breaker.record_success()
+        return result
@@ -0,0 +1,144 @@
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from xml.sax.saxutils import escape
+from reportlab.lib.enums import TA_CENTER
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.cidfonts import UnicodeCIDFont
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.platypus import PageBreak, Paragraph, SimpleDocTemplate, Spacer
+
+# 한글을 지원하는 TTF 후보. NEWS_REPORT_FONT 환경 변수로 경로를 직접 줄 수 있다
+FONT_CANDIDATES = [
+    os.environ.get("NEWS_REPORT_FONT"),
+    "C:/Windows/Fonts/malgun.ttf",
+    "/usr/share/fonts/truetype/nanum/NanumGothic.ttf",
+    "/usr/share/fonts/nanum/NanumGothic.ttf",
+    "/Library/Fonts/NanumGothic.ttf",
+    os.path.expanduser("~/Library/Fonts/NanumGothic.ttf"),
+]
+# TTF가 없으면 PDF 뷰어 내장 한글 CID 폰트를 쓴다 (파일에 포함되지 않는다)
+CID_FALLBACK_FONT = "HYSMyeongJo-Medium"
+MAX_PARAGRAPH_CHARS = 1500
+
+# 프로세스마다 한 번만 등록하고 만든다
+_font_name = None
+_styles = None
+
+
+def register_fonts():
+    global _font_name
+    if _font_name is None:
+        for path in FONT_CANDIDATES:
+            if path and os.path.exists(path):
+                try:
+                    pdfmetrics.registerFont(TTFont("NewsReportFont", path))
+                    _font_name = "NewsReportFont"
+                    break
+                except Exception as e:
+                    print(f"Error registering font {path}: {str(e)}")
+        if _font_name is None:
+            pdfmetrics.registerFont(UnicodeCIDFont(CID_FALLBACK_FONT))
+            _font_name = CID_FALLBACK_FONT
+    return _font_name
+
+
+def get_styles():
+    global _styles
+    if _styles is None:
+        font_name = register_fonts()
+        styles = getSampleStyleSheet()
+        styles.add(ParagraphStyle(name='Center', parent=styles['Normal'], alignment=TA_CENTER))
+        for style in styles.byName.values():
+            style.fontName = font_name
+            # 한글은 공백이 적어 단어 단위로 줄바꿈하면 넘치므로 글자 단위 줄바꿈을 쓴다
+            style.wordWrap = 'CJK'
+        _styles = styles
+    return _styles
+
+
+def split_paragraphs(text, max_chars=MAX_PARAGRAPH_CHARS):
+    # 긴 본문을 문단 단위로 나누고, 그래도 긴 문단은 문장 경계에서 max_chars 이하로 자른다
+    for block in re.split(r"\n\s*\n", text or ""):
+        block = block.strip()
+        if not block:
+            continue
+        chunk = ""
+        for sentence in re.split(r"(?<=[.!?다요])\s+", block):
+            if chunk and len(chunk) + len(sentence) + 1 > max_chars:
+                yield chunk
+                chunk = ""
+            while len(sentence) > max_chars:
+                yield sentence[:max_chars]
+                sentence = sentence[max_chars:]
+            chunk = f"{chunk} {sentence}" if chunk else sentence
+        if chunk:
+            yield chunk
+
+
+def paragraphs(text, style):
+    # Paragraph는 미니 XML로 해석되므로 본문의 &, <, >를 이스케이프한다
+    return [Paragraph(escape(chunk).replace("\n", "<br/>"), style) for chunk in split_paragraphs(text)]
+
+
+def build_story(job):
+    styles = get_styles()
+    story = [
+        Paragraph(escape(f"뉴스 리포트 - {job['date_str']}"), styles['Title']),
+        Spacer(1, 12),
+        Paragraph(escape(f"진행자: {job['presenter_name']}"), styles['Normal']),
+        Paragraph(escape(f"스타일: {job['style']}"), styles['Normal']),
+        Spacer(1, 12),
+        Paragraph("생성된 스크립트", styles['Heading1']),
+    ]
+    story += paragraphs(job['script'], styles['BodyText'])
+    story.append(PageBreak())
+
+    for i, article in enumerate(job['articles'], 1):
+        story.append(Paragraph(f"뉴스 기사 {i}", styles['Heading1']))
+        story.append(Paragraph(escape(f"제목: {article['title']}"), styles['Heading2']))
+        story.append(Paragraph(escape(f"URL: {article['url']}"), styles['Normal']))
+        story.append(Spacer(1, 12))
+        story.append(Paragraph("전체 내용:", styles['Heading3']))
+        story += paragraphs(article.get('full_content'), styles['BodyText'])
+        story.append(PageBreak())
+    return story
+
+
+def render_report(job):
+    # job: filepath, script, articles, presenter_name, style, date_str, keywords
+    # 프로세스 풀에서도 부를 수 있도록 모듈 수준 함수로 둔다. (경로, 페이지 수)를 돌려준다
+    doc = SimpleDocTemplate(job['filepath'], pagesize=letter, title=f"뉴스 리포트 - {job['date_str']}",
+                            author=job['presenter_name'], subject=job['style'], keywords=job.get('keywords', []))
+    doc.build(build_story(job))
+    return job['filepath'], doc.page
+
+
+class ReportRenderer:
+    # max_workers가 0이면 호출한 스레드에서 바로 그리고, 아니면 프로세스 풀에서 여러 리포트를 나눠 그린다
+    def __init__(self, max_workers=None):
+        self.max_workers = os.cpu_count() if max_workers is None else max_workers
+        self.executor = None
+
+    def get_executor(self):
+        if self.executor is None:
+            # 워커마다 시작할 때 폰트와 스타일을 한 번 준비해 둔다
+            self.executor = ProcessPoolExecutor(max_workers=self.max_workers, initializer=get_styles)
+        return self.executor
+
+    def render(self, job):
+        if self.max_workers == 0:
+            return render_report(job)
+        return self.get_executor().submit(render_report, job).result()
+
+    def render_batch(self, jobs):
+        if self.max_workers == 0:
+            return [render_report(job) for job in jobs]
+        return list(self.get_executor().map(render_report, jobs, chunksize=4))
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
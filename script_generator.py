@@ -1,7 +1,8 @@
-from openai import OpenAI
-from config import OPENAI_API_KEY
-
-client = OpenAI(api_key=OPENAI_API_KEY)
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from llm_cache import get_llm_cache
+from openai_client import get_client
+from prompt_builder import PromptBuilder
+from tracing import current_span, span, traced
 
 class ScriptGenerator:
     def __init__(self):
@@ -12,20 +13,29 @@ class ScriptGenerator:
             "정치가": "설득력 있고 강한 톤으로, 의견을 제시하고 주장을 펼칩니다.",
             "코미디언": "유머러스하고 가벼운 톤으로, 재미있게 정보를 전달합니다."
         }
-
-    def get_available_styles(self):
-        return list(self.styles.keys())
-
-    def generate_script(self, news_articles, style="아나운서", presenter_name="진행자", language="한국어"):
-        news_content_str = "\n\n".join([f"Title: {article['title']}\nContent: {article['full_content']}" for article in news_articles])
-        news_count = len(news_articles)
-
-        language_instructions = {
+        self.language_instructions = {
             "한국어": "한국어로 작성하세요.",
             "English": "Write in English.",
             "日本語": "日本語で書いてください。",
             "中文": "请用中文写作。"
         }
+        self.llm_cache = get_llm_cache()
+        self.prompt_builder = PromptBuilder()
+        self.max_tokens = 2000
+
+    def get_available_styles(self):
+        return list(self.styles.keys())
+
+    def get_available_languages(self):
+        return list(self.language_instructions.keys())
+
+    def build_messages(self, news_articles, style="아나운서", presenter_name="진행자", language="한국어", prepared=False):
+        # prepared=True이면 prepare_articles를 이미 거친 기사로 보고 다시 세거나 요약하지 않는다
+        news_count = len(news_articles)
+        if not prepared:
+            news_articles = self.prompt_builder.prepare_articles(news_articles)
+        news_content_str = "\n\n".join([f"Title: {article['title']}\nContent: {article['full_content']}" for article in news_articles])
+        language_instructions = self.language_instructions
 
         prompt = f"""Create a natural and engaging script for a YouTube news video discussing the following news articles:
 
@@ -51,17 +61,127 @@ The script should:
 
 Please write the entire script in {language}, adapting the content and style to match that of a {style}, ensuring a smooth flow throughout the entire script while including specific, detailed information for each news item."""
 
+        return [
+            {"role": "system", "content": f"You are a skilled YouTube script writer, creating content in the style of a {style} for a {language}-speaking audience. Focus on the provided news articles and include specific details."},
+            {"role": "user", "content": prompt}
+        ]
+
+    def build_translation_messages(self, script, style="아나운서", language="한국어"):
+        prompt = f"""Translate the following YouTube news script into {language}.
+Keep every name, number, date and quote exactly as in the original, keep the paragraph structure, and keep the tone and style of a {style}. {self.language_instructions[language]}
+Return only the translated script.
+
+Script:
+{script}"""
+
+        return [
+            {"role": "system", "content": f"You are a professional news translator for a {language}-speaking YouTube audience."},
+            {"role": "user", "content": prompt}
+        ]
+
+    def complete(self, messages, temperature=0.7, fresh=False):
+        return self.llm_cache.complete(
+            get_client(),
+            model="gpt-3.5-turbo",
+            messages=messages,
+            max_tokens=self.max_tokens,
+            temperature=temperature,
+            fresh=fresh,
+        )
+
+    @traced('generator.generate')
+    def generate_script(self, news_articles, style="아나운서", presenter_name="진행자", language="한국어", fresh=False):
+        current_span().set(style=style, language=language, articles=len(news_articles))
+        try:
+            return self.complete(self.build_messages(news_articles, style, presenter_name, language), fresh=fresh)
+        except Exception as e:
+            current_span().fail(e)
+            return f"Error occurred: {str(e)}"
+
+    def generate_script_stream(self, news_articles, style="아나운서", presenter_name="진행자", language="한국어", fresh=False):
+        with span('generator.generate', activate=False, stream=True, style=style, language=language,
+                  articles=len(news_articles)) as trace:
+            try:
+                yield from self.llm_cache.stream(
+                    get_client(),
+                    model="gpt-3.5-turbo",
+                    messages=self.build_messages(news_articles, style, presenter_name, language),
+                    max_tokens=self.max_tokens,
+                    temperature=0.7,
+                    fresh=fresh,
+                )
+            except Exception as e:
+                trace.fail(e)
+                yield f"Error occurred: {str(e)}"
+
+    @traced('generator.translate')
+    def translate_script(self, script, style="아나운서", language="한국어", fresh=False):
         try:
-            response = client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": f"You are a skilled YouTube script writer, creating content in the style of a {style} for a {language}-speaking audience. Focus on the provided news articles and include specific details."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=2000,
-                n=1,
-                temperature=0.7,
-            )
-            return response.choices[0].message.content.strip()
+            return self.complete(self.build_translation_messages(script, style, language), temperature=0.3, fresh=fresh)
         except Exception as e:
+            current_span().fail(e)
             return f"Error occurred: {str(e)}"
+
+    def prefer_translation(self, context_tokens, validated):
+        # 번역 입력은 많아야 스크립트 한 편(max_tokens)이고, 재생성은 기사 문맥 전체를 다시 읽는다.
+        # 검증까지 하면 다른 언어 스크립트는 문장 대조가 안 되어 전체 검증을 한 번 더 돌려야 하므로 번역이 항상 싸다
+        return validated or context_tokens > self.max_tokens
+
+    def generate_variants(self, news_articles, styles=("아나운서",), languages=("한국어",), presenter_name="진행자",
+                          validator=None, fresh=False, max_workers=4):
+        # 스타일 x 언어 조합을 동시에 만들고 끝나는 대로 하나씩 돌려준다.
+        # 기사 문맥은 한 번만 준비하고, 스타일마다 첫 언어로 마스터를 만들어 (검증한 뒤) 나머지 언어로 번역한다.
+        # OpenAI 호출은 모두 llm_cache를 거치므로 공유 limiter의 RPM/TPM 한도 안에서 돈다
+        styles = list(dict.fromkeys(styles))
+        languages = list(dict.fromkeys(languages))
+        counter = self.prompt_builder.counter
+        prepared = self.prompt_builder.prepare_articles(news_articles)
+        context_tokens = sum(counter.count(article['title']) + counter.count(article['full_content'])
+                             for article in prepared)
+        master_language = languages[0]
+        translate = len(languages) > 1 and self.prefer_translation(context_tokens, validator is not None)
+
+        def write(style, language):
+            with span('generator.variant', style=style, language=language, method="generated"):
+                script = self.complete(self.build_messages(prepared, style, presenter_name, language, prepared=True),
+                                       fresh=fresh)
+                if validator is not None:
+                    # 검증은 요약 전 원문 기사와 대조한다
+                    script = validator.check_script(script, news_articles, fresh=fresh)
+                return script
+
+        def translated(script, style, language):
+            with span('generator.variant', style=style, language=language, method="translated"):
+                return self.complete(self.build_translation_messages(script, style, language), temperature=0.3,
+                                     fresh=fresh)
+
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        pending = {}
+        try:
+            for style in styles:
+                targets = [master_language] if translate else languages
+                for language in targets:
+                    pending[executor.submit(write, style, language)] = (style, language, "generated")
+
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    style, language, method = pending.pop(future)
+                    try:
+                        script, error = future.result(), None
+                    except Exception as e:
+                        script, error = None, str(e)
+                    yield {"style": style, "language": language, "method": method,
+                           "validated": validator is not None and method == "generated" and error is None,
+                           "script": script, "error": error}
+
+                    if translate and language == master_language and method == "generated":
+                        for other in languages[1:]:
+                            # 마스터가 실패하면 그 스타일의 나머지 언어는 직접 생성한다
+                            if error is None:
+                                pending[executor.submit(translated, script, style, other)] = (style, other, "translated")
+                            else:
+                                pending[executor.submit(write, style, other)] = (style, other, "generated")
+        finally:
+            # 호출한 쪽이 중간에 그만두면 아직 시작하지 않은 변형은 버린다
+            executor.shutdown(wait=False, cancel_futures=True)
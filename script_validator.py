@@ -1,12 +1,87 @@
-from openai import OpenAI
-from config import OPENAI_API_KEY
+import json
+import re
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from llm_cache import get_llm_cache
+from openai_client import get_client
+from prompt_builder import PromptBuilder
+from tracing import current_span, propagate, span, traced
+
+# 3.5 같은 소수점과 U.S. 같은 한 글자 약어의 마침표에서는 문장을 자르지 않는다
+SENTENCE_PATTERN = re.compile(r"(?:\d\.(?=\d)|(?<![A-Za-z])[A-Z]\.|[^\n.!?。！？])*[.!?。！？]+[\"'”’)\]]*|[^\n]+")
+NUMBER_PATTERN = re.compile(r"\d[\d,.]*\d|\d")
+
+
+def sentence_spans(text):
+    # 문장마다 (시작, 끝) 위치를 돌려준다. 문장 사이의 공백과 줄바꿈은 그대로 남아 수정본을 끼워 넣을 수 있다
+    spans = []
+    for match in SENTENCE_PATTERN.finditer(text):
+        start, end = match.span()
+        stripped = match.group().strip()
+        if stripped:
+            start += match.group().index(stripped)
+            spans.append((start, start + len(stripped)))
+    return spans
+
+
+def char_bigrams(text):
+    compact = re.sub(r"\W+", "", text.lower())
+    return {compact[i:i + 2] for i in range(len(compact) - 1)}
+
+
+def numbers(text):
+    return {number.replace(',', '') for number in NUMBER_PATTERN.findall(text)}
+
+
+def hangul_ratio(text):
+    letters = [char for char in text if char.isalpha()]
+    if not letters:
+        return 0.0
+    return sum(1 for char in letters if '가' <= char <= '힣') / len(letters)
+
+
+class PassageIndex:
+    # 기사 문장을 글자 bigram 역색인으로 묶어 두고, 스크립트 문장마다 가장 많이 겹치는 기사 문장을 찾는다
+    def __init__(self, articles):
+        self.passages = []
+        self.postings = {}
+        for article in articles:
+            text = f"{article['title']}\n{article.get('full_content') or ''}"
+            for start, end in sentence_spans(text):
+                self.add(text[start:end])
+
+    def add(self, passage):
+        passage_id = len(self.passages)
+        self.passages.append(passage)
+        for bigram in char_bigrams(passage):
+            self.postings.setdefault(bigram, []).append(passage_id)
+
+    def search(self, sentence, top_k=3):
+        # 문장 bigram 중 근거 문장에 들어 있는 비율(containment)을 지지도로 쓴다
+        bigrams = char_bigrams(sentence)
+        if not bigrams:
+            return 1.0, []
+        hits = Counter()
+        for bigram in bigrams:
+            hits.update(self.postings.get(bigram, ()))
+        best = hits.most_common(top_k)
+        support = best[0][1] / len(bigrams) if best else 0.0
+        return support, [self.passages[passage_id] for passage_id, _ in best]
 
 
 class ScriptValidator:
-    def __init__(self):
-        self.client = OpenAI(api_key=OPENAI_API_KEY)
+    # mode='incremental'은 근거가 약한 문장만 모델에 보내 고치고, 'full'은 예전처럼 스크립트 전체를 다시 쓰게 한다
+    def __init__(self, mode='incremental', support_threshold=0.5, min_bigrams=6, batch_size=8, max_workers=4):
+        self.llm_cache = get_llm_cache()
+        self.prompt_builder = PromptBuilder()
+        self.mode = mode
+        self.support_threshold = support_threshold
+        self.min_bigrams = min_bigrams
+        self.batch_size = batch_size
+        self.max_workers = max_workers
 
-    def validate_script(self, script, articles):
+    def build_messages(self, script, articles):
+        articles = self.prompt_builder.prepare_articles(articles)
         prompt = f"""다음 뉴스 스크립트가 주어진 뉴스 기사와 일치하는지 확인하고, 사실과 다른 부분이 있다면 수정해 주세요. 
         뉴스 기사의 내용을 정확히 반영하도록 수정해 주세요.
 
@@ -18,17 +93,131 @@ class ScriptValidator:
         for article in articles:
             prompt += f"\n\n제목: {article['title']}\n내용: {article['full_content']}"
 
+        return [
+            {"role": "system", "content": "당신은 사실을 정확하게 검증하고 수정하는 전문가입니다."},
+            {"role": "user", "content": prompt}
+        ]
+
+    def use_incremental(self, script, articles, mode):
+        # 스크립트를 다른 언어로 만들었으면 글자 단위로 기사와 맞춰 볼 수 없으므로 전체 검증으로 돌린다
+        if (mode or self.mode) != 'incremental':
+            return False
+        article_text = ' '.join(article.get('full_content') or '' for article in articles)
+        return (hangul_ratio(script) > 0.3) == (hangul_ratio(article_text) > 0.3)
+
+    def find_questionable(self, script, articles):
+        index = PassageIndex(articles)
+        questionable = []
+        spans = sentence_spans(script)
+        for span in spans:
+            sentence = script[span[0]:span[1]]
+            if len(char_bigrams(sentence)) < self.min_bigrams:
+                continue
+            support, evidence = index.search(sentence)
+            # 기사에 없는 숫자가 들어 있으면 지지도가 높아도 확인한다
+            unsupported_numbers = numbers(sentence) - set().union(*[numbers(passage) for passage in evidence])
+            if support < self.support_threshold or unsupported_numbers:
+                questionable.append((span, sentence, evidence))
+        return spans, questionable
+
+    def build_batch_messages(self, batch):
+        prompt = """아래 문장들은 뉴스 스크립트의 일부입니다. 각 문장을 함께 제시된 기사 발췌와 비교해서,
+기사와 다른 사실(인물, 수치, 날짜, 인용 등)이 있으면 그 부분만 최소한으로 고친 문장을 주세요.
+문제가 없으면 원문을 그대로 주세요. 말투와 언어는 원문을 유지하세요.
+다음 JSON 형식으로만 답하세요: {"sentences": [{"id": 번호, "text": "문장"}]}
+"""
+        for number, (_, sentence, evidence) in enumerate(batch, 1):
+            prompt += f"\n[{number}] 문장: {sentence}\n근거:\n"
+            prompt += "\n".join(f"- {passage[:600]}" for passage in evidence) or "- (관련 기사 문장 없음)"
+            prompt += "\n"
+        return [
+            {"role": "system", "content": "당신은 사실을 정확하게 검증하고 수정하는 전문가입니다."},
+            {"role": "user", "content": prompt}
+        ]
+
+    @traced('validator.batch')
+    def correct_batch(self, batch, fresh=False):
+        counter = self.prompt_builder.counter
+        max_tokens = min(2000, 100 + 2 * sum(counter.count(sentence) for _, sentence, _ in batch))
         try:
-            response = self.client.chat.completions.create(
+            reply = self.llm_cache.complete(
+                get_client(),
                 model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "당신은 사실을 정확하게 검증하고 수정하는 전문가입니다."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=2000,
-                n=1,
+                messages=self.build_batch_messages(batch),
+                max_tokens=max_tokens,
                 temperature=0.3,
+                fresh=fresh,
             )
-            return response.choices[0].message.content.strip()
+            data = json.loads(reply[reply.index('{'):reply.rindex('}') + 1])
+            corrections = {int(item["id"]): item["text"].strip() for item in data["sentences"] if item.get("text")}
+        except Exception as e:
+            # 이 묶음은 고치지 못해도 원문을 그대로 두고 나머지 묶음은 계속 반영한다
+            current_span().fail(e)
+            print(f"Error validating sentences: {str(e)}")
+            return []
+        return [(span, corrections[number]) for number, (span, sentence, _) in enumerate(batch, 1)
+                if corrections.get(number) and corrections[number] != sentence]
+
+    def validate_incremental(self, script, articles, fresh=False):
+        spans, questionable = self.find_questionable(script, articles)
+        batches = [questionable[i:i + self.batch_size] for i in range(0, len(questionable), self.batch_size)]
+        corrections = []
+        if batches:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(batches))) as executor:
+                correct = propagate(lambda batch: self.correct_batch(batch, fresh))
+                for batch_corrections in executor.map(correct, batches):
+                    corrections += batch_corrections
+        # check_script가 여러 스레드에서 동시에 불리므로 통계는 인스턴스에 두지 않고 함께 돌려준다
+        stats = {"sentences": len(spans), "checked": len(questionable), "corrected": len(corrections),
+                 "batches": len(batches)}
+
+        # 뒤에서부터 바꿔야 앞 문장의 위치가 밀리지 않는다
+        for (start, end), text in sorted(corrections, reverse=True):
+            script = script[:start] + text + script[end:]
+        return script, stats
+
+    @traced('validator.validate')
+    def check_script(self, script, articles, fresh=False, mode=None):
+        # validate_script와 같지만 전체 검증이 실패하면 오류 문구 대신 예외를 올린다
+        if self.use_incremental(script, articles, mode):
+            script, stats = self.validate_incremental(script, articles, fresh=fresh)
+            current_span().set(mode='incremental', **stats)
+            return script
+        current_span().set(mode='full')
+        return self.llm_cache.complete(
+            get_client(),
+            model="gpt-3.5-turbo",
+            messages=self.build_messages(script, articles),
+            max_tokens=2000,
+            temperature=0.3,
+            fresh=fresh,
+        )
+
+    def validate_script(self, script, articles, fresh=False, mode=None):
+        try:
+            return self.check_script(script, articles, fresh=fresh, mode=mode)
         except Exception as e:
             return f"검증 및 수정 중 오류 발생: {str(e)}"
+
+    def validate_script_stream(self, script, articles, fresh=False, mode=None):
+        # 증분 검증은 고친 문장만 모아 한 번에 끼워 넣으므로 완성된 스크립트를 한 조각으로 낸다
+        if self.use_incremental(script, articles, mode):
+            # yield 전에 스팬을 닫아서 배치 호출 스팬들이 이 스팬 아래에 모이게 한다
+            with span('validator.validate', mode='incremental') as trace:
+                validated, stats = self.validate_incremental(script, articles, fresh=fresh)
+                trace.set(**stats)
+            yield validated
+            return
+        with span('validator.validate', activate=False, mode='full', stream=True) as trace:
+            try:
+                yield from self.llm_cache.stream(
+                    get_client(),
+                    model="gpt-3.5-turbo",
+                    messages=self.build_messages(script, articles),
+                    max_tokens=2000,
+                    temperature=0.3,
+                    fresh=fresh,
+                )
+            except Exception as e:
+                trace.fail(e)
+                yield f"검증 및 수정 중 오류 발생: {str(e)}"
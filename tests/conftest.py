@@ -0,0 +1,47 @@
+import asyncio
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope='session')
+def fake_openai():
+    # benchmarks.fake_openai를 별도 스레드의 이벤트 루프에서 띄우고 (서버, base_url)을 돌려준다
+    pytest.importorskip('aiohttp')
+    from aiohttp import web
+    from benchmarks.fake_openai import FakeOpenAI
+
+    server = FakeOpenAI(first_token_delay=0, token_delay=0, tokens=20)
+    app = web.Application()
+    server.add_routes(app)
+    loop = asyncio.new_event_loop()
+    runner = web.AppRunner(app)
+    loop.run_until_complete(runner.setup())
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    loop.run_until_complete(site.start())
+    port = runner.addresses[0][1]
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    yield server, f"http://127.0.0.1:{port}/v1"
+    asyncio.run_coroutine_threadsafe(runner.cleanup(), loop).result(timeout=5)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(timeout=5)
+
+
+@pytest.fixture
+def openai_client(fake_openai):
+    openai = pytest.importorskip('openai')
+    _, base_url = fake_openai
+    return openai.OpenAI(api_key='test', base_url=base_url, max_retries=0)
+
+
+@pytest.fixture
+def llm_cache(tmp_path):
+    from llm_cache import LLMCache
+    cache = LLMCache(db_path=str(tmp_path / 'llm_cache.db'))
+    yield cache
+    cache.conn.close()
@@ -0,0 +1,58 @@
+import os
+
+import pytest
+
+from article_store import ArticleStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ArticleStore(base_dir=str(tmp_path))
+    yield store
+    store.close()
+
+
+def article(url, content="본문"):
+    return {"url": url, "title": f"제목 {url}", "full_content": content * 50}
+
+
+def test_save_lookup_and_scan(store):
+    store.save(article("a"))
+    store.save(article("b"))
+    store.save(article("a", "수정된 본문"))
+
+    assert store.load(store.lookup("a"))["full_content"].startswith("수정된 본문")
+    assert [item["url"] for item in store.scan()] == ["a", "b", "a"]
+    assert [item["url"] for item in store.scan(latest_only=True)] == ["b", "a"]
+
+
+def test_rebuild_index_restores_lookups(store, tmp_path):
+    store.save(article("a"))
+    store.save(article("b"))
+    with store.lock:
+        store.conn.execute("DELETE FROM article_offsets")
+        store.conn.commit()
+    assert store.lookup("a") is None
+    assert store.rebuild_index() == 2
+    assert store.load(store.lookup("b"))["url"] == "b"
+
+
+def test_records_after_a_torn_write_stay_readable(store):
+    # 쓰다 죽은 프로세스가 남긴 깨진 레코드 뒤에 다른 기사가 이어 써진 경우
+    segment = store.save(article("a"))
+    with open(segment, 'ab') as f:
+        f.write(b'\x00\x00\x10\x00torn record')
+    store.save(article("b"))
+    store.save(article("c"))
+
+    assert [item["url"] for item in store.scan()] == ["a", "b", "c"]
+    assert store.rebuild_index() == 3
+    assert store.load(store.lookup("c"))["url"] == "c"
+
+
+def test_torn_tail_is_skipped(store):
+    segment = store.save(article("a"))
+    with open(segment, 'ab') as f:
+        f.write(b'\x00\x00')
+    assert [item["url"] for item in store.scan()] == ["a"]
+    assert os.path.getsize(segment) > 0
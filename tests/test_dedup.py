@@ -0,0 +1,109 @@
+import asyncio
+import random
+import sqlite3
+import threading
+
+from article_pipeline import ArticlePipeline
+from article_store import ArticleStore
+from dedup import NearDuplicateIndex, canonicalize_url, dedupe_articles
+
+
+
+def make_body(seed, words=300):
+    # 실제 기사처럼 겹치는 shingle이 적은 긴 본문
+    rng = random.Random(seed)
+    return ' '.join(''.join(chr(rng.randrange(0xAC00, 0xD7A4)) for _ in range(rng.randrange(1, 4)))
+                    for _ in range(words))
+
+
+BODY = make_body(1)
+OTHER_BODY = make_body(2)
+
+
+def test_canonicalize_url_drops_tracking_and_mobile_host():
+    assert (canonicalize_url("http://m.news.com/a/1/?utm_source=x&id=3&fbclid=y")
+            == canonicalize_url("https://news.com/a/1?id=3"))
+
+
+def test_dedupe_articles_merges_same_url_and_similar_titles():
+    articles = [
+        {"url": "https://news.com/a/1", "title": "기준금리 3.5% 동결", "source": "A"},
+        {"url": "https://www.news.com/a/1/?utm_source=naver", "title": "다른 제목", "source": "B"},
+        {"url": "https://other.com/b", "title": "기준금리 3.5% 동결…", "source": "C", "description": "요약"},
+        {"url": "https://other.com/c", "title": "대표팀 역전승", "source": "D"},
+    ]
+    kept = dedupe_articles(articles)
+    assert [article["url"] for article in kept] == ["https://news.com/a/1", "https://other.com/c"]
+    assert [duplicate["source"] for duplicate in kept[0]["duplicates"]] == ["B", "C"]
+    assert kept[0]["description"] == "요약"
+
+
+def test_near_duplicate_index_finds_copies_but_not_itself():
+    index = NearDuplicateIndex(sqlite3.connect(":memory:", check_same_thread=False), threading.Lock())
+    assert index.check_and_add("https://news.com/a/1", BODY) is None
+    # 같은 기사를 다시 색인해도 자기 자신과는 겹치지 않는다
+    assert index.check_and_add("https://www.news.com/a/1/", BODY) is None
+    assert index.check_and_add("https://copy.com/x", BODY + " 끝") == "https://news.com/a/1"
+    assert index.check_and_add("https://other.com/y", OTHER_BODY) is None
+
+
+class FakeExtraction:
+    def __init__(self, content):
+        self.content = content
+
+
+class FakeScraper:
+    # ArticlePipeline이 부르는 스크레이퍼 메서드만 흉내 내고 저장소와 SimHash 색인은 실제 것을 쓴다
+    def __init__(self, store):
+        self.article_store = store
+        self.bodies = {}
+
+    async def fetch_or_load_article(self, article):
+        return None, "<html></html>"
+
+    async def extract_article(self, article, html):
+        return FakeExtraction(self.bodies[article["url"]])
+
+    def find_duplicate_content(self, article, full_content):
+        return self.article_store.dedup_index.check_and_add(article["url"], full_content)
+
+    def load_stored_article(self, url):
+        entry = self.article_store.lookup(url)
+        return self.article_store.load(entry) if entry is not None else None
+
+    async def apply_extraction(self, article, extraction):
+        article["full_content"] = extraction.content
+        return article
+
+    def save_article(self, article):
+        self.article_store.save(article)
+
+
+def run_pipeline(scraper, articles):
+    async def collect():
+        return [article async for _, article in ArticlePipeline(scraper).run(articles)]
+    return asyncio.run(collect())
+
+
+def test_pipeline_drops_copies_within_batch_and_returns_stored_original_across_runs(tmp_path):
+    store = ArticleStore(base_dir=str(tmp_path))
+    scraper = FakeScraper(store)
+    scraper.bodies = {"https://a.com/1": BODY, "https://b.com/2": BODY + " 끝",
+                      "https://naver.com/3": BODY + " 다시", "https://c.com/4": OTHER_BODY}
+    try:
+        first = run_pipeline(scraper, [{"url": "https://a.com/1", "title": "원본"},
+                                       {"url": "https://b.com/2", "title": "복사본"}])
+        # 기사는 동시에 파싱되므로 둘 중 먼저 끝난 쪽이 남고 나머지는 그 중복으로 붙는다
+        assert len(first) == 1
+        kept_url = first[0]["url"]
+        assert {kept_url, first[0]["duplicates"][0]["url"]} == {"https://a.com/1", "https://b.com/2"}
+
+        # 다른 키워드로 다음에 모은 목록에 복사본만 있으면 저장된 원본이 대신 나온다
+        second = run_pipeline(scraper, [{"url": "https://naver.com/3", "title": "네이버 복사본"},
+                                        {"url": "https://c.com/4", "title": "다른 기사"}])
+        assert sorted(article["url"] for article in second) == sorted([kept_url, "https://c.com/4"])
+        original = next(article for article in second if article["url"] == kept_url)
+        assert original["full_content"] == scraper.bodies[kept_url]
+        assert "https://naver.com/3" in [duplicate["url"] for duplicate in original["duplicates"]]
+    finally:
+        store.close()
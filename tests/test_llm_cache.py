@@ -0,0 +1,36 @@
+def test_stream_yields_deltas_and_caches_full_reply(fake_openai, openai_client, llm_cache):
+    server, _ = fake_openai
+    messages = [{"role": "user", "content": "오늘의 뉴스"}]
+    before = server.stream_calls
+
+    parts = list(llm_cache.stream(openai_client, "gpt-3.5-turbo", messages, temperature=0.7, max_tokens=5))
+
+    assert len(parts) > 1
+    text = ''.join(parts)
+    assert text.startswith("제목: Fake reply for 오늘의 뉴스")
+    assert server.stream_calls == before + 1
+
+    # 두 번째 호출은 서버를 부르지 않고 캐시된 전체 응답을 한 조각으로 낸다
+    cached = list(llm_cache.stream(openai_client, "gpt-3.5-turbo", messages, temperature=0.7, max_tokens=5))
+    assert cached == [text.strip()]
+    assert server.stream_calls == before + 1
+
+
+def test_stream_fresh_skips_cache_for_sampled_calls(fake_openai, openai_client, llm_cache):
+    server, _ = fake_openai
+    messages = [{"role": "user", "content": "새로 생성"}]
+    list(llm_cache.stream(openai_client, "gpt-3.5-turbo", messages, temperature=0.7, max_tokens=5))
+    before = server.stream_calls
+    list(llm_cache.stream(openai_client, "gpt-3.5-turbo", messages, temperature=0.7, max_tokens=5, fresh=True))
+    assert server.stream_calls == before + 1
+
+
+def test_complete_uses_cache(fake_openai, openai_client, llm_cache):
+    server, _ = fake_openai
+    messages = [{"role": "user", "content": "요약"}]
+    before = server.calls
+    first = llm_cache.complete(openai_client, "gpt-3.5-turbo", messages, temperature=0.3, max_tokens=5)
+    second = llm_cache.complete(openai_client, "gpt-3.5-turbo", messages, temperature=0.3, max_tokens=5)
+    assert first == second
+    assert server.calls == before + 1
+    assert llm_cache.stats()["hits"] >= 1
@@ -0,0 +1,64 @@
+import sqlite3
+
+import pytest
+
+from news_manager import NewsManager, char_bigrams
+
+
+@pytest.fixture
+def manager(tmp_path):
+    manager = NewsManager(db_path=str(tmp_path / "news.db"))
+    manager.save_articles([
+        {"title": "금리 인상 전망", "url": "https://news.com/1",
+         "full_content": "시장은 연내 금리 인상을 점친다. 금리 부담이 커졌다."},
+        {"title": "한국은행 기준금리 동결", "url": "https://news.com/2",
+         "full_content": "한국은행은 기준금리를 동결했다. 환율은 안정세를 보였다."},
+        {"title": "대표팀 역전승", "url": "https://news.com/3", "full_content": "대표팀이 역전승을 거뒀다."},
+    ] + [
+        {"title": f"날씨 소식 {i}", "url": f"https://news.com/w{i}", "full_content": "내일은 맑겠습니다."}
+        for i in range(10)
+    ])
+    yield manager
+    manager.close()
+
+
+def titles(results):
+    return [result["title"] for result in results]
+
+
+def test_char_bigrams():
+    assert char_bigrams("기준금리 동결") == "기준 준금 금리 동결"
+    assert char_bigrams(None) is None
+
+
+def test_two_character_terms_use_ranked_bigram_index(manager):
+    results = manager.search("금리")
+    assert titles(results) == ["금리 인상 전망", "한국은행 기준금리 동결"]
+    assert results[0]["score"] > results[1]["score"] > 0
+
+
+def test_long_and_mixed_terms(manager):
+    assert titles(manager.search("기준금리")) == ["한국은행 기준금리 동결"]
+    assert titles(manager.search("기준금리 환율")) == ["한국은행 기준금리 동결"]
+    assert titles(manager.search("역전승 금리")) == []
+
+
+def test_upsert_refreshes_bigrams(manager):
+    manager.save_articles([{"title": "대표팀 역전승", "url": "https://news.com/3",
+                            "full_content": "대표팀 승리에 환율도 움직였다."}])
+    assert "대표팀 역전승" in titles(manager.search("환율"))
+
+
+def test_other_writers_do_not_corrupt_the_bigram_index(manager, tmp_path):
+    # 색인을 모르는 다른 프로그램이 articles를 고치고 지워도 FTS 무결성이 유지된다
+    conn = sqlite3.connect(str(tmp_path / "news.db"))
+    conn.execute("INSERT INTO articles (title, url, full_content) VALUES ('외부 기사', 'x', '금리 외부')")
+    conn.execute("UPDATE articles SET full_content = '수정' WHERE title = '금리 인상 전망'")
+    conn.execute("DELETE FROM articles WHERE title = '한국은행 기준금리 동결'")
+    conn.commit()
+    conn.close()
+
+    manager.conn.execute("INSERT INTO articles_bigram (articles_bigram) VALUES ('integrity-check')")
+    assert "한국은행 기준금리 동결" not in titles(manager.search("금리"))
+    manager.save_articles([{"title": "외부 기사", "url": "x", "full_content": "금리 외부"}])
+    assert "외부 기사" in titles(manager.search("금리"))
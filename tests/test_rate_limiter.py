@@ -0,0 +1,130 @@
+import asyncio
+import time
+
+import pytest
+
+import rate_limiter
+from rate_limiter import CircuitBreaker, CircuitOpenError, call_with_limits, is_retryable
+
+
+class StatusError(Exception):
+    def __init__(self, status):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+
+
+@pytest.fixture(autouse=True)
+def isolated_registry(monkeypatch):
+    monkeypatch.setattr(rate_limiter, '_limiters', {})
+    monkeypatch.setattr(rate_limiter, '_breakers', {})
+
+
+def test_breaker_opens_after_threshold_and_allows_one_trial():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    breaker.record_failure()
+    assert breaker.state == 'closed'
+    breaker.record_failure()
+    assert breaker.state == 'open'
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+
+    breaker.opened_at = time.monotonic() - 61
+    assert breaker.state == 'half-open'
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == 'closed'
+
+
+def test_failed_trial_reopens_and_released_trial_can_be_retried():
+    breaker = CircuitBreaker(failure_threshold=5, reset_timeout=60)
+    breaker.opened_at = time.monotonic() - 61
+    assert breaker.allow()
+    breaker.release_trial()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == 'open'
+
+
+def test_is_retryable_by_status_and_connection_error_type():
+    aiohttp = pytest.importorskip('aiohttp')
+    assert is_retryable(StatusError(429))
+    assert is_retryable(StatusError(503))
+    assert not is_retryable(StatusError(404))
+    assert is_retryable(asyncio.TimeoutError())
+    # 연결 거부, DNS 실패, SSL 오류는 모두 ClientConnectionError의 하위 클래스다
+    assert is_retryable(aiohttp.ClientOSError(111, "Connection refused"))
+    assert is_retryable(aiohttp.ServerDisconnectedError())
+    assert not is_retryable(ValueError("bad json"))
+
+
+def test_openai_connection_error_is_retryable():
+    openai = pytest.importorskip('openai')
+    assert is_retryable(openai.APIConnectionError(request=None))
+
+
+def test_connection_failures_open_the_breaker():
+    def refuse():
+        raise ConnectionRefusedError("refused")
+
+    for _ in range(5):
+        with pytest.raises(ConnectionRefusedError):
+            call_with_limits('dead-host', refuse, attempts=1)
+    with pytest.raises(CircuitOpenError):
+        call_with_limits('dead-host', refuse, attempts=1)
+
+
+def test_only_client_errors_reset_the_breaker():
+    breaker = rate_limiter.get_breaker('flaky')
+    breaker.failures = 3
+
+    def parse_error():
+        raise ValueError("bad json")
+
+    with pytest.raises(ValueError):
+        call_with_limits('flaky', parse_error, attempts=1)
+    assert breaker.failures == 3
+
+    def not_found():
+        raise StatusError(404)
+
+    with pytest.raises(StatusError):
+        call_with_limits('flaky', not_found, attempts=1)
+    assert breaker.failures == 0
+
+
+def test_retries_retryable_errors_until_success(monkeypatch):
+    monkeypatch.setattr(rate_limiter, 'backoff_delay', lambda *args, **kwargs: 0)
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise StatusError(503)
+        return "ok"
+
+    assert call_with_limits('retrying', flaky, attempts=4) == "ok"
+    assert len(calls) == 3
+
+
+def test_cancelled_trial_releases_the_breaker():
+    async def scenario():
+        breaker = rate_limiter.get_breaker('cancelled')
+        breaker.opened_at = time.monotonic() - breaker.reset_timeout - 1
+
+        async def slow():
+            await asyncio.sleep(10)
+
+        task = asyncio.create_task(rate_limiter.call_with_limits_async('cancelled', slow))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        async def ok():
+            return "ok"
+
+        assert await rate_limiter.call_with_limits_async('cancelled', ok) == "ok"
+        assert breaker.state == 'closed'
+
+    asyncio.run(scenario())
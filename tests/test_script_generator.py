@@ -0,0 +1,35 @@
+import pytest
+
+import script_generator
+from script_generator import ScriptGenerator
+
+ARTICLES = [{"title": "기준금리 동결", "url": "https://example.com/1",
+             "full_content": "한국은행은 오늘 기준금리를 연 3.5%로 동결했다."}]
+
+
+@pytest.fixture
+def generator(monkeypatch, openai_client, llm_cache):
+    monkeypatch.setattr(script_generator, 'get_client', lambda: openai_client)
+    generator = ScriptGenerator()
+    generator.llm_cache = llm_cache
+    generator.max_tokens = 10
+    return generator
+
+
+def test_generate_script_stream_yields_deltas(generator):
+    parts = list(generator.generate_script_stream(ARTICLES))
+    assert len(parts) > 1
+    assert ''.join(parts).startswith("제목: Fake reply")
+
+
+def test_generate_script_stream_reports_errors_as_text(monkeypatch, generator):
+    class BrokenClient:
+        class chat:
+            class completions:
+                @staticmethod
+                def create(**kwargs):
+                    raise ValueError("bad request")
+
+    monkeypatch.setattr(script_generator, 'get_client', lambda: BrokenClient)
+    parts = list(generator.generate_script_stream(ARTICLES, fresh=True))
+    assert parts == ["Error occurred: bad request"]
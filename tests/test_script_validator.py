@@ -0,0 +1,57 @@
+import pytest
+
+import script_validator
+from script_validator import ScriptValidator, sentence_spans
+
+ARTICLES = [{"title": "기준금리 동결", "url": "https://example.com/1",
+             "full_content": "한국은행은 오늘 기준금리를 연 3.5%로 동결했다. 물가 상승률은 석 달째 둔화되고 있다."}]
+
+
+def sentences(text):
+    return [text[start:end] for start, end in sentence_spans(text)]
+
+
+def test_sentence_spans_keep_decimals_and_initials():
+    text = "기준금리를 3.5%로 동결했다. U.S. economy grew 2.1% last year.\n다음 소식입니다"
+    assert sentences(text) == ["기준금리를 3.5%로 동결했다.", "U.S. economy grew 2.1% last year.", "다음 소식입니다"]
+
+
+def test_find_questionable_flags_wrong_figure():
+    validator = ScriptValidator()
+    _, questionable = validator.find_questionable("한국은행은 오늘 기준금리를 연 3.7%로 동결했다.", ARTICLES)
+    assert [sentence for _, sentence, _ in questionable] == ["한국은행은 오늘 기준금리를 연 3.7%로 동결했다."]
+
+
+def test_validate_incremental_splices_corrections_in_place(monkeypatch):
+    validator = ScriptValidator()
+    monkeypatch.setattr(validator, 'correct_batch', lambda batch, fresh=False: [
+        (span, sentence.replace("3.7", "3.5")) for span, sentence, _ in batch if "3.7" in sentence
+    ])
+    script = ("안녕하세요, 진행자입니다.\n\n한국은행은 오늘 기준금리를 연 3.7%로 동결했다. "
+              "물가 상승률은 석 달째 둔화되고 있다.\n감사합니다.")
+
+    validated, stats = validator.validate_incremental(script, ARTICLES)
+
+    assert validated == script.replace("3.7", "3.5")
+    assert stats["corrected"] == 1
+    assert stats["checked"] >= 1
+
+
+@pytest.fixture
+def validator(monkeypatch, openai_client, llm_cache):
+    monkeypatch.setattr(script_validator, 'get_client', lambda: openai_client)
+    validator = ScriptValidator()
+    validator.llm_cache = llm_cache
+    return validator
+
+
+def test_validate_script_stream_incremental_keeps_supported_script(validator):
+    script = "한국은행은 오늘 기준금리를 연 3.7%로 동결했다."
+    # 가짜 서버는 JSON 요청에 고칠 문장이 없다고 답한다
+    assert list(validator.validate_script_stream(script, ARTICLES)) == [script]
+
+
+def test_validate_script_stream_full_mode_streams(validator):
+    parts = list(validator.validate_script_stream("Hello there. This is the news.", ARTICLES, mode='full'))
+    assert len(parts) > 1
+    assert ''.join(parts).startswith("제목: Fake reply")
@@ -0,0 +1,33 @@
+from trend_tracker import TrendTracker, compute_delta
+
+
+def test_compute_delta():
+    delta = compute_delta(["금리", "환율", "축구"], ["환율", "금리", "선거"])
+    assert delta == {
+        "new": ["선거"],
+        "dropped": ["축구"],
+        "reranked": [("환율", 2, 1), ("금리", 1, 2)],
+        "keywords": ["환율", "금리", "선거"],
+    }
+
+
+def test_compute_delta_from_empty_history():
+    assert compute_delta([], ["금리"])["new"] == ["금리"]
+    assert compute_delta(["금리"], ["금리"]) == {"new": [], "dropped": [], "reranked": [], "keywords": ["금리"]}
+
+
+class FakeAnalyzer:
+    def __init__(self, results):
+        self.results = list(results)
+
+    def get_search_trends(self, count):
+        return self.results.pop(0)
+
+
+def test_failed_poll_keeps_previous_keywords():
+    tracker = TrendTracker(scraper=None, analyzer=FakeAnalyzer([["금리", "환율"], [], ["환율"]]))
+    tracker.news = {"금리": [], "환율": []}
+    assert tracker.poll()["new"] == ["금리", "환율"]
+    assert tracker.poll()["dropped"] == []
+    assert tracker.poll()["dropped"] == ["금리"]
+    assert list(tracker.news) == ["환율"]
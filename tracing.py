@@ -0,0 +1,296 @@
+import atexit
+import contextvars
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+from collections import deque
+
+# 스팬에 더해 가는 수치 속성. 스팬 이름별로 합계를 모아 Prometheus 카운터로 내보낸다
+COUNTERS = ('bytes', 'prompt_tokens', 'completion_tokens', 'retries', 'cache_hits', 'cache_misses')
+# 초 단위 히스토그램 구간
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_current = contextvars.ContextVar('tracing_span', default=None)
+
+
+class Span:
+    def __init__(self, tracer, name, attrs, activate=True):
+        self.tracer = tracer
+        self.name = name
+        self.attrs = dict(attrs)
+        self.activate = activate
+        self.parent = _current.get()
+        self.trace_id = self.parent.trace_id if self.parent is not None else os.urandom(8).hex()
+        self.span_id = os.urandom(4).hex()
+        self.error = None
+        self.started_at = None
+        self.start = None
+        self.duration = None
+        self._token = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+        return self
+
+    def add(self, key, amount=1):
+        self.attrs[key] = self.attrs.get(key, 0) + amount
+        return self
+
+    def fail(self, error):
+        # 예외를 잡아서 print로 끝내는 코드도 스팬에는 오류로 남긴다
+        self.error = f"{type(error).__name__}: {error}" if isinstance(error, BaseException) else str(error)
+        return self
+
+    def __enter__(self):
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        # 스트리밍 제너레이터처럼 yield를 사이에 두는 곳은 activate=False로 현재 스팬을 바꾸지 않는다
+        if self.activate:
+            self._token = _current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration = time.perf_counter() - self.start
+        if exc is not None and self.error is None and not isinstance(exc, GeneratorExit):
+            self.fail(exc)
+        if self._token is not None:
+            _current.reset(self._token)
+        self.tracer.finish(self)
+        return False
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent.span_id if self.parent is not None else None,
+            "start": round(self.started_at, 6),
+            "duration_ms": round(self.duration * 1000, 3),
+            "status": "error" if self.error else "ok",
+            "error": self.error,
+            "attrs": self.attrs,
+        }
+
+
+class _NullSpan:
+    # 추적을 끄면 스팬 대신 아무것도 하지 않는 객체를 돌려준다
+    def set(self, **attrs):
+        return self
+
+    def add(self, key, amount=1):
+        return self
+
+    def fail(self, error):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NULL_SPAN = _NullSpan()
+
+
+class StageStats:
+    def __init__(self, keep):
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.buckets = [0] * len(BUCKETS)
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.recent = deque(maxlen=keep)
+
+    def record(self, span):
+        self.count += 1
+        self.total += span.duration
+        if span.error:
+            self.errors += 1
+        for i, bound in enumerate(BUCKETS):
+            if span.duration <= bound:
+                self.buckets[i] += 1
+        self.recent.append(span.duration)
+        for key in COUNTERS:
+            value = span.attrs.get(key)
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                self.counters[key] += value
+        cache_hit = span.attrs.get('cache_hit')
+        if cache_hit is not None:
+            self.counters['cache_hits' if cache_hit else 'cache_misses'] += 1
+
+
+class Tracer:
+    # 스팬을 이름별로 집계하고, jsonl_path가 있으면 끝난 스팬을 한 줄씩 JSON으로 남긴다
+    def __init__(self, jsonl_path=None, enabled=True, keep=200, flush_every=50):
+        self.jsonl_path = jsonl_path
+        self.enabled = enabled
+        self.keep = keep
+        self.flush_every = flush_every
+        self.stages = {}
+        self.pending = []
+        self.lock = threading.Lock()
+        self.write_lock = threading.Lock()
+
+    def span(self, name, activate=True, **attrs):
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self, name, attrs, activate)
+
+    def finish(self, span):
+        with self.lock:
+            stats = self.stages.get(span.name)
+            if stats is None:
+                stats = self.stages[span.name] = StageStats(self.keep)
+            stats.record(span)
+            if self.jsonl_path:
+                self.pending.append(span.to_dict())
+                should_flush = len(self.pending) >= self.flush_every or span.parent is None
+            else:
+                should_flush = False
+        if should_flush:
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            records, self.pending = self.pending, []
+        if not records or not self.jsonl_path:
+            return
+        lines = ''.join(json.dumps(record, ensure_ascii=False, default=str) + '\n' for record in records)
+        try:
+            with self.write_lock, open(self.jsonl_path, 'a', encoding='utf-8') as f:
+                f.write(lines)
+        except OSError as e:
+            print(f"Error writing trace file {self.jsonl_path}: {str(e)}")
+
+    def reset(self):
+        with self.lock:
+            self.stages = {}
+            self.pending = []
+
+    def stats(self):
+        # GUI 통계 패널용 요약. p50/p95는 이름별 최근 keep개 스팬으로 계산한다
+        with self.lock:
+            snapshot = {name: (stats.count, stats.errors, stats.total, sorted(stats.recent), dict(stats.counters))
+                        for name, stats in self.stages.items()}
+        summary = {}
+        for name, (count, errors, total, recent, counters) in snapshot.items():
+            lookups = counters['cache_hits'] + counters['cache_misses']
+            summary[name] = {
+                "count": count,
+                "errors": errors,
+                "avg_ms": total / count * 1000,
+                "p50_ms": recent[int(len(recent) * 0.5)] * 1000,
+                "p95_ms": recent[min(len(recent) - 1, int(len(recent) * 0.95))] * 1000,
+                "bytes": counters['bytes'],
+                "tokens": counters['prompt_tokens'] + counters['completion_tokens'],
+                "retries": counters['retries'],
+                "cache_hit_rate": counters['cache_hits'] / lookups if lookups else None,
+            }
+        return summary
+
+    def render_prometheus(self):
+        with self.lock:
+            snapshot = {name: (stats.count, stats.errors, stats.total, list(stats.buckets), dict(stats.counters))
+                        for name, stats in sorted(self.stages.items())}
+        lines = [
+            "# HELP news_span_duration_seconds Duration of traced pipeline stages and outbound calls.",
+            "# TYPE news_span_duration_seconds histogram",
+        ]
+        for name, (count, _, total, buckets, _) in snapshot.items():
+            label = f'span="{escape_label(name)}"'
+            for bound, value in zip(BUCKETS, buckets):
+                lines.append(f'news_span_duration_seconds_bucket{{{label},le="{bound}"}} {value}')
+            lines.append(f'news_span_duration_seconds_bucket{{{label},le="+Inf"}} {count}')
+            lines.append(f'news_span_duration_seconds_sum{{{label}}} {total:.6f}')
+            lines.append(f'news_span_duration_seconds_count{{{label}}} {count}')
+        lines += ["# HELP news_span_errors_total Spans that ended with an error.",
+                  "# TYPE news_span_errors_total counter"]
+        for name, (_, errors, _, _, _) in snapshot.items():
+            lines.append(f'news_span_errors_total{{span="{escape_label(name)}"}} {errors}')
+        for key in COUNTERS:
+            lines += [f"# HELP news_{key}_total Sum of the '{key}' attribute over spans.",
+                      f"# TYPE news_{key}_total counter"]
+            for name, (_, _, _, _, counters) in snapshot.items():
+                if counters[key]:
+                    lines.append(f'news_{key}_total{{span="{escape_label(name)}"}} {counters[key]}')
+        return '\n'.join(lines) + '\n'
+
+
+def escape_label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+# 프로세스 전체에서 하나를 쓴다. NEWS_TRACE_FILE을 주면 스팬을 JSONL로도 남긴다
+tracer = Tracer(jsonl_path=os.environ.get('NEWS_TRACE_FILE'), enabled=os.environ.get('NEWS_TRACING', '1') != '0')
+atexit.register(tracer.flush)
+
+
+def span(name, activate=True, **attrs):
+    return tracer.span(name, activate=activate, **attrs)
+
+
+def current_span():
+    return _current.get() or NULL_SPAN
+
+
+def traced(name):
+    # 메서드 전체를 스팬 하나로 감싼다. 안에서 current_span()으로 속성을 더할 수 있다
+    def decorate(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def propagate(fn):
+    # 스레드 풀은 contextvars를 넘겨주지 않으므로 제출하는 쪽의 현재 스팬을 부모로 이어 준다
+    context = contextvars.copy_context()
+
+    def run(*args, **kwargs):
+        return context.copy().run(fn, *args, **kwargs)
+    return run
+
+
+def configure(jsonl_path=None, enabled=None):
+    tracer.flush()
+    if jsonl_path is not None:
+        tracer.jsonl_path = jsonl_path
+    if enabled is not None:
+        tracer.enabled = enabled
+
+
+def start_metrics_server(port=9108, host='127.0.0.1'):
+    # GUI처럼 웹 서버가 없는 프로세스에서 /metrics를 로컬로만 열어 둔다. http.server는 시작 시간을 아끼려고 여기서 불러온다
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = tracer.render_prometheus().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name='metrics-server', daemon=True).start()
+    return server
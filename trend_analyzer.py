@@ -0,0 +1,25 @@
+from rate_limiter import call_with_limits
+
+class TrendAnalyzer:
+    def __init__(self):
+        # pytrends(pandas)는 import가 무겁고 TrendReq는 생성할 때 요청을 보내므로 첫 조회 때 만든다
+        self._pytrends = None
+
+    @property
+    def pytrends(self):
+        if self._pytrends is None:
+            from pytrends.request import TrendReq
+            self._pytrends = TrendReq(hl='ko-KR', tz=540)
+        return self._pytrends
+
+    def fetch_search_trends(self, count=10):
+        # get_search_trends와 같지만 실패를 빈 목록으로 바꾸지 않고 예외로 올린다
+        trends = call_with_limits('pytrends', lambda: self.pytrends.trending_searches(pn='south_korea'))
+        return trends.iloc[:count, 0].tolist()
+
+    def get_search_trends(self, count=10):
+        try:
+            return self.fetch_search_trends(count)
+        except Exception as e:
+            print(f"Error fetching search trends: {str(e)}")
+            return []
@@ -0,0 +1,88 @@
+import asyncio
+import time
+from collections import deque
+from trend_analyzer import TrendAnalyzer
+
+
+def compute_delta(previous, current):
+    previous_rank = {keyword: rank for rank, keyword in enumerate(previous, 1)}
+    current_rank = {keyword: rank for rank, keyword in enumerate(current, 1)}
+    return {
+        "new": [keyword for keyword in current if keyword not in previous_rank],
+        "dropped": [keyword for keyword in previous if keyword not in current_rank],
+        "reranked": [
+            (keyword, previous_rank[keyword], current_rank[keyword])
+            for keyword in current
+            if keyword in previous_rank and previous_rank[keyword] != current_rank[keyword]
+        ],
+        "keywords": list(current),
+    }
+
+
+class TrendTracker:
+    # 트렌드 기록을 남기고, 직전 조회와의 차이(신규/탈락/순위 변동)만큼만 뉴스를 새로 가져온다.
+    # 계속 남아 있는 키워드는 refresh_interval마다 한 번씩만 갱신한다.
+    def __init__(self, scraper, analyzer=None, count=10, refresh_interval=1800, article_limit=10,
+                 history_size=288):
+        self.scraper = scraper
+        self.analyzer = analyzer or TrendAnalyzer()
+        self.count = count
+        self.refresh_interval = refresh_interval
+        self.article_limit = article_limit
+        self.history = deque(maxlen=history_size)
+        self.first_seen = {}
+        self.news = {}
+        self.last_refreshed = {}
+
+    @property
+    def current_keywords(self):
+        return self.history[-1][1] if self.history else []
+
+    def poll(self):
+        keywords = self.analyzer.get_search_trends(self.count)
+        previous = self.current_keywords
+        if not keywords:
+            # 조회에 실패하면 모든 키워드가 빠진 것으로 보지 않고 이전 상태를 유지한다
+            return compute_delta(previous, previous)
+
+        now = time.time()
+        self.history.append((now, keywords))
+        for keyword in keywords:
+            self.first_seen.setdefault(keyword, now)
+        delta = compute_delta(previous, keywords)
+        for keyword in delta["dropped"]:
+            self.news.pop(keyword, None)
+            self.last_refreshed.pop(keyword, None)
+        return delta
+
+    def keywords_to_refresh(self, delta, now=None):
+        now = now or time.time()
+        stale = [
+            keyword for keyword in delta["keywords"]
+            if keyword not in delta["new"] and now - self.last_refreshed.get(keyword, 0) >= self.refresh_interval
+        ]
+        return delta["new"] + stale
+
+    async def refresh_news(self, delta):
+        keywords = self.keywords_to_refresh(delta)
+        if not keywords:
+            return {}
+        results = await asyncio.gather(
+            *[self.scraper.get_news_by_keyword(keyword, self.article_limit) for keyword in keywords],
+            return_exceptions=True,
+        )
+        updated = {}
+        now = time.time()
+        for keyword, articles in zip(keywords, results):
+            if isinstance(articles, Exception):
+                print(f"Error refreshing news for '{keyword}': {str(articles)}")
+                continue
+            self.news[keyword] = articles
+            self.last_refreshed[keyword] = now
+            updated[keyword] = articles
+        return updated
+
+    async def update(self):
+        delta = await asyncio.to_thread(self.poll)
+        updated = await self.refresh_news(delta)
+        return delta, updated
@@ -0,0 +1,88 @@
+import threading
+import traceback
+from PyQt5.QtCore import QObject, QRunnable, pyqtSignal, pyqtSlot
+from async_runner import AsyncLoopThread
+
+
+class WorkerSignals(QObject):
+    progress = pyqtSignal(str)
+    partial = pyqtSignal(object)
+    result = pyqtSignal(object)
+    error = pyqtSignal(str)
+    finished = pyqtSignal()
+
+
+class Worker(QRunnable):
+    # 동기 함수를 QThreadPool에서 실행한다. fn은 첫 인자로 worker를 받아
+    # 진행 상황과 중간 결과를 알리고 cancelled를 확인할 수 있다.
+    def __init__(self, fn, *args, **kwargs):
+        super().__init__()
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.signals = WorkerSignals()
+        self._cancel_event = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    @pyqtSlot()
+    def run(self):
+        try:
+            result = self.fn(self, *self.args, **self.kwargs)
+        except Exception as e:
+            if not self.cancelled:
+                traceback.print_exc()
+                self.signals.error.emit(str(e))
+        else:
+            if not self.cancelled:
+                self.signals.result.emit(result)
+        finally:
+            self.signals.finished.emit()
+
+
+class AsyncTask(QObject):
+    # 코루틴을 AsyncLoopThread에서 실행하고 결과를 Qt 시그널로 돌려준다.
+    # 코루틴 함수는 emit_partial 콜백을 첫 인자로 받는다.
+    progress = pyqtSignal(str)
+    partial = pyqtSignal(object)
+    result = pyqtSignal(object)
+    error = pyqtSignal(str)
+    finished = pyqtSignal()
+
+    def __init__(self, runner, coro_fn, *args, **kwargs):
+        super().__init__()
+        self.runner = runner
+        self.coro_fn = coro_fn
+        self.args = args
+        self.kwargs = kwargs
+        self.future = None
+
+    @property
+    def cancelled(self):
+        return self.future is not None and self.future.cancelled()
+
+    def start(self):
+        self.future = self.runner.submit(self.coro_fn(self.partial.emit, *self.args, **self.kwargs))
+        self.future.add_done_callback(self._done)
+        return self
+
+    def cancel(self):
+        if self.future is not None:
+            self.future.cancel()
+
+    def _done(self, future):
+        if future.cancelled():
+            self.finished.emit()
+            return
+        error = future.exception()
+        if error is not None:
+            traceback.print_exception(type(error), error, error.__traceback__)
+            self.error.emit(str(error))
+        else:
+            self.result.emit(future.result())
+        self.finished.emit()